@@ -1,4 +1,5 @@
 import amo
+from users.entitlements import get_entitlements
 
 
 def match_rules(rules, app, action):
@@ -98,8 +99,7 @@ def check_addon_ownership(request, addon, viewer=False, dev=False,
     # Support can do support.
     elif support:
         roles += (amo.AUTHOR_ROLE_SUPPORT,)
-    return addon.authors.filter(user=request.amo_user,
-                                addonuser__role__in=roles).exists()
+    return get_entitlements(request.amo_user).has_role(addon.id, roles)
 
 
 def check_reviewer(request, only=None, region=None):
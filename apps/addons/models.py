@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import bisect
 import collections
 import itertools
 import os
@@ -40,6 +41,8 @@ from tags.models import Tag
 from translations.fields import (LinkifiedField, PurifiedField, save_signal,
                                  TranslatedField, Translation)
 from translations.query import order_by_translation
+from users import entitlements
+from users.entitlements import get_entitlements
 from users.models import UserForeignKey, UserProfile
 from versions.compare import version_int
 from versions.models import Version
@@ -736,6 +739,56 @@ class Addon(amo.models.OnChangeMixin, amo.models.ModelBase):
 
         return bool(updated)
 
+    def compat_index(self):
+        """
+        Returns the compatibility index of the add-on: a {app id: rows} dict
+        where rows are (min version_int, max version_int, platform id,
+        version id, file status, strict, overrides) tuples sorted by min
+        version_int, one per file of every version compatible with that app.
+        `strict` is True when the file requires strict compatibility and
+        `overrides` holds the (min, max) version_int ranges of the compat
+        overrides of the version for that app, None meaning unbounded.
+
+        It's kept in the cache until invalidate_d2c_versions() is called.
+        """
+        from versions.models import ApplicationsVersions
+        key = '%s:index' % cache_ns_key('d2c-versions:%s' % self.id)
+        index = cache.get(key)
+        if index is not None:
+            return index
+
+        files = collections.defaultdict(list)
+        for version, platform, status, strict, binary in (
+                File.objects.no_cache().filter(version__addon=self.id)
+                .values_list('version', 'platform', 'status',
+                             'strict_compatibility', 'binary_components')):
+            files[version].append((platform, status, bool(strict or binary)))
+
+        overrides = collections.defaultdict(list)
+        for version, app, min_, max_, min_int, max_int in (
+                IncompatibleVersions.objects.no_cache()
+                .filter(version__addon=self.id)
+                .values_list('version', 'app', 'min_app_version',
+                             'max_app_version', 'min_app_version_int',
+                             'max_app_version_int')):
+            overrides[version, app].append(
+                (None if min_ == '0' else min_int or 0,
+                 None if max_ == '*' else max_int or 0))
+
+        index = collections.defaultdict(list)
+        for app, version, min_int, max_int in (
+                ApplicationsVersions.objects.no_cache()
+                .filter(version__addon=self.id, version__deleted=False)
+                .values_list('application', 'version', 'min__version_int',
+                             'max__version_int')):
+            ranges = tuple(overrides.get((version, app), ()))
+            for platform, status, strict in files.get(version, ()):
+                index[app].append((min_int or 0, max_int or 0, platform,
+                                   version, status, strict, ranges))
+        index = dict((app, sorted(rows)) for app, rows in index.items())
+        cache.set(key, index, None)
+        return index
+
     def compatible_version(self, app_id, app_version=None, platform=None,
                            compat_mode='strict'):
         """Returns the newest compatible version given the input."""
@@ -743,7 +796,7 @@ class Addon(amo.models.OnChangeMixin, amo.models.ModelBase):
             return None
 
         if platform:
-            # We include platform_id=1 always in the SQL so we skip it here.
+            # Files for all platforms are always included so we skip it here.
             platform = platform.lower()
             if platform != 'all' and platform in amo.PLATFORM_DICT:
                 platform = amo.PLATFORM_DICT[platform].id
@@ -753,103 +806,49 @@ class Addon(amo.models.OnChangeMixin, amo.models.ModelBase):
         log.debug(u'Checking compatibility for add-on ID:%s, APP:%s, V:%s, '
                   u'OS:%s, Mode:%s' % (self.id, app_id, app_version, platform,
                                        compat_mode))
-        valid_file_statuses = ','.join(map(str, self.valid_file_statuses))
-        data = dict(id=self.id, app_id=app_id, platform=platform,
-                    valid_file_statuses=valid_file_statuses)
+        rows = self.compat_index().get(app_id, [])
         if app_version:
-            data.update(version_int=version_int(app_version))
+            vint = version_int(app_version)
+            # Only the versions whose min version is low enough qualify.
+            rows = rows[:bisect.bisect_right(rows, (vint, float('inf')))]
         else:
             # We can't perform the search queries for strict or normal without
             # an app version.
             compat_mode = 'ignore'
 
-        ns_key = cache_ns_key('d2c-versions:%s' % self.id)
-        cache_key = '%s:%s:%s:%s:%s' % (ns_key, app_id, app_version, platform,
-                                        compat_mode)
-        version_id = cache.get(cache_key)
-        if version_id is not None:
-            log.debug(u'Found compatible version in cache: %s => %s' % (
-                      cache_key, version_id))
-            if version_id == 0:
-                return None
-            else:
-                try:
-                    return Version.objects.get(pk=version_id)
-                except Version.DoesNotExist:
-                    pass
-
-        raw_sql = ["""
-            SELECT versions.*
-            FROM versions
-            INNER JOIN addons
-                ON addons.id = versions.addon_id AND addons.id = %(id)s
-            INNER JOIN applications_versions
-                ON applications_versions.version_id = versions.id
-            INNER JOIN applications
-                ON applications_versions.application_id = applications.id
-                AND applications.id = %(app_id)s
-            INNER JOIN appversions appmin
-                ON appmin.id = applications_versions.min
-            INNER JOIN appversions appmax
-                ON appmax.id = applications_versions.max
-            INNER JOIN files
-                ON files.version_id = versions.id AND
-                   (files.platform_id = 1"""]
-
-        if platform:
-            raw_sql.append(' OR files.platform_id = %(platform)s')
-
-        raw_sql.append(') WHERE files.status IN (%(valid_file_statuses)s) ')
-
-        if app_version:
-            raw_sql.append('AND appmin.version_int <= %(version_int)s ')
-
-        if compat_mode == 'ignore':
-            pass  # No further SQL modification required.
-
-        elif compat_mode == 'normal':
-            raw_sql.append("""AND
-                CASE WHEN files.strict_compatibility = 1 OR
-                          files.binary_components = 1
-                THEN appmax.version_int >= %(version_int)s ELSE 1 END
-            """)
-            # Filter out versions that don't have the minimum maxVersion
-            # requirement to qualify for default-to-compatible.
-            d2c_max = amo.D2C_MAX_VERSIONS.get(app_id)
-            if d2c_max:
-                data['d2c_max_version'] = version_int(d2c_max)
-                raw_sql.append(
-                    "AND appmax.version_int >= %(d2c_max_version)s ")
-
-            # Filter out versions found in compat overrides
-            raw_sql.append("""AND
-                NOT versions.id IN (
-                SELECT version_id FROM incompatible_versions
-                WHERE app_id=%(app_id)s AND
-                  (min_app_version='0' AND
-                       max_app_version_int >= %(version_int)s) OR
-                  (min_app_version_int <= %(version_int)s AND
-                       max_app_version='*') OR
-                  (min_app_version_int <= %(version_int)s AND
-                       max_app_version_int >= %(version_int)s)) """)
-
-        else:  # Not defined or 'strict'.
-            raw_sql.append('AND appmax.version_int >= %(version_int)s ')
-
-        raw_sql.append('ORDER BY versions.id DESC LIMIT 1;')
-
-        version = Version.objects.raw(''.join(raw_sql) % data)
-        if version:
-            version = version[0]
-            version_id = version.id
-        else:
-            version = None
-            version_id = 0
+        d2c_max = amo.D2C_MAX_VERSIONS.get(app_id)
+        d2c_max = d2c_max and version_int(d2c_max)
+        platforms = (amo.PLATFORM_ALL.id, platform)
+        statuses = self.valid_file_statuses
 
-        log.debug(u'Caching compat version %s => %s' % (cache_key, version_id))
-        cache.set(cache_key, version_id, None)
+        version_id = 0
+        for min_int, max_int, plat, vid, status, strict, ranges in rows:
+            if (vid <= version_id or plat not in platforms or
+                    status not in statuses):
+                continue
+            if compat_mode == 'ignore':
+                pass
+            elif compat_mode == 'normal':
+                if strict and max_int < vint:
+                    continue
+                # Versions need the minimum maxVersion to qualify for
+                # default-to-compatible.
+                if d2c_max and max_int < d2c_max:
+                    continue
+                # Versions found in compat overrides are out.
+                if any((lo is None or lo <= vint) and
+                       (hi is None or hi >= vint) for lo, hi in ranges):
+                    continue
+            elif max_int < vint:  # Not defined or 'strict'.
+                continue
+            version_id = vid
 
-        return version
+        if version_id:
+            try:
+                return Version.objects.get(pk=version_id)
+            except Version.DoesNotExist:
+                pass
+        return None
 
     def increment_version(self):
         """Increment version number by 1."""
@@ -859,7 +858,7 @@ class Addon(amo.models.OnChangeMixin, amo.models.ModelBase):
         self.update(_current_version=version.save())
 
     def invalidate_d2c_versions(self):
-        """Invalidates the cache of compatible versions.
+        """Invalidates the compatibility index of the add-on.
 
         Call this when there is an event that may change what compatible
         versions are returned so they are recalculated.
@@ -1335,6 +1334,8 @@ class Addon(amo.models.OnChangeMixin, amo.models.ModelBase):
             return False
         if roles is None:
             roles = dict(amo.AUTHOR_CHOICES).keys()
+        if isinstance(user, UserProfile):
+            return get_entitlements(user).has_role(self.id, roles)
         return AddonUser.objects.filter(addon=self, user=user,
                                         role__in=roles).exists()
 
@@ -1451,10 +1452,7 @@ class Addon(amo.models.OnChangeMixin, amo.models.ModelBase):
 
     def get_purchase_type(self, user):
         if user and isinstance(user, UserProfile):
-            try:
-                return self.addonpurchase_set.get(user=user).type
-            except models.ObjectDoesNotExist:
-                pass
+            return get_entitlements(user).purchase_type(self.id)
 
     def has_purchased(self, user):
         return self.get_purchase_type(user) == amo.CONTRIB_PURCHASE
@@ -1821,6 +1819,13 @@ class AddonUser(caching.CachingMixin, models.Model):
         return self.addon.flush_urls() + self.user.flush_urls()
 
 
+# Keep the entitlements of the authors up to date.
+dbsignals.post_save.connect(entitlements.changed, sender=AddonUser,
+                            dispatch_uid='addonuser_entitlements')
+dbsignals.post_delete.connect(entitlements.changed, sender=AddonUser,
+                              dispatch_uid='addonuser_entitlements')
+
+
 class AddonDependency(models.Model):
     addon = models.ForeignKey(Addon, related_name='addons_dependencies')
     dependent_addon = models.ForeignKey(Addon, related_name='dependent_on')
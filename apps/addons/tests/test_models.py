@@ -448,6 +448,32 @@ class TestAddonModels(amo.tests.TestCase):
         assert a.current_version != v
         eq_(a.compatible_version(amo.FIREFOX.id), a.current_version)
 
+    def test_compatible_version_app_version(self):
+        a = Addon.objects.get(pk=3615)
+        av = a.current_version.apps.all()[0]
+        eq_(a.compatible_version(amo.FIREFOX.id, av.min.version),
+            a.current_version)
+        # Any app version is answered from the same index.
+        with patch('addons.models.File.objects') as files:
+            eq_(a.compatible_version(amo.FIREFOX.id, '0.1'), None)
+            eq_(a.compatible_version(amo.FIREFOX.id, '9999.0', None,
+                                     'ignore'), a.current_version)
+            assert not files.no_cache.called
+        eq_(a.compatible_version(amo.FIREFOX.id, '9999.0'), None)
+
+    @patch.dict(amo.D2C_MAX_VERSIONS, clear=True)
+    def test_compatible_version_overrides(self):
+        a = Addon.objects.get(pk=3615)
+        av = a.current_version.apps.all()[0]
+        eq_(a.compatible_version(amo.FIREFOX.id, av.max.version, None,
+                                 'normal'), a.current_version)
+        IncompatibleVersions.objects.create(
+            version=a.current_version, app_id=amo.FIREFOX.id,
+            min_app_version='0', max_app_version='*')
+        a.invalidate_d2c_versions()
+        eq_(a.compatible_version(amo.FIREFOX.id, av.max.version, None,
+                                 'normal'), None)
+
     def test_transformer(self):
         addon = Addon.objects.get(pk=3615)
         # If the transformer works then we won't have any more queries.
@@ -1,7 +1,12 @@
+import threading
+from collections import defaultdict
 from inspect import isclass
 
 from django.conf import settings
 from django.core.files.storage import get_storage_class
+from django.core.signals import (got_request_exception, request_finished,
+                                 request_started)
+from django.db import transaction
 
 from celery.datastructures import AttributeDict
 from tower import ugettext_lazy as _
@@ -400,6 +405,7 @@ class PURCHASE_ADDON(_LOG):
 class INSTALL_ADDON(_LOG):
     id = 55
     format = _(u'{addon} installed.')
+    deferred = True
 
 
 class REFUND_REQUESTED(_LOG):
@@ -683,10 +689,67 @@ LOG_HIDE_DEVELOPER = [l.id for l in LOGS
                                or l.id in LOG_ADMINS)]
 
 
+_locals = threading.local()
+
+
+def _get_buffer():
+    """
+    Returns the calling thread's buffer of deferred entries, or None when
+    we're not inside a request: there is nothing to flush them after.
+    """
+    return getattr(_locals, 'buffer', None)
+
+
+def _start_buffer(**kwargs):
+    _locals.buffer = []
+
+
+def _discard_buffer(**kwargs):
+    _locals.buffer = None
+
+
+def _flush_buffer(**kwargs):
+    """Writes the deferred entries of the request, in batches."""
+    buf = _get_buffer()
+    _locals.buffer = None
+    size = settings.ACTIVITY_LOG_BATCH_SIZE
+    for i in range(0, len(buf or []), size):
+        _write(buf[i:i + size])
+
+
+def _write(entries):
+    """
+    Writes `entries`, a list of (ActivityLog, created, rows) tuples, in one
+    transaction: the ActivityLogs are saved one by one since we need their
+    ids, then the rows pointing at them are inserted with one query per
+    table.
+    """
+    from devhub.models import ActivityLog
+
+    by_model = defaultdict(list)
+    with transaction.atomic():
+        for al, created, rows in entries:
+            al.save()
+            # TODO(davedash): post-remora this may not be necessary.
+            if created:
+                # Django resets the created date on save.
+                al.created = created
+                ActivityLog.objects.filter(pk=al.pk).update(created=created)
+            for row in rows:
+                row.activity_log = al
+                by_model[row.__class__].append(row)
+        for model, rows in by_model.items():
+            model.objects.bulk_create(rows)
+
+
 def log(action, *args, **kw):
     """
     e.g. amo.log(amo.LOG.CREATE_ADDON, []),
          amo.log(amo.LOG.ADD_FILE_TO_VERSION, file, version)
+
+    Actions with `deferred = True` (or called with `deferred=True`) are
+    buffered and written in batches once the response has been sent. The
+    returned ActivityLog isn't saved yet in that case.
     """
     from access.models import Group
     from addons.models import Addon
@@ -708,16 +771,12 @@ def log(action, *args, **kw):
     al.arguments = args
     if 'details' in kw:
         al.details = kw['details']
-    al.save()
 
+    # The rows indexing the ActivityLog, their `activity_log` is set once it
+    # has been saved.
+    rows = []
     if 'details' in kw and 'comments' in al.details:
-        CommentLog(comments=al.details['comments'], activity_log=al).save()
-
-    # TODO(davedash): post-remora this may not be necessary.
-    if 'created' in kw:
-        al.created = kw['created']
-        # Double save necessary since django resets the created date on save.
-        al.save()
+        rows.append(CommentLog(comments=al.details['comments']))
 
     if 'attachments' in kw:
         formset = kw['attachments']
@@ -728,37 +787,54 @@ def log(action, *args, **kw):
                 attachment = data['attachment']
                 storage.save('%s/%s' % (settings.REVIEWER_ATTACHMENTS_PATH,
                                         attachment.name), attachment)
-                ActivityLogAttachment(activity_log=al,
-                                      description=data['description'],
-                                      mimetype=attachment.content_type,
-                                      filepath=attachment.name).save()
+                rows.append(ActivityLogAttachment(
+                    description=data['description'],
+                    mimetype=attachment.content_type,
+                    filepath=attachment.name))
 
     for arg in args:
         if isinstance(arg, tuple):
             if arg[0] == Webapp:
-                AppLog(addon_id=arg[1], activity_log=al).save()
+                rows.append(AppLog(addon_id=arg[1]))
             elif arg[0] == Addon:
-                AddonLog(addon_id=arg[1], activity_log=al).save()
+                rows.append(AddonLog(addon_id=arg[1]))
             elif arg[0] == Version:
-                VersionLog(version_id=arg[1], activity_log=al).save()
+                rows.append(VersionLog(version_id=arg[1]))
             elif arg[0] == UserProfile:
-                UserLog(user_id=arg[1], activity_log=al).save()
+                rows.append(UserLog(user_id=arg[1]))
             elif arg[0] == Group:
-                GroupLog(group_id=arg[1], activity_log=al).save()
+                rows.append(GroupLog(group_id=arg[1]))
 
         # Webapp first since Webapp subclasses Addon.
         if isinstance(arg, Webapp):
-            AppLog(addon=arg, activity_log=al).save()
+            rows.append(AppLog(addon=arg))
         elif isinstance(arg, Addon):
-            AddonLog(addon=arg, activity_log=al).save()
+            rows.append(AddonLog(addon=arg))
         elif isinstance(arg, Version):
-            VersionLog(version=arg, activity_log=al).save()
+            rows.append(VersionLog(version=arg))
         elif isinstance(arg, UserProfile):
             # Index by any user who is mentioned as an argument.
-            UserLog(activity_log=al, user=arg).save()
+            rows.append(UserLog(user=arg))
         elif isinstance(arg, Group):
-            GroupLog(group=arg, activity_log=al).save()
+            rows.append(GroupLog(group=arg))
 
     # Index by every user
-    UserLog(activity_log=al, user=user).save()
+    rows.append(UserLog(user=user))
+
+    entry = (al, kw.get('created'), rows)
+    deferred = kw.get('deferred', getattr(action, 'deferred', False))
+    buf = _get_buffer()
+    if deferred and buf is not None:
+        buf.append(entry)
+        if len(buf) >= settings.ACTIVITY_LOG_BATCH_SIZE:
+            _flush_buffer()
+            _start_buffer()
+    else:
+        _write([entry])
     return al
+
+
+request_started.connect(_start_buffer, dispatch_uid='amo_log_start_buffer')
+request_finished.connect(_flush_buffer, dispatch_uid='amo_log_flush_buffer')
+got_request_exception.connect(_discard_buffer,
+                              dispatch_uid='amo_log_discard_buffer')
@@ -1,13 +1,15 @@
 import logging
+import threading
 
 from django.conf import settings as dj_settings
 
 from django_statsd.clients import statsd
 from elasticutils import S as EU_S
-from elasticutils.contrib.django import get_es as eu_get_es
 from pyes import ES as pyes_ES
 from pyes import VERSION as PYES_VERSION
 
+from lib.es.client import get_es as eu_get_es
+
 
 log = logging.getLogger('z.es')
 
@@ -17,6 +19,9 @@ DEFAULT_TIMEOUT = 5
 DEFAULT_INDEXES = ['default']
 DEFAULT_DUMP_CURL = None
 
+# The ES objects of the current thread, by hosts, indexes and timeout.
+_local = threading.local()
+
 
 # Pulled from elasticutils 0.5 so we can upgrade elasticutils to a newer
 # version which is based on pyelasticsearch and not break AMO.
@@ -49,6 +54,11 @@ def get_es(hosts=None, default_indexes=None, timeout=None, dump_curl=None,
     ...
     >>> es = get_es(dump_curl=CurlDumper())
 
+    Without `dump_curl` or other settings, the ES object is reused by the
+    following calls with the same arguments in the same thread, so that its
+    connections are kept alive. The ES objects aren't shared by threads since
+    they buffer bulk requests.
+
     """
     # Cheap way of de-None-ifying things
     hosts = hosts or getattr(dj_settings, 'ES_HOSTS', DEFAULT_HOSTS)
@@ -60,6 +70,13 @@ def get_es(hosts=None, default_indexes=None, timeout=None, dump_curl=None,
     if not isinstance(default_indexes, list):
         default_indexes = [default_indexes]
 
+    key = None
+    if not dump_curl and not settings:
+        key = (tuple(hosts), tuple(default_indexes), timeout)
+        cached = getattr(_local, 'clients', {})
+        if key in cached:
+            return cached[key]
+
     es = pyes_ES(hosts, default_indexes=default_indexes, timeout=timeout,
                  dump_curl=dump_curl, **settings)
 
@@ -71,6 +88,10 @@ def get_es(hosts=None, default_indexes=None, timeout=None, dump_curl=None,
     if PYES_VERSION[0:2] == (0, 15) and dump_curl is not None:
         es.dump_curl = dump_curl
 
+    if key:
+        if not hasattr(_local, 'clients'):
+            _local.clients = {}
+        _local.clients[key] = es
     return es
 
 
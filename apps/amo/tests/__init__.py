@@ -53,6 +53,7 @@ from files.models import File, Platform
 from lib.post_request_task import task as post_request_task
 from market.models import AddonPremium, Price, PriceCurrency
 from translations.models import Translation
+from users import entitlements
 from users.models import RequestUser, UserProfile
 from versions.models import ApplicationsVersions, Version
 
@@ -289,6 +290,9 @@ class TestCase(MockEsMixin, RedisTest, test_utils.TestCase):
 
     def _pre_setup(self):
         super(TestCase, self)._pre_setup()
+        # In case a previous test left a request or a task unfinished.
+        entitlements.finish('request')
+        entitlements.finish('task')
         cache.clear()
         # Override django-cache-machine caching.base.TIMEOUT because it's
         # computed too early, before settings_test.py is imported.
@@ -874,10 +878,15 @@ class ESTestCase(TestCase):
             raise
 
         cls._SEARCH_ANALYZER_MAP = amo.SEARCH_ANALYZER_MAP
+        cls._SEARCH_LANGUAGE_TO_ANALYZER = amo.SEARCH_LANGUAGE_TO_ANALYZER
         amo.SEARCH_ANALYZER_MAP = {
             'english': ['en-us'],
             'spanish': ['es'],
         }
+        amo.SEARCH_LANGUAGE_TO_ANALYZER = {
+            'en-us': 'english',
+            'es': 'spanish',
+        }
 
         for index in set(settings.ES_INDEXES.values()):
             # Get the index that's pointed to by the alias.
@@ -913,6 +922,7 @@ class ESTestCase(TestCase):
                 unindex_addons([a.id for a in cls._addons
                                 if a.type != amo.ADDON_WEBAPP])
             amo.SEARCH_ANALYZER_MAP = cls._SEARCH_ANALYZER_MAP
+            amo.SEARCH_LANGUAGE_TO_ANALYZER = cls._SEARCH_LANGUAGE_TO_ANALYZER
         finally:
             # Make sure we're calling super's tearDownClass even if something
             # went wrong in the code above, as otherwise we'd run into bug
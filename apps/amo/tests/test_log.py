@@ -6,13 +6,19 @@ from nose.tools import eq_
 import amo
 import amo.tests
 from addons.models import Addon
+from amo.log import _discard_buffer, _flush_buffer, _start_buffer
+from devhub.models import ActivityLog, AddonLog, UserLog
 from users.models import UserProfile
 
 
 class LogTest(amo.tests.TestCase):
     def setUp(self):
-        u = UserProfile.objects.create(username='foo')
-        amo.set_user(u)
+        self.user = UserProfile.objects.create(username='foo')
+        amo.set_user(self.user)
+
+    def tearDown(self):
+        _discard_buffer()
+        super(LogTest, self).tearDown()
 
     def test_details(self):
         """
@@ -34,3 +40,43 @@ class LogTest(amo.tests.TestCase):
         al = amo.log(amo.LOG.CUSTOM_TEXT, 'hi', created=datetime(2009, 1, 1))
 
         eq_(al.created, datetime(2009, 1, 1))
+
+    def test_index_rows(self):
+        a = Addon.objects.create(type=amo.ADDON_EXTENSION)
+        other = UserProfile.objects.create(username='bar')
+        al = amo.log(amo.LOG.ADD_USER_WITH_ROLE, other, 'owner', a)
+        eq_(list(AddonLog.objects.filter(activity_log=al)
+                 .values_list('addon', flat=True)), [a.pk])
+        eq_(sorted(UserLog.objects.filter(activity_log=al)
+                   .values_list('user', flat=True)),
+            sorted([self.user.pk, other.pk]))
+
+    def test_deferred(self):
+        a = Addon.objects.create(type=amo.ADDON_EXTENSION)
+        _start_buffer()
+        al = amo.log(amo.LOG.INSTALL_ADDON, a)
+        eq_(al.pk, None)
+        eq_(ActivityLog.objects.count(), 0)
+        _flush_buffer()
+        al = ActivityLog.objects.get()
+        eq_(al.action, amo.LOG.INSTALL_ADDON.id)
+        eq_(AddonLog.objects.get(activity_log=al).addon_id, a.pk)
+        eq_(UserLog.objects.get(activity_log=al).user_id, self.user.pk)
+
+    def test_deferred_batch(self):
+        a = Addon.objects.create(type=amo.ADDON_EXTENSION)
+        _start_buffer()
+        with self.settings(ACTIVITY_LOG_BATCH_SIZE=2):
+            amo.log(amo.LOG.INSTALL_ADDON, a)
+            amo.log(amo.LOG.INSTALL_ADDON, a)
+            eq_(ActivityLog.objects.count(), 2)
+            amo.log(amo.LOG.INSTALL_ADDON, a)
+            eq_(ActivityLog.objects.count(), 2)
+            _flush_buffer()
+        eq_(ActivityLog.objects.count(), 3)
+        eq_(AddonLog.objects.count(), 3)
+
+    def test_deferred_outside_request(self):
+        a = Addon.objects.create(type=amo.ADDON_EXTENSION)
+        al = amo.log(amo.LOG.INSTALL_ADDON, a)
+        eq_(ActivityLog.objects.get().pk, al.pk)
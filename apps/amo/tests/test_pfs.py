@@ -1,5 +1,11 @@
+import re
+
+import mock
+from nose.tools import eq_
+
 import amo
 import amo.tests
+from services import pfs
 from services.pfs import get_output
 
 from  pyquery import PyQuery as pq
@@ -7,6 +13,17 @@ from  pyquery import PyQuery as pq
 
 class TestPfs(amo.tests.TestCase):
 
+    def setUp(self):
+        pfs.cache.clear()
+
+    def get(self, mimetype, clientOS, **kw):
+        data = {'mimetype': mimetype, 'appID': amo.FIREFOX.guid,
+                'appVersion': '30.0', 'clientOS': clientOS,
+                'chromeLocale': 'en-US'}
+        data.update(kw)
+        return dict(re.findall(r'<pfs:(\w+)>([^<]*)</pfs:\1>',
+                               get_output(data)))
+
     def test_xss(self):
         for k in ['name', 'mimetype', 'guid', 'version', 'iconUrl',
                   'InstallerLocation', 'InstallerHash', 'XPILocation',
@@ -14,3 +31,43 @@ class TestPfs(amo.tests.TestCase):
                   'licenseURL', 'needsRestart']:
             res = get_output({k: 'fooo<script>alert("foo")</script>;'})
             assert not pq(res)('script')
+
+    def test_flash(self):
+        doc = self.get('application/x-shockwave-flash', 'Windows NT 6.1')
+        eq_(doc['guid'], '{4cfaef8a-a6c9-41a0-8e6f-967eb8f49143}')
+        eq_(doc['name'], 'Adobe Flash Player')
+        doc = self.get('application/futuresplash', 'Linux x86_64')
+        eq_(doc['guid'], '-1')
+        eq_(doc['name'], 'Adobe Flash Player')
+        doc = self.get('application/x-shockwave-flash', 'Android')
+        eq_(doc['name'], '-1')
+
+    def test_locale(self):
+        doc = self.get('application/x-director', 'Win', chromeLocale='ja-JP')
+        eq_(doc['licenseURL'],
+            'http://www.adobe.com/go/eula_shockwaveplayer_jp')
+        doc = self.get('application/x-director', 'Win')
+        eq_(doc['licenseURL'],
+            'http://www.adobe.com/go/eula_shockwaveplayer')
+
+    def test_patterns(self):
+        eq_(self.get('application/x-java-applet;version=1.4.2', 'Linux i686')
+            ['name'], 'Java Runtime Environment')
+        eq_(self.get('video/quicktime', 'PPC Mac OS X')['name'],
+            'Apple Quicktime')
+        eq_(self.get('video/x-ms-wmv', 'Intel Mac OS X')['name'],
+            'Flip4Mac')
+        eq_(self.get('video/x-ms-wmv', 'Linux')['name'], '-1')
+
+    def test_unknown(self):
+        doc = self.get('application/x-unknown', 'Win')
+        eq_(doc['name'], '-1')
+        eq_(doc['requestedMimetype'], 'application/x-unknown')
+
+    def test_cached(self):
+        self.get('video/vnd.divx', 'Win')
+        with mock.patch.object(pfs, 'find_rules') as find_rules:
+            doc = self.get('video/vnd.divx', 'Win')
+            assert not find_rules.called
+        eq_(doc['XPILocation'],
+            'http://download.divx.com/player/DivXWebPlayer.xpi')
@@ -0,0 +1,52 @@
+from nose.tools import eq_, ok_
+
+import amo.tests
+from constants import applications, base, payments, platforms
+from scripts import services_startup
+from services import frozen_constants
+
+
+class TestFrozenConstants(amo.tests.TestCase):
+
+    def test_base(self):
+        for name in ['STATUS_NULL', 'STATUS_PUBLIC', 'STATUS_DISABLED',
+                     'STATUS_BETA', 'STATUS_LITE', 'STATUS_LITE_AND_NOMINATED',
+                     'STATUS_DELETED', 'ADDON_PREMIUM', 'ADDON_SLUGS_UPDATE']:
+            eq_(getattr(frozen_constants, name), getattr(base, name), name)
+        eq_(frozen_constants.VERSION_BETA.pattern, base.VERSION_BETA.pattern)
+
+    def test_payments(self):
+        for name in ['CONTRIB_PURCHASE', 'CONTRIB_REFUND',
+                     'CONTRIB_CHARGEBACK', 'CONTRIB_NO_CHARGE']:
+            eq_(getattr(frozen_constants, name), getattr(payments, name),
+                name)
+
+    def test_applications(self):
+        eq_(frozen_constants.APP_GUIDS,
+            dict((app.guid, app.id) for app in applications.APPS_ALL.values()))
+        eq_(frozen_constants.D2C_MAX_VERSIONS, applications.D2C_MAX_VERSIONS)
+
+    def test_platforms(self):
+        eq_(frozen_constants.PLATFORMS,
+            dict((p.api_name, p.id) for p in platforms.PLATFORMS.values()))
+
+
+class TestStartup(amo.tests.TestCase):
+
+    def check(self, service):
+        seconds, modules = services_startup.measure(service)
+        ok_(seconds < services_startup.BUDGET,
+            'Importing %s took %.2fs.' % (service, seconds))
+        loaded = set(m.split('.')[0] for m in modules)
+        for module in services_startup.DEFERRED[service]:
+            ok_(module not in loaded,
+                'Importing %s loaded %s.' % (service, module))
+
+    def test_update(self):
+        self.check('update')
+
+    def test_pfs(self):
+        self.check('pfs')
+
+    def test_verify(self):
+        self.check('verify')
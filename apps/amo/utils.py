@@ -51,6 +51,7 @@ from PIL import Image, ImageFile, PngImagePlugin
 import amo.search
 from amo import ADDON_ICON_SIZES
 from amo.urlresolvers import linkify_with_outgoing, reverse
+from translations import cache as trans_cache
 from translations.models import Translation
 from users.models import UserNotification
 from users.utils import UnsubscribeCode
@@ -873,11 +874,13 @@ def attach_trans_dict(model, objs):
     ids = [getattr(obj, f.attname) for f in fields
            for obj in objs if getattr(obj, f.attname, None) is not None]
 
-    # Get translations in a dict, ids will be the keys. It's important to
-    # consume the result of sorted_groupby, which is an iterator.
-    qs = Translation.objects.filter(id__in=ids, localized_string__isnull=False)
-    all_translations = dict((k, list(v)) for k, v in
-                            sorted_groupby(qs, lambda trans: trans.id))
+    # Get translations in a dict, ids will be the keys. They come from the
+    # translations cache, shared between requests.
+    all_translations = {}
+    for k, v in trans_cache.get_all_locales(ids).items():
+        v = [t for t in v if t.localized_string is not None]
+        if v:
+            all_translations[k] = v
 
     def get_locale_and_string(translation, new_class):
         """Convert the translation to new_class (making PurifiedTranslations
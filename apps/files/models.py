@@ -504,6 +504,21 @@ def clear_d2c_version(old_attr, new_attr, instance, sender, **kw):
         instance.version.addon.invalidate_d2c_versions()
 
 
+@receiver(models.signals.post_save, sender=File,
+          dispatch_uid='clear_d2c_version_save')
+@receiver(models.signals.post_delete, sender=File,
+          dispatch_uid='clear_d2c_version_delete')
+def clear_d2c_version_files(sender, instance, **kw):
+    """Files added or deleted change the compatible versions of the add-on."""
+    # Updates are handled by clear_d2c_version().
+    if kw.get('raw') or kw.get('created') is False:
+        return
+    try:
+        instance.version.addon.invalidate_d2c_versions()
+    except models.ObjectDoesNotExist:
+        pass
+
+
 # TODO(davedash): Get rid of this table once /editors is on zamboni
 class Approval(amo.models.ModelBase):
 
@@ -2,7 +2,6 @@
 import uuid
 
 from django.conf import settings
-from django.core.cache import cache
 from django.db import connection, models
 from django.dispatch import receiver
 from django.forms.models import model_to_dict
@@ -10,7 +9,6 @@ from django.utils import translation
 
 import commonware.log
 from babel import numbers
-from cache_nuggets.lib import memoize_key
 from jinja2.filters import do_dictsort
 from tower import ugettext_lazy as _
 
@@ -26,6 +24,7 @@ from mkt.constants import apps
 from mkt.constants.regions import RESTOFWORLD, REGIONS_CHOICES_ID_DICT as RID
 from mkt.regions.utils import remove_accents
 from stats.models import Contribution
+from users import entitlements
 from users.models import UserProfile
 
 
@@ -305,6 +304,13 @@ class AddonPurchase(amo.models.ModelBase):
         return u'%s: %s' % (self.addon, self.user)
 
 
+# Keep the entitlements of the buyers up to date.
+models.signals.post_save.connect(entitlements.changed, sender=AddonPurchase,
+                                 dispatch_uid='addonpurchase_entitlements')
+models.signals.post_delete.connect(entitlements.changed, sender=AddonPurchase,
+                                   dispatch_uid='addonpurchase_entitlements')
+
+
 @receiver(models.signals.post_save, sender=AddonPurchase)
 def add_uuid(sender, **kw):
     if not kw.get('raw'):
@@ -359,8 +365,6 @@ def create_addon_purchase(sender, instance, **kw):
                       % (p.pk, instance.addon.pk, instance.user.pk))
             p.update(type=instance.type)
 
-    cache.delete(memoize_key('users:purchase-ids', instance.user.pk))
-
 
 class AddonPremium(amo.models.ModelBase):
     """Additions to the Addon model that only apply to Premium add-ons."""
@@ -103,7 +103,7 @@ class Review(amo.models.ModelBase):
             tasks.update_denorm(pair, using='default')
 
         # Review counts have changed, so run the task and trigger a reindex.
-        tasks.addon_review_aggregates.delay(self.addon_id, using='default')
+        tasks.queue_aggregates(self.addon_id)
         update_search_index(self.addon.__class__, self.addon)
 
     @staticmethod
@@ -185,6 +185,23 @@ class GroupedRating(object):
         cache.set(cls.key(addon), ratings)
         return ratings
 
+    @classmethod
+    def set_many(cls, addons, using=None):
+        """Like set() for all of `addons`, with a single query."""
+        counts = dict((addon, {}) for addon in addons)
+        q = (Review.objects.valid().no_cache().using(using)
+             .filter(addon__in=addons, is_latest=True)
+             .values_list('addon', 'rating')
+             .annotate(models.Count('rating')))
+        for addon, rating, count in q:
+            counts[addon][rating] = count
+        rv = dict((addon, [(rating, c.get(rating, 0))
+                           for rating in range(1, 6)])
+                  for addon, c in counts.items())
+        cache.set_many(dict((cls.key(addon), ratings)
+                            for addon, ratings in rv.items()))
+        return rv
+
 
 class Spam(object):
 
@@ -1,15 +1,23 @@
 import logging
+from collections import defaultdict
 
-from django.db.models import Count, Avg, F
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, Avg
 
 import caching.base as caching
 from celeryutils import task
 
+import amo
 from addons.models import Addon
 from .models import Review, GroupedRating
 
 log = logging.getLogger('z.task')
 
+# Set while the aggregates of an add-on are waiting to be recomputed.
+DIRTY_KEY = 'reviews:aggregates:dirty:%s'
+
 
 @task(rate_limit='50/m')
 def update_denorm(*pairs, **kw):
@@ -20,64 +28,145 @@ def update_denorm(*pairs, **kw):
     log.info('[%s@%s] Updating review denorms.' %
              (len(pairs), update_denorm.rate_limit))
     using = kw.get('using')
-    for addon, user in pairs:
-        reviews = list(Review.objects.valid().no_cache().using(using)
-                       .filter(addon=addon, user=user).order_by('created'))
-        if not reviews:
-            continue
-
+    pairs = set(pairs)
+    grouped = defaultdict(list)
+    for review in (Review.objects.valid().no_cache().using(using)
+                   .filter(addon__in=set(a for a, u in pairs),
+                           user__in=set(u for a, u in pairs))
+                   .order_by('created')):
+        if (review.addon_id, review.user_id) in pairs:
+            grouped[review.addon_id, review.user_id].append(review)
+
+    # Only write the reviews that changed, grouped by their new values.
+    changed = defaultdict(list)
+    for reviews in grouped.values():
+        last = len(reviews) - 1
         for idx, review in enumerate(reviews):
-            review.previous_count = idx
-            review.is_latest = False
-        reviews[-1].is_latest = True
+            values = (idx, idx == last)
+            if (review.previous_count, review.is_latest) != values:
+                changed[values].append(review)
+
+    for (previous_count, is_latest), reviews in changed.items():
+        (Review.objects.no_cache().using(using)
+         .filter(pk__in=[r.pk for r in reviews])
+         .update(previous_count=previous_count, is_latest=is_latest))
+        Review.objects.invalidate(*reviews)
+
+
+def queue_aggregates(*addons):
+    """
+    Recompute the aggregates of `addons` in REVIEW_AGGREGATES_DELAY seconds.
+    The add-ons that are already waiting are left alone: they'll pick up the
+    new reviews when their turn comes.
+    """
+    delay = settings.REVIEW_AGGREGATES_DELAY
+    # The key expires on its own in case the task gets lost.
+    dirty = [addon for addon in addons
+             if cache.add(DIRTY_KEY % addon, 1, delay * 10)]
+    if dirty:
+        addon_review_aggregates.apply_async(args=dirty,
+                                            kwargs={'using': 'default'},
+                                            countdown=delay)
+
+
+def _get_bayesian_avg():
+    f = lambda: Addon.objects.aggregate(rating=Avg('average_rating'),
+                                        reviews=Avg('total_reviews'))
+    return caching.cached(f, 'task.bayes.avg', 60 * 60 * 60)
+
+
+def _bayesian_rating(avg, total_reviews, average_rating):
+    if not total_reviews:
+        return 0
+    mc = avg['reviews'] * avg['rating']
+    return ((mc + total_reviews * average_rating) /
+            (avg['reviews'] + total_reviews))
 
-        for review in reviews:
-            review.save()
+
+def _bulk_update_addons(values, using=None):
+    """
+    Write `values`, a {addon id: {field: value}} dict where every add-on has
+    the same fields, with a single UPDATE.
+    """
+    if not values:
+        return
+    fields = sorted(values.values()[0])
+    ids = sorted(values)
+    sets, params = [], []
+    for field in fields:
+        column = Addon._meta.get_field(field).column
+        sets.append('%s = CASE id %s END' % (
+            column, ' '.join(['WHEN %s THEN %s'] * len(ids))))
+        for id in ids:
+            params.extend([id, values[id][field]])
+    sql = 'UPDATE %s SET %s WHERE id IN (%s)' % (
+        Addon._meta.db_table, ', '.join(sets), ', '.join(['%s'] * len(ids)))
+    cursor = connections[using or 'default'].cursor()
+    cursor.execute(sql, params + ids)
 
 
 @task
 def addon_review_aggregates(*addons, **kw):
+    """
+    Recompute the total reviews, average rating, bayesian rating and grouped
+    ratings of `addons` with a few grouped queries, and write the add-ons that
+    changed with a single UPDATE.
+    """
     log.info('[%s@%s] Updating total reviews and average ratings.' %
              (len(addons), addon_review_aggregates.rate_limit))
     using = kw.get('using')
-    addon_objs = list(Addon.objects.filter(pk__in=addons))
+    # New reviews from now on need another run.
+    cache.delete_many([DIRTY_KEY % addon for addon in addons])
+
     stats = dict((x[0], x[1:]) for x in
                  Review.objects.valid().no_cache().using(using)
                  .filter(addon__in=addons, is_latest=True)
                  .values_list('addon')
                  .annotate(Avg('rating'), Count('addon')))
-    for addon in addon_objs:
-        rating, reviews = stats.get(addon.id, [0, 0])
-        addon.update(total_reviews=reviews, average_rating=rating)
+    avg = _get_bayesian_avg()
 
-    # Delay bayesian calculations to avoid slave lag.
-    addon_bayesian_rating.apply_async(args=addons, countdown=5)
-    addon_grouped_rating.apply_async(args=addons, kwargs={'using': using})
+    values, changed = {}, []
+    for addon in Addon.objects.no_cache().using(using).filter(pk__in=addons):
+        rating, reviews = stats.get(addon.id, [0, 0])
+        new = {'total_reviews': reviews, 'average_rating': rating}
+        # Rating can be NULL in the DB, so don't update it if it's not there.
+        new['bayesian_rating'] = (
+            addon.bayesian_rating if avg['rating'] is None else
+            _bayesian_rating(avg, reviews, rating))
+        if any(getattr(addon, k) != v for k, v in new.items()):
+            values[addon.id] = new
+            changed.append(addon)
+
+    _bulk_update_addons(values, using=using)
+    if changed:
+        Addon.objects.invalidate(*changed)
+        # The UPDATE doesn't send post_save, reindex like its handlers would.
+        webapps = [a.id for a in changed if a.type == amo.ADDON_WEBAPP]
+        others = [a.id for a in changed if a.type != amo.ADDON_WEBAPP]
+        if webapps:
+            from mkt.webapps.tasks import index_webapps
+            index_webapps.delay(webapps)
+        if others:
+            from addons.tasks import index_addons
+            index_addons.delay(others)
+
+    GroupedRating.set_many(addons, using=using)
 
 
 @task
 def addon_bayesian_rating(*addons, **kw):
     log.info('[%s@%s] Updating bayesian ratings.' %
              (len(addons), addon_bayesian_rating.rate_limit))
-    f = lambda: Addon.objects.aggregate(rating=Avg('average_rating'),
-                                        reviews=Avg('total_reviews'))
-    avg = caching.cached(f, 'task.bayes.avg', 60 * 60 * 60)
+    avg = _get_bayesian_avg()
     # Rating can be NULL in the DB, so don't update it if it's not there.
     if avg['rating'] is None:
         return
-    mc = avg['reviews'] * avg['rating']
-    for addon in Addon.objects.no_cache().filter(id__in=addons):
-        if addon.average_rating is None:
-            # Ignoring addons with no average rating.
-            continue
-
-        q = Addon.objects.filter(id=addon.id)
-        if addon.total_reviews:
-            num = mc + F('total_reviews') * F('average_rating')
-            denom = avg['reviews'] + F('total_reviews')
-            q.update(bayesian_rating=num / denom)
-        else:
-            q.update(bayesian_rating=0)
+    values = dict(
+        (id, {'bayesian_rating': _bayesian_rating(avg, total, rating)})
+        for id, total, rating in Addon.objects.no_cache()
+        .filter(id__in=addons, average_rating__isnull=False)
+        .values_list('id', 'total_reviews', 'average_rating'))
+    _bulk_update_addons(values)
 
 
 @task
@@ -86,6 +175,4 @@ def addon_grouped_rating(*addons, **kw):
     # We stick this all in memcached since it's not critical.
     log.info('[%s@%s] Updating addon grouped ratings.' %
              (len(addons), addon_grouped_rating.rate_limit))
-    using = kw.get('using')
-    for addon in addons:
-        GroupedRating.set(addon, using=using)
+    GroupedRating.set_many(addons, using=kw.get('using'))
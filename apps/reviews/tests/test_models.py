@@ -1,5 +1,6 @@
 from django.utils import translation
 
+import mock
 from nose.tools import eq_
 import test_utils
 
@@ -52,6 +53,12 @@ class TestGroupedRating(amo.tests.TestCase):
         tasks.addon_grouped_rating(1865)
         eq_(GroupedRating.get(1865, update_none=False), self.grouped_ratings)
 
+    def test_set_many(self):
+        eq_(GroupedRating.set_many([1865, 3]),
+            {1865: self.grouped_ratings,
+             3: [(1, 0), (2, 0), (3, 0), (4, 0), (5, 0)]})
+        eq_(GroupedRating.get(1865, update_none=False), self.grouped_ratings)
+
     def test_update_none(self):
         eq_(GroupedRating.get(1865, update_none=False), None)
         eq_(GroupedRating.get(1865, update_none=True), self.grouped_ratings)
@@ -107,3 +114,52 @@ class TestRefreshTest(amo.tests.ESTestCase):
         self.refresh()
 
         eq_(self.get_bayesian_rating(), 0.0)
+
+
+class TestAggregates(amo.tests.TestCase):
+    fixtures = ['base/users']
+
+    def setUp(self):
+        self.addon = Addon.objects.create(type=amo.ADDON_EXTENSION)
+        self.user = UserProfile.objects.all()[0]
+
+    def test_update_denorm(self):
+        r1 = Review.objects.create(addon=self.addon, user=self.user, rating=2)
+        r2 = Review.objects.create(addon=self.addon, user=self.user, rating=4)
+        Review.objects.no_cache().filter(pk=r2.pk).update(is_latest=False,
+                                                          previous_count=0)
+        tasks.update_denorm((self.addon.pk, self.user.pk))
+        r1, r2 = Review.objects.no_cache().order_by('created')
+        eq_((r1.previous_count, r1.is_latest), (0, False))
+        eq_((r2.previous_count, r2.is_latest), (1, True))
+
+    def test_aggregates(self):
+        other = Addon.objects.create(type=amo.ADDON_EXTENSION)
+        Review.objects.create(addon=self.addon, user=self.user, rating=4)
+        Review.objects.create(addon=other, user=self.user, rating=2)
+        Addon.objects.no_cache().update(total_reviews=0, average_rating=0)
+        tasks.addon_review_aggregates(self.addon.pk, other.pk)
+        addon = Addon.objects.no_cache().get(pk=self.addon.pk)
+        eq_((addon.total_reviews, addon.average_rating), (1, 4))
+        other = Addon.objects.no_cache().get(pk=other.pk)
+        eq_((other.total_reviews, other.average_rating), (1, 2))
+        eq_(GroupedRating.get(other.pk, update_none=False)[1], (2, 1))
+
+    @mock.patch('addons.tasks.index_addons.delay')
+    @mock.patch('mkt.webapps.tasks.index_webapps.delay')
+    def test_aggregates_reindex(self, index_webapps, index_addons):
+        app = Addon.objects.create(type=amo.ADDON_WEBAPP)
+        unchanged = Addon.objects.create(type=amo.ADDON_WEBAPP)
+        Review.objects.create(addon=self.addon, user=self.user, rating=4)
+        Review.objects.create(addon=app, user=self.user, rating=2)
+        Addon.objects.no_cache().update(total_reviews=0, average_rating=0)
+        tasks.addon_review_aggregates(self.addon.pk, app.pk, unchanged.pk)
+        index_webapps.assert_called_with([app.pk])
+        index_addons.assert_called_with([self.addon.pk])
+
+    @mock.patch('reviews.tasks.addon_review_aggregates.apply_async')
+    def test_queue_aggregates_debounced(self, apply_async):
+        tasks.queue_aggregates(self.addon.pk)
+        tasks.queue_aggregates(self.addon.pk)
+        eq_(apply_async.call_count, 1)
+        eq_(apply_async.call_args[1]['args'], [self.addon.pk])
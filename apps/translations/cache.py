@@ -0,0 +1,189 @@
+"""
+A cache for Translation rows, keyed on (translation id, locale).
+
+Lookups go through a per-request memo first, then through the cache backend
+shared by all workers, and only hit the database for what is left. Entries
+are invalidated whenever a Translation is saved or deleted, and once again
+after the request: until its transaction is committed, a concurrent request
+can still read the old rows and put them back in the cache.
+"""
+from threading import local
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_delete, post_save
+from django.utils.encoding import smart_str
+
+import commonware.log
+
+from .models import Translation
+from .tasks import delete_cached_translations
+
+
+log = commonware.log.getLogger('z.translations')
+
+# Pseudo-locale under which every locale of a given id is stored.
+ALL_LOCALES = '*'
+
+# Stored in place of a row so that misses are cached as well.
+MISSING = 0
+
+trans_fields = [f.attname for f in Translation._meta.fields]
+
+_local = local()
+
+
+def make_key(id, locale):
+    """Returns the cache key for a translation id and locale."""
+    return smart_str('trans:%s:%s' % (id, locale.lower()))
+
+
+def _get_memo():
+    """
+    Returns the per-request memo, or None when we're not inside a request
+    (celery tasks, cron jobs...): we don't want to keep stale translations
+    around for the lifetime of a worker.
+    """
+    return getattr(_local, 'memo', None)
+
+
+def start_memo(sender=None, **kwargs):
+    _local.memo = {}
+
+
+def clear_memo(sender=None, **kwargs):
+    _local.memo = None
+
+
+def _from_row(row):
+    return Translation(**dict(zip(trans_fields, row)))
+
+
+def _lookup(keys):
+    """
+    Fetch ``keys`` from the memo, then from the cache backend. Returns a
+    dict of the values found, the missing keys are simply not present.
+    """
+    memo = _get_memo()
+    found = {}
+    if memo is not None:
+        found.update((k, memo[k]) for k in keys if k in memo)
+    remaining = [k for k in keys if k not in found]
+    if remaining:
+        cached = cache.get_many(remaining)
+        found.update(cached)
+        if memo is not None:
+            memo.update(cached)
+    return found
+
+
+def _store(values):
+    """Store a {key: value} dict in the memo and in the cache backend."""
+    if not values:
+        return
+    memo = _get_memo()
+    if memo is not None:
+        memo.update(values)
+    cache.set_many(values, settings.TRANSLATIONS_CACHE_TIMEOUT)
+
+
+def get_translations(pairs):
+    """
+    Returns a dict mapping each (id, locale) pair to its Translation, or to
+    None if that locale doesn't exist for that id. Locales are compared
+    case-insensitively, like MySQL does.
+    """
+    pairs = set((id, locale.lower()) for id, locale in pairs)
+    keys = dict((make_key(*pair), pair) for pair in pairs)
+    found = _lookup(keys.keys())
+
+    rv = {}
+    for key, pair in keys.items():
+        if key in found:
+            rv[pair] = found[key] and _from_row(found[key]) or None
+
+    missing = [pair for pair in pairs if pair not in rv]
+    if missing:
+        ids = set(id for id, locale in missing)
+        locales = set(locale for id, locale in missing)
+        qs = (Translation.objects.no_cache()
+              .filter(id__in=ids, locale__in=locales)
+              .values_list(*trans_fields))
+        rows = dict(((row[trans_fields.index('id')],
+                      row[trans_fields.index('locale')].lower()), row)
+                    for row in qs)
+        to_store = {}
+        for pair in missing:
+            row = rows.get(pair)
+            rv[pair] = row and _from_row(row) or None
+            to_store[make_key(*pair)] = row or MISSING
+        _store(to_store)
+    return rv
+
+
+def get_all_locales(ids):
+    """
+    Returns a dict mapping each translation id to the list of all its
+    Translations, whatever their locale.
+    """
+    ids = set(ids)
+    keys = dict((make_key(id, ALL_LOCALES), id) for id in ids)
+    found = _lookup(keys.keys())
+
+    rv = {}
+    for key, id in keys.items():
+        if key in found:
+            rv[id] = map(_from_row, found[key])
+
+    missing = ids.difference(rv)
+    if missing:
+        rows = dict((id, []) for id in missing)
+        qs = (Translation.objects.no_cache().filter(id__in=missing)
+              .values_list(*trans_fields))
+        for row in qs:
+            rows[row[trans_fields.index('id')]].append(row)
+        for id, id_rows in rows.items():
+            rv[id] = map(_from_row, id_rows)
+        _store(dict((make_key(id, ALL_LOCALES), id_rows)
+                    for id, id_rows in rows.items()))
+    return rv
+
+
+def invalidate(id, locale=None):
+    """
+    Invalidate cached translations for ``id``. If ``locale`` is None, the
+    locales we know about for that id are all invalidated.
+    """
+    if locale is None:
+        locales = set(t.locale for t in get_all_locales([id])[id])
+    else:
+        locales = [locale]
+    keys = [make_key(id, l) for l in locales]
+    keys.append(make_key(id, ALL_LOCALES))
+
+    memo = _get_memo()
+    if memo is not None:
+        for key in keys:
+            memo.pop(key, None)
+    log.debug('Invalidating translations: %s' % keys)
+    cache.delete_many(keys)
+    delete_cached_translations.delay(keys)
+
+
+def invalidate_translation(sender, instance, **kw):
+    if (kw.get('raw') or not isinstance(instance, Translation) or
+            instance.id is None):
+        return
+    invalidate(instance.id, instance.locale)
+
+
+request_started.connect(start_memo, dispatch_uid='translations_start_memo')
+request_finished.connect(clear_memo, dispatch_uid='translations_clear_memo')
+
+# PurifiedTranslation & co. are proxies sending signals with their own class as
+# the sender, so we can't filter on it.
+post_save.connect(invalidate_translation,
+                  dispatch_uid='translations_cache_invalidate_save')
+post_delete.connect(invalidate_translation,
+                    dispatch_uid='translations_cache_invalidate_delete')
@@ -22,6 +22,10 @@ class TranslationManager(amo.models.ManagerBase):
         qs = Translation.objects.filter(id__in=filter(None, ids),
                                         locale=locale)
         qs.update(localized_string=None, localized_string_clean=None)
+        # update() doesn't send any signal, invalidate the cache ourselves.
+        from .cache import invalidate
+        for id in filter(None, ids):
+            invalidate(id, locale)
 
 
 class Translation(amo.models.ModelBase):
@@ -0,0 +1,18 @@
+from django.core.cache import cache
+
+import commonware.log
+
+from lib.post_request_task.task import task as post_request_task
+
+
+task_log = commonware.log.getLogger('z.task')
+
+
+@post_request_task(merge_ids=True)
+def delete_cached_translations(keys, **kw):
+    """
+    Drop the cache entries of the translations changed during a request,
+    once its transaction is committed.
+    """
+    task_log.debug('Deleting cached translations: %s' % keys)
+    cache.delete_many(keys)
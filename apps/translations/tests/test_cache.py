@@ -0,0 +1,84 @@
+from django.core.cache import cache as django_cache
+from django.utils import translation
+
+from mock import patch
+from nose.tools import eq_
+from test_utils import trans_eq, TestCase
+
+from testapp.models import TranslatedModel
+from translations import cache
+from translations.models import Translation
+
+
+class TestTranslationCache(TestCase):
+    fixtures = ['testapp/test_models.json']
+
+    def setUp(self):
+        super(TestTranslationCache, self).setUp()
+        django_cache.clear()
+        translation.activate('en-US')
+
+    def tearDown(self):
+        cache.clear_memo()
+        translation.deactivate()
+        super(TestTranslationCache, self).tearDown()
+
+    def test_get_translations(self):
+        rv = cache.get_translations([(1, 'en-US'), (1, 'de'), (1, 'fr')])
+        eq_(unicode(rv[(1, 'en-us')]), 'some name')
+        eq_(unicode(rv[(1, 'de')]), 'German!! (unst unst)')
+        eq_(rv[(1, 'fr')], None)
+
+    def test_get_translations_cached(self):
+        cache.get_translations([(1, 'en-US'), (1, 'fr')])
+        with self.assertNumQueries(0):
+            rv = cache.get_translations([(1, 'en-US'), (1, 'fr')])
+        eq_(unicode(rv[(1, 'en-us')]), 'some name')
+        eq_(rv[(1, 'fr')], None)
+
+    def test_get_all_locales(self):
+        rv = cache.get_all_locales([1, 3])
+        eq_(sorted(t.locale for t in rv[1]), ['de', 'en-US'])
+        eq_(sorted(t.locale for t in rv[3]), ['en-US', 'fr'])
+        with self.assertNumQueries(0):
+            eq_(len(cache.get_all_locales([1])[1]), 2)
+
+    def test_memo(self):
+        cache.start_memo()
+        cache.get_translations([(1, 'en-US')])
+        with patch.object(django_cache, 'get_many') as get_many:
+            cache.get_translations([(1, 'en-US')])
+            assert not get_many.called
+        cache.clear_memo()
+        eq_(cache._get_memo(), None)
+
+    def test_invalidated_on_save(self):
+        cache.get_translations([(1, 'en-US'), (1, 'fr')])
+        cache.get_all_locales([1])
+        Translation.objects.create(id=1, locale='fr', localized_string='Oui')
+        eq_(unicode(cache.get_translations([(1, 'fr')])[(1, 'fr')]), 'Oui')
+        eq_(len(cache.get_all_locales([1])[1]), 3)
+
+    @patch('translations.cache.delete_cached_translations.delay')
+    def test_invalidated_after_request(self, delete):
+        Translation.objects.create(id=1, locale='fr', localized_string='Oui')
+        delete.assert_called_with([cache.make_key(1, 'fr'),
+                                   cache.make_key(1, cache.ALL_LOCALES)])
+
+    def test_invalidated_on_delete(self):
+        cache.get_translations([(1, 'de')])
+        Translation.objects.get(id=1, locale='de').delete()
+        eq_(cache.get_translations([(1, 'de')])[(1, 'de')], None)
+
+    def test_invalidated_on_remove_for(self):
+        o = TranslatedModel.objects.get(id=1)
+        cache.get_translations([(1, 'de')])
+        Translation.objects.remove_for(o, 'de')
+        eq_(cache.get_translations([(1, 'de')])[(1, 'de')].localized_string,
+            None)
+
+    def test_transformer_fallback(self):
+        translation.activate('de')
+        o = TranslatedModel.objects.get(id=1)
+        trans_eq(o.name, 'German!! (unst unst)', 'de')
+        trans_eq(o.description, 'some description', 'en-US')
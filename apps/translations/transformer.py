@@ -1,87 +1,79 @@
 from django.conf import settings
-from django.db import connections, models, router
+from django.db import models
 from django.utils import translation
 
-from translations.models import Translation
+from translations import cache
 from translations.fields import TranslatedField
 
-isnull = """IF(!ISNULL({t1}.localized_string), {t1}.{col}, {t2}.{col})
-            AS {name}_{col}"""
-join = """LEFT OUTER JOIN translations {t}
-          ON ({t}.id={model}.{name} AND {t}.locale={locale})"""
-no_locale_join = """LEFT OUTER JOIN translations {t}
-                    ON {t}.id={model}.{name}"""
-
-trans_fields = [f.name for f in Translation._meta.fields]
-
-
-def build_query(model, connection):
-    qn = connection.ops.quote_name
-    selects, joins, params = [], [], []
 
+def get_fallback(model):
     # The model can define a fallback locale (which may be a Field).
     if hasattr(model, 'get_fallback'):
-        fallback = model.get_fallback()
-    else:
-        fallback = settings.LANGUAGE_CODE
-
-    if not hasattr(model._meta, 'translated_fields'):
-        model._meta.translated_fields = [f for f in model._meta.fields
-                                         if isinstance(f, TranslatedField)]
-
-    # Add the selects and joins for each translated field on the model.
-    for field in model._meta.translated_fields:
-        if isinstance(fallback, models.Field):
-            fallback_str = '%s.%s' % (qn(model._meta.db_table),
-                                      qn(fallback.column))
-        else:
-            fallback_str = '%s'
-
-        name = field.column
-        d = {'t1': 't1_' + name, 't2': 't2_' + name,
-             'model': qn(model._meta.db_table), 'name': name}
-
-        selects.extend(isnull.format(col=f, **d) for f in trans_fields)
-
-        joins.append(join.format(t=d['t1'], locale='%s', **d))
-        params.append(translation.get_language())
+        return model.get_fallback()
+    return settings.LANGUAGE_CODE
 
-        if field.require_locale:
-            joins.append(join.format(t=d['t2'], locale=fallback_str, **d))
-            if not isinstance(fallback, models.Field):
-                params.append(fallback)
-        else:
-            joins.append(no_locale_join.format(t=d['t2'], **d))
 
-    # ids will be added later on.
-    sql = """SELECT {model}.{pk}, {selects} FROM {model} {joins}
-             WHERE {model}.{pk} IN {{ids}}"""
-    s = sql.format(selects=','.join(selects), joins='\n'.join(joins),
-                   model=qn(model._meta.db_table), pk=model._meta.pk.column)
-    return s, params
+def is_usable(trans):
+    return (trans is not None and trans.id is not None and
+            trans.localized_string is not None)
 
 
 def get_trans(items):
+    """
+    Attach translations in the current language to ``items``, falling back
+    to the model's fallback locale, or to any locale if the field doesn't
+    require one. Translations come from ``translations.cache``.
+    """
     if not items:
         return
 
     model = items[0].__class__
-    # FIXME: if we knew which db the queryset we are transforming used, we could
-    # make sure we are re-using the same one.
-    dbname = router.db_for_read(model)
-    connection = connections[dbname]
-    sql, params = build_query(model, connection)
-    item_dict = dict((item.pk, item) for item in items)
-    ids = ','.join(map(str, item_dict.keys()))
+    if not hasattr(model._meta, 'translated_fields'):
+        model._meta.translated_fields = [f for f in model._meta.fields
+                                         if isinstance(f, TranslatedField)]
+    fields = model._meta.translated_fields
+    lang = translation.get_language()
+    fallback = get_fallback(model)
 
-    cursor = connection.cursor()
-    cursor.execute(sql.format(ids='(%s)' % ids), tuple(params))
-    step = len(trans_fields)
-    for row in cursor.fetchall():
-        # We put the item's pk as the first selected field.
-        item = item_dict[row[0]]
-        for index, field in enumerate(model._meta.translated_fields):
-            start = 1 + step * index
-            t = Translation(*row[start:start+step])
-            if t.id is not None and t.localized_string is not None:
-                setattr(item, field.name, t)
+    def item_fallback(item):
+        if isinstance(fallback, models.Field):
+            return getattr(item, fallback.attname, None)
+        return fallback
+
+    # Gather everything we need for all the items first so that we only do
+    # one round-trip to the cache (and one to the db) for the whole list.
+    pairs, any_locale_ids = set(), set()
+    for item in items:
+        for field in fields:
+            trans_id = getattr(item, field.attname, None)
+            if trans_id is None:
+                continue
+            if lang:
+                pairs.add((trans_id, lang))
+            if field.require_locale:
+                if item_fallback(item):
+                    pairs.add((trans_id, item_fallback(item)))
+            else:
+                any_locale_ids.add(trans_id)
+
+    by_locale = cache.get_translations(pairs)
+    by_id = cache.get_all_locales(any_locale_ids)
+
+    for item in items:
+        for field in fields:
+            trans_id = getattr(item, field.attname, None)
+            if trans_id is None:
+                continue
+            candidates = []
+            if lang:
+                candidates.append(by_locale.get((trans_id, lang.lower())))
+            if field.require_locale:
+                if item_fallback(item):
+                    candidates.append(by_locale.get(
+                        (trans_id, item_fallback(item).lower())))
+            else:
+                candidates.extend(by_id.get(trans_id, []))
+            for t in candidates:
+                if is_usable(t):
+                    setattr(item, field.name, t)
+                    break
@@ -0,0 +1,239 @@
+"""
+Index of what a user is entitled to: the add-ons they purchased, with the
+type of the purchase, and the add-ons they are an author of, with their
+roles. Access control (`acl.check_addon_ownership`, `Addon.has_author`) and
+the API serializers read it.
+
+The add-on ids are kept in sorted arrays searched with bisect, the roles as
+bitmasks. The index is built from the master and cached under
+`entitlements:<user id>`, tagged with the generation of the user, a random
+token cached under `entitlements:gen:<user id>`. An entry is only used if
+its tag is the current generation.
+
+Saving or deleting a purchase or an author of the user replaces the
+generation right away, and again once the request or task is over, after
+the transaction committed: an index built meanwhile from the old rows is
+tagged with a generation that's no longer current, however late it's
+written. During a request, the index is also kept in memory after it's been
+loaded once.
+"""
+import bisect
+import threading
+import uuid
+from array import array
+from itertools import izip
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+
+from celery.signals import task_postrun, task_prerun
+
+import amo
+
+
+_local = threading.local()
+
+
+def _key(user_id):
+    return 'entitlements:%s' % user_id
+
+
+def _gen_key(user_id):
+    return 'entitlements:gen:%s' % user_id
+
+
+def _find(ids, addon_id):
+    """Return the position of `addon_id` in the sorted array `ids`."""
+    i = bisect.bisect_left(ids, addon_id)
+    if i < len(ids) and ids[i] == addon_id:
+        return i
+
+
+class Entitlements(object):
+
+    def __init__(self, purchases=(), authors=()):
+        """
+        `purchases` are (add-on id, purchase type) pairs, `authors` are
+        (add-on id, role) pairs.
+        """
+        self.purchase_ids = array('l')
+        self.purchase_types = array('B')
+        self.author_ids = array('l')
+        self.author_roles = array('H')
+        for addon_id, type_ in purchases:
+            self.add_purchase(addon_id, type_)
+        for addon_id, role in authors:
+            self.add_author(addon_id, role)
+
+    def purchase_type(self, addon_id):
+        i = _find(self.purchase_ids, addon_id)
+        if i is not None:
+            return self.purchase_types[i]
+
+    def purchased(self):
+        """The ids of the add-ons purchased and not refunded, sorted."""
+        return [addon_id for addon_id, type_
+                in izip(self.purchase_ids, self.purchase_types)
+                if type_ == amo.CONTRIB_PURCHASE]
+
+    def has_role(self, addon_id, roles=None):
+        """
+        True if the user is an author of `addon_id` with any of `roles`, or
+        with any role if `roles` is None.
+        """
+        i = _find(self.author_ids, addon_id)
+        if i is None:
+            return False
+        if roles is None:
+            return True
+        return bool(self.author_roles[i] & sum(1 << role for role in roles))
+
+    def add_purchase(self, addon_id, type_):
+        i = bisect.bisect_left(self.purchase_ids, addon_id)
+        if i < len(self.purchase_ids) and self.purchase_ids[i] == addon_id:
+            self.purchase_types[i] = type_
+        else:
+            self.purchase_ids.insert(i, addon_id)
+            self.purchase_types.insert(i, type_)
+
+    def add_author(self, addon_id, role):
+        i = bisect.bisect_left(self.author_ids, addon_id)
+        if i < len(self.author_ids) and self.author_ids[i] == addon_id:
+            self.author_roles[i] |= 1 << role
+        else:
+            self.author_ids.insert(i, addon_id)
+            self.author_roles.insert(i, 1 << role)
+
+    def dumps(self):
+        return (self.purchase_ids, self.purchase_types, self.author_ids,
+                self.author_roles)
+
+    @classmethod
+    def loads(cls, data):
+        obj = cls()
+        (obj.purchase_ids, obj.purchase_types, obj.author_ids,
+         obj.author_roles) = data
+        return obj
+
+
+def _memo():
+    return _local.__dict__.setdefault('entitlements', {})
+
+
+def _pending():
+    """The users whose entitlements changed during the current scope."""
+    return _local.__dict__.setdefault('pending', set())
+
+
+def clear_local(**kw):
+    """Forget the indexes loaded by the current thread."""
+    _memo().clear()
+
+
+def start(scope):
+    """
+    Start a request or a task, unless one is already running in this thread
+    (tasks run eagerly during a request).
+    """
+    if getattr(_local, 'scope', None) is None:
+        _local.scope = scope
+        clear_local()
+        _pending().clear()
+
+
+def finish(scope):
+    """Finish a request or a task, once its transaction committed."""
+    if getattr(_local, 'scope', None) == scope:
+        _local.scope = None
+        clear_local()
+        pending = _pending()
+        while pending:
+            _new_generation(pending.pop())
+
+
+def load(user_id):
+    """Build the index of `user_id` from the master database."""
+    from addons.models import AddonUser
+    from amo.models import use_master
+    from market.models import AddonPurchase
+
+    with use_master():
+        purchases = list(AddonPurchase.objects.no_cache()
+                         .filter(user=user_id).values_list('addon', 'type'))
+        authors = list(AddonUser.objects.no_cache()
+                       .filter(user=user_id).values_list('addon', 'role'))
+    return Entitlements(purchases, authors)
+
+
+def _get(user_id):
+    timeout = settings.ENTITLEMENTS_CACHE_TIMEOUT
+    cached = cache.get_many([_gen_key(user_id), _key(user_id)])
+    gen = cached.get(_gen_key(user_id))
+    if gen is None:
+        # Whoever adds it first wins.
+        cache.add(_gen_key(user_id), uuid.uuid4().hex, timeout)
+        gen = cache.get(_gen_key(user_id))
+    entry = cached.get(_key(user_id))
+    if gen is not None and entry is not None and entry[0] == gen:
+        return Entitlements.loads(entry[1])
+    entitlements = load(user_id)
+    if gen is not None:
+        cache.set(_key(user_id), (gen, entitlements.dumps()), timeout)
+    return entitlements
+
+
+def get_entitlements(user):
+    """Return the Entitlements of `user`, a UserProfile."""
+    if getattr(_local, 'scope', None) != 'request':
+        # Nothing would forget them in long running processes.
+        return _get(user.pk)
+    memo = _memo()
+    if user.pk not in memo:
+        memo[user.pk] = _get(user.pk)
+    return memo[user.pk]
+
+
+def _new_generation(user_id):
+    cache.set(_gen_key(user_id), uuid.uuid4().hex,
+              settings.ENTITLEMENTS_CACHE_TIMEOUT)
+
+
+def invalidate(user_id):
+    _memo().pop(user_id, None)
+    _new_generation(user_id)
+    if getattr(_local, 'scope', None) is not None:
+        # Once more after the commit.
+        _pending().add(user_id)
+
+
+def changed(sender, instance, **kw):
+    """A purchase or an author was saved or deleted."""
+    if kw.get('raw'):
+        return
+    invalidate(instance.user_id)
+    original = getattr(instance, '_original_user_id', None)
+    if original not in (None, instance.user_id):
+        invalidate(original)
+
+
+def request_began(**kw):
+    start('request')
+
+
+def request_ended(**kw):
+    finish('request')
+
+
+def task_began(**kw):
+    start('task')
+
+
+def task_ended(**kw):
+    finish('task')
+
+
+request_started.connect(request_began, dispatch_uid='entitlements_start')
+request_finished.connect(request_ended, dispatch_uid='entitlements_finish')
+task_prerun.connect(task_began, dispatch_uid='entitlements_task_start')
+task_postrun.connect(task_ended, dispatch_uid='entitlements_task_finish')
@@ -24,7 +24,6 @@ from django.utils.functional import lazy
 import caching.base as caching
 import commonware.log
 import tower
-from cache_nuggets.lib import memoize
 from tower import ugettext as _
 
 import amo
@@ -34,6 +33,7 @@ from amo.urlresolvers import reverse
 from translations.fields import NoLinksField, save_signal
 from translations.models import Translation
 from translations.query import order_by_translation
+from users.entitlements import get_entitlements
 
 
 log = commonware.log.getLogger('z.users')
@@ -484,24 +484,10 @@ class UserProfile(amo.models.OnChangeMixin, amo.models.ModelBase):
 
     def purchase_ids(self):
         """
-        I'm special casing this because we use purchase_ids a lot in the site
-        and we are not caching empty querysets in cache-machine.
-        That means that when the site is first launched we are having a
-        lot of empty queries hit.
-
-        We can probably do this in smarter fashion by making cache-machine
-        cache empty queries on an as need basis.
+        The ids of the add-ons purchased by the user, from the entitlements
+        index that's shared by the whole request, see `users.entitlements`.
         """
-        # Circular import
-        from market.models import AddonPurchase
-
-        @memoize(prefix='users:purchase-ids')
-        def ids(pk):
-            return (AddonPurchase.objects.filter(user=pk)
-                                 .values_list('addon_id', flat=True)
-                                 .filter(type=amo.CONTRIB_PURCHASE)
-                                 .order_by('pk'))
-        return ids(self.pk)
+        return get_entitlements(self).purchased()
 
     @contextmanager
     def activate_lang(self):
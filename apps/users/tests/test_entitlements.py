@@ -0,0 +1,127 @@
+from django.core.cache import cache
+
+from nose.tools import eq_, ok_
+
+import amo
+import amo.tests
+from addons.models import AddonUser
+from market.models import AddonPurchase
+from users import entitlements
+from users.entitlements import Entitlements, get_entitlements
+
+
+class TestEntitlements(amo.tests.TestCase):
+
+    def test_lookups(self):
+        e = Entitlements(purchases=[(7, amo.CONTRIB_REFUND),
+                                    (3, amo.CONTRIB_PURCHASE),
+                                    (5, amo.CONTRIB_PURCHASE)],
+                         authors=[(9, amo.AUTHOR_ROLE_DEV),
+                                  (2, amo.AUTHOR_ROLE_OWNER)])
+        eq_(list(e.purchase_ids), [3, 5, 7])
+        eq_(e.purchased(), [3, 5])
+        eq_(e.purchase_type(7), amo.CONTRIB_REFUND)
+        eq_(e.purchase_type(4), None)
+        ok_(e.has_role(9))
+        ok_(e.has_role(9, [amo.AUTHOR_ROLE_OWNER, amo.AUTHOR_ROLE_DEV]))
+        ok_(not e.has_role(9, [amo.AUTHOR_ROLE_OWNER]))
+        ok_(not e.has_role(1))
+
+    def test_dumps(self):
+        e = Entitlements(purchases=[(3, amo.CONTRIB_PURCHASE)],
+                         authors=[(2, amo.AUTHOR_ROLE_OWNER)])
+        e = Entitlements.loads(e.dumps())
+        eq_(e.purchased(), [3])
+        ok_(e.has_role(2, [amo.AUTHOR_ROLE_OWNER]))
+
+
+class TestGetEntitlements(amo.tests.TestCase):
+
+    def setUp(self):
+        self.user = amo.tests.user_factory()
+        self.addon = amo.tests.addon_factory()
+
+    def reload(self):
+        entitlements.clear_local()
+        return get_entitlements(self.user)
+
+    def test_loaded_once(self):
+        AddonUser.objects.create(addon=self.addon, user=self.user)
+        entitlements.start('request')
+        with self.assertNumQueries(2):
+            e = get_entitlements(self.user)
+        with self.assertNumQueries(0):
+            ok_(get_entitlements(self.user) is e)
+            # From the cache in the next request.
+            ok_(self.reload().has_role(self.addon.id))
+
+    def test_not_kept_outside_requests(self):
+        ok_(not get_entitlements(self.user).has_role(self.addon.id))
+        # Another process adds an author.
+        AddonUser.objects.bulk_create([AddonUser(addon=self.addon,
+                                                 user=self.user)])
+        entitlements.invalidate(self.user.pk)
+        ok_(get_entitlements(self.user).has_role(self.addon.id))
+
+    def test_purchase(self):
+        eq_(self.reload().purchased(), [])
+        purchase = AddonPurchase.objects.create(addon=self.addon,
+                                                user=self.user)
+        eq_(self.reload().purchased(), [self.addon.id])
+        purchase.update(type=amo.CONTRIB_REFUND)
+        eq_(self.reload().purchase_type(self.addon.id), amo.CONTRIB_REFUND)
+        eq_(self.reload().purchased(), [])
+
+    def test_author(self):
+        ok_(not self.reload().has_role(self.addon.id))
+        author = AddonUser.objects.create(addon=self.addon, user=self.user,
+                                          role=amo.AUTHOR_ROLE_DEV)
+        ok_(self.reload().has_role(self.addon.id, [amo.AUTHOR_ROLE_DEV]))
+        author.role = amo.AUTHOR_ROLE_VIEWER
+        author.save()
+        ok_(not self.reload().has_role(self.addon.id,
+                                       [amo.AUTHOR_ROLE_DEV]))
+        author.delete()
+        ok_(not self.reload().has_role(self.addon.id))
+
+    def test_has_author(self):
+        ok_(not self.addon.has_author(self.user))
+        AddonUser.objects.create(addon=self.addon, user=self.user)
+        ok_(self.addon.has_author(self.user))
+        ok_(self.addon.has_author(self.user, [amo.AUTHOR_ROLE_OWNER]))
+        ok_(not self.addon.has_author(self.user, [amo.AUTHOR_ROLE_DEV]))
+
+    def check_invalidated_after(self, scope):
+        eq_(self.reload().purchased(), [])
+        entitlements.start(scope)
+        AddonPurchase.objects.create(addon=self.addon, user=self.user)
+        # Another request read the old rows before the commit, and caches
+        # them with the generation it read then, whenever that is.
+        stale = (cache.get(entitlements._gen_key(self.user.pk)),
+                 Entitlements().dumps())
+        entitlements.finish(scope)
+        cache.set(entitlements._key(self.user.pk), stale)
+        eq_(self.reload().purchased(), [self.addon.id])
+
+    def test_invalidated_after_request(self):
+        self.check_invalidated_after('request')
+
+    def test_invalidated_after_task(self):
+        self.check_invalidated_after('task')
+
+    def test_task_in_request(self):
+        entitlements.start('request')
+        entitlements.start('task')
+        entitlements.finish('task')
+        get_entitlements(self.user)
+        ok_(self.user.pk in entitlements._memo())
+
+    def test_author_moved(self):
+        other = amo.tests.user_factory()
+        author = AddonUser.objects.create(addon=self.addon, user=self.user)
+        ok_(self.reload().has_role(self.addon.id))
+        get_entitlements(other)
+        author.user = other
+        author.save()
+        ok_(not self.reload().has_role(self.addon.id))
+        ok_(get_entitlements(other).has_role(self.addon.id))
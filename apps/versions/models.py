@@ -591,6 +591,16 @@ def clear_compatversion_cache_on_delete(sender, instance, **kw):
         instance.addon.invalidate_d2c_versions()
 
 
+def clear_compatversion_cache_on_apps_change(sender, instance, **kw):
+    """Clears compatversion cache when the apps of a Version change."""
+    if kw.get('raw'):
+        return
+    try:
+        instance.version.addon.invalidate_d2c_versions()
+    except ObjectDoesNotExist:
+        pass
+
+
 version_uploaded = django.dispatch.Signal()
 models.signals.pre_save.connect(
     save_signal, sender=Version, dispatch_uid='version_translations')
@@ -683,3 +693,11 @@ class ApplicationsVersions(caching.base.CachingMixin, models.Model):
             return _(u'{app} {min} and later').format(app=self.application,
                                                       min=self.min)
         return u'%s %s - %s' % (self.application, self.min, self.max)
+
+
+models.signals.post_save.connect(
+    clear_compatversion_cache_on_apps_change, sender=ApplicationsVersions,
+    dispatch_uid='clear_compatversion_cache_apps_save')
+models.signals.post_delete.connect(
+    clear_compatversion_cache_on_apps_change, sender=ApplicationsVersions,
+    dispatch_uid='clear_compatversion_cache_apps_del')
@@ -0,0 +1,89 @@
+"""
+Registry of the Elasticsearch clients of a process.
+
+There's one long-lived pyelasticsearch client per profile: a name, used for
+the metrics, the urls and the timeout. It's shared by all the threads of
+the process, its requests session keeps the connections to the nodes alive.
+Requests are retried here, with an exponential backoff, when a node can't be
+reached: pyelasticsearch's own retries are turned off since it retries every
+method, writes included, after a timeout. Every client sends its number of
+requests in flight and their latency to statsd, as `es.<name>.in_flight` and
+`es.<name>.request`.
+"""
+import itertools
+import threading
+import time
+
+from django.conf import settings
+
+from django_statsd.clients import statsd
+from pyelasticsearch import ElasticSearch
+from pyelasticsearch.exceptions import ConnectionError, Timeout
+
+
+_clients = {}
+_lock = threading.Lock()
+
+# Only these are retried after a timeout, the others might have been done.
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+
+
+class PooledElasticSearch(ElasticSearch):
+
+    def __init__(self, urls, name, timeout, **kw):
+        kw['max_retries'] = 0
+        super(PooledElasticSearch, self).__init__(urls, timeout=timeout, **kw)
+        self.name = name
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+    def _track(self, delta):
+        with self._in_flight_lock:
+            self.in_flight += delta
+            in_flight = self.in_flight
+        statsd.gauge('es.%s.in_flight' % self.name, in_flight)
+
+    def send_request(self, method, *args, **kw):
+        self._track(1)
+        try:
+            for attempt in itertools.count():
+                try:
+                    with statsd.timer('es.%s.request' % self.name):
+                        return super(PooledElasticSearch, self).send_request(
+                            method, *args, **kw)
+                except (ConnectionError, Timeout), exc:
+                    if (attempt >= settings.ES_RETRIES or
+                        (isinstance(exc, Timeout) and
+                         method not in IDEMPOTENT_METHODS)):
+                        statsd.incr('es.%s.failed' % self.name)
+                        raise
+                    statsd.incr('es.%s.retry' % self.name)
+                    time.sleep(settings.ES_RETRY_BACKOFF * 2 ** attempt)
+        finally:
+            self._track(-1)
+
+
+def get_es(urls=None, timeout=None, name='default', **kw):
+    """
+    Return the client of the profile `name`, `urls` and `timeout`, which
+    default to ES_URLS and ES_TIMEOUT. Extra keyword arguments are passed to
+    pyelasticsearch when the client is created.
+    """
+    urls = tuple(urls or settings.ES_URLS)
+    if timeout is None:
+        timeout = settings.ES_TIMEOUT
+    key = (name, urls, timeout)
+    try:
+        return _clients[key]
+    except KeyError:
+        with _lock:
+            if key not in _clients:
+                _clients[key] = PooledElasticSearch(list(urls), name, timeout,
+                                                    **kw)
+            return _clients[key]
+
+
+def clear():
+    """Forget all the clients, e.g. after changing the settings in tests."""
+    with _lock:
+        _clients.clear()
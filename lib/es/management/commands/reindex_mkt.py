@@ -20,9 +20,11 @@ from django.core.management.base import BaseCommand, CommandError
 
 from amo.utils import chunked, timestamp_index
 from addons.models import Webapp  # To avoid circular import.
+from lib.es.client import get_es
 from lib.es.utils import (flag_reindexing_mkt, is_reindexing_mkt,
                           unflag_reindexing_mkt)
 
+from mkt.search import cache
 from mkt.webapps.models import WebappIndexer
 
 
@@ -43,7 +45,8 @@ else:
     ES_URL = 'http://127.0.0.1:9200'
 
 
-ES = pyelasticsearch.ElasticSearch(ES_URL)
+# pyelasticsearch's default timeout, long enough for optimize and health.
+ES = get_es(urls=[ES_URL], timeout=60, name='reindex')
 
 
 job = 'lib.es.management.commands.reindex_mkt.run_indexing'
@@ -167,6 +170,9 @@ def update_alias(new_index, old_index, alias, settings):
         )
     ES.update_aliases(dict(actions=actions))
 
+    # The cached search results came from the old index.
+    cache.invalidate()
+
 
 @task
 def output_summary():
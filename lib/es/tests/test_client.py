@@ -0,0 +1,66 @@
+from django.test.utils import override_settings
+
+import mock
+from nose.tools import eq_, ok_
+from pyelasticsearch import ElasticSearch
+from pyelasticsearch.exceptions import ConnectionError, Timeout
+
+import amo.tests
+from lib.es import client
+
+
+@override_settings(ES_URLS=['http://es:9200'], ES_TIMEOUT=10, ES_RETRIES=2,
+                   ES_RETRY_BACKOFF=0.1)
+class TestClient(amo.tests.TestCase):
+
+    def setUp(self):
+        client.clear()
+        self.addCleanup(client.clear)
+        patcher = mock.patch.object(ElasticSearch, 'send_request')
+        self.send_request = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('lib.es.client.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_shared(self):
+        es = client.get_es()
+        eq_(es.name, 'default')
+        ok_(client.get_es() is es)
+        ok_(client.get_es(urls=['http://es:9200'], timeout=10) is es)
+        ok_(client.get_es(timeout=30) is not es)
+        ok_(client.get_es(name='indexing') is not es)
+
+    def test_no_pyelasticsearch_retries(self):
+        eq_(client.get_es().max_retries, 0)
+        eq_(client.get_es(name='indexing', max_retries=3).max_retries, 0)
+
+    @mock.patch('lib.es.client.statsd')
+    def test_metrics(self, statsd):
+        self.send_request.return_value = {'ok': True}
+        eq_(client.get_es().send_request('GET', ['apps']), {'ok': True})
+        eq_(statsd.gauge.call_args_list,
+            [mock.call('es.default.in_flight', 1),
+             mock.call('es.default.in_flight', 0)])
+        statsd.timer.assert_called_with('es.default.request')
+
+    def test_retry(self):
+        self.send_request.side_effect = [ConnectionError, ConnectionError,
+                                         {'ok': True}]
+        eq_(client.get_es().send_request('POST', ['apps']), {'ok': True})
+        eq_(self.sleep.call_args_list, [mock.call(0.1), mock.call(0.2)])
+
+    def test_retry_exhausted(self):
+        self.send_request.side_effect = ConnectionError
+        with self.assertRaises(ConnectionError):
+            client.get_es().send_request('GET', ['apps'])
+        eq_(self.send_request.call_count, 3)
+
+    def test_timeout(self):
+        self.send_request.side_effect = [Timeout, {'ok': True}]
+        eq_(client.get_es().send_request('GET', ['apps']), {'ok': True})
+        self.send_request.side_effect = Timeout
+        with self.assertRaises(Timeout):
+            client.get_es().send_request('PUT', ['apps'])
+        eq_(self.send_request.call_count, 3)
+        eq_(client.get_es().in_flight, 0)
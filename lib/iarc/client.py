@@ -1,13 +1,16 @@
 # -*- coding: utf8 -*-
 import base64
 import functools
+import hashlib
 import os
+import threading
 
 from django.conf import settings
 
 import commonware.log
 from django_statsd.clients import statsd
 from suds import client as sudsclient
+from suds.cache import ObjectCache
 
 
 log = commonware.log.getLogger('z.iarc')
@@ -21,6 +24,43 @@ wsdl = {
 # Add in the whitelist of supported methods here.
 services = ['Get_App_Info', 'Set_Storefront_Data', 'Get_Rating_Changes']
 
+# The parsed suds clients of the process, by wsdl name. Each thread uses its
+# own clone of them.
+_clients = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_wsdl_cache(wsdl_name):
+    """
+    Return the on-disk cache of the parsed `wsdl_name` WSDL. It's keyed on the
+    content of the file, so that a deploy that changes it isn't served the
+    old version.
+    """
+    with open(wsdl[wsdl_name][len('file://'):]) as fd:
+        version = hashlib.md5(fd.read()).hexdigest()[:8]
+    location = os.path.join(settings.IARC_WSDL_CACHE_PATH, settings.IARC_ENV,
+                            '%s-%s' % (wsdl_name, version))
+    return ObjectCache(location=location, days=settings.IARC_WSDL_CACHE_DAYS)
+
+
+def get_suds_client(wsdl_name):
+    """
+    Return the suds client of the current thread for `wsdl_name`. The WSDL
+    is only parsed once per process, or read from the cache on disk.
+    """
+    clients = _local.__dict__.setdefault('clients', {})
+    if wsdl_name not in clients:
+        with _lock:
+            if wsdl_name not in _clients:
+                # cachingpolicy=1 caches the parsed WSDL object, not only
+                # the XML documents.
+                _clients[wsdl_name] = sudsclient.Client(
+                    wsdl[wsdl_name], cache=get_wsdl_cache(wsdl_name),
+                    cachingpolicy=1)
+        clients[wsdl_name] = _clients[wsdl_name].clone()
+    return clients[wsdl_name]
+
 
 class Client(object):
     """
@@ -46,10 +86,11 @@ class Client(object):
         raise AttributeError('Unknown request: %s' % attr)
 
     def call(self, name, **data):
-        log.info('IARC client call: {0} from wsdl: {1}'.format(name, wsdl))
+        log.info('IARC client call: {0} from wsdl: {1}'.format(
+            name, self.wsdl_name))
 
         if self.client is None:
-            self.client = sudsclient.Client(wsdl[self.wsdl_name], cache=None)
+            self.client = get_suds_client(self.wsdl_name)
 
         # IARC requires messages be base64 encoded and base64 requires
         # byte-strings.
@@ -1,5 +1,8 @@
+import mock
 import test_utils
+from nose.tools import eq_, ok_
 
+from .. import client
 from ..client import Client, MockClient, get_iarc_client
 
 
@@ -37,3 +40,32 @@ class TestRightClient(test_utils.TestCase):
     def test_mock(self):
         with self.settings(IARC_MOCK=True):
             assert isinstance(get_iarc_client('services'), MockClient)
+
+
+class TestSudsClient(test_utils.TestCase):
+
+    def setUp(self):
+        client._clients.clear()
+        client._local.__dict__.clear()
+        self.addCleanup(client._clients.clear)
+        self.addCleanup(client._local.__dict__.clear)
+
+    @mock.patch('lib.iarc.client.sudsclient.Client')
+    def test_shared(self, suds):
+        clone = suds.return_value.clone.return_value
+        ok_(client.get_suds_client('services') is clone)
+        ok_(client.get_suds_client('services') is clone)
+        eq_(suds.call_count, 1)
+        eq_(suds.call_args[1]['cachingpolicy'], 1)
+        eq_(suds.return_value.clone.call_count, 1)
+
+        # The WSDL isn't parsed again by other instances.
+        with mock.patch.object(clone.service, 'Get_App_Info') as call:
+            call.return_value = 'UmVzcG9uc2U='
+            eq_(Client('services').Get_App_Info(XMLString='xml'), 'Response')
+        eq_(suds.call_count, 1)
+
+    def test_wsdl_cache(self):
+        with self.settings(IARC_WSDL_CACHE_PATH='/tmp/wsdl', IARC_ENV='test'):
+            cache = client.get_wsdl_cache('services')
+        ok_(cache.location.startswith('/tmp/wsdl/test/services-'))
@@ -1,6 +1,7 @@
 import threading
 from functools import partial
 
+from django.conf import settings
 from django.core.signals import got_request_exception, request_finished
 
 import commonware.log
@@ -19,32 +20,102 @@ def _get_task_queue():
     return _locals.__dict__.setdefault('task_queue', [])
 
 
+def _get_task_index():
+    """Returns the calling thread's index of the queued tasks, by key."""
+    return _locals.__dict__.setdefault('task_index', {})
+
+
+def _freeze(value):
+    """Returns a hashable version of lists, tuples and dicts."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _mergeable(cls, args):
+    return (getattr(cls, 'merge_ids', False) and len(args) > 0 and
+            isinstance(args[0], (list, tuple)))
+
+
+def _chunks(cls, args):
+    """
+    Yields the `(args, kwargs)` of the calls to send for the queued task
+    `cls`: merged tasks are split in chunks of POST_REQUEST_TASK_CHUNK_SIZE
+    ids.
+    """
+    task_args, task_kwargs = args
+    if not _mergeable(cls, task_args):
+        yield args
+        return
+    ids, rest = task_args[0], tuple(task_args[1:])
+    size = settings.POST_REQUEST_TASK_CHUNK_SIZE
+    for i in xrange(0, len(ids), size):
+        yield (ids[i:i + size],) + rest, task_kwargs
+
+
 def _send_tasks(**kwargs):
     """Sends all delayed Celery tasks."""
     queue = _get_task_queue()
+    # Tasks run eagerly can queue new ones, which mustn't be merged with the
+    # tasks that are already being sent.
     while queue:
-        cls, args, kwargs = queue.pop(0)
-        cls.original_apply_async(*args, **kwargs)
+        tasks = queue[:]
+        _discard_tasks()
+        for cls, args, kwargs in tasks:
+            for chunk in _chunks(cls, args):
+                cls.original_apply_async(*chunk, **kwargs)
 
 
 def _discard_tasks(**kwargs):
     """Discards all delayed Celery tasks."""
     _get_task_queue()[:] = []
+    _get_task_index().clear()
 
 
 def _append_task(t):
     """Append a task to the queue.
 
-    Expected argument is a tuple of the (task class, args, kwargs).
+    Expected argument is a tuple of the (task class, (args, kwargs),
+    options).
 
     This doesn't append to queue if the argument is already in the queue.
+    Tasks declared with `merge_ids=True` take a list of ids as their first
+    argument: the calls that only differ by these ids are merged into one,
+    at the position of the first of them.
 
     """
+    cls, (args, kwargs), options = t
     queue = _get_task_queue()
-    if t not in queue:
-        queue.append(t)
-    else:
+    index = _get_task_index()
+
+    if _mergeable(cls, args):
+        key = (cls.name, 'merge', _freeze(args[1:]), _freeze(kwargs),
+               _freeze(options))
+        if key not in index:
+            ids = []
+            queue.append((cls, ((ids,) + tuple(args[1:]), kwargs), options))
+            index[key] = ids, set()
+        ids, seen = index[key]
+        for id_ in args[0]:
+            if id_ not in seen:
+                seen.add(id_)
+                ids.append(id_)
+        return
+
+    try:
+        key = (cls.name, _freeze(args), _freeze(kwargs), _freeze(options))
+        duplicate = key in index
+    except TypeError:
+        # Unhashable arguments, fall back to comparing them.
+        key, duplicate = None, t in queue
+    if duplicate:
         log.debug('Removed duplicate task: %s' % (t,))
+        return
+    queue.append(t)
+    if key is not None:
+        index[key] = t
 
 
 class PostRequestTask(Task):
@@ -53,14 +124,17 @@ class PostRequestTask(Task):
     This simply wraps celery's `@task` decorator and stores the task calls
     until after the request is finished, then fires them off.
 
+    Pass `merge_ids=True` to the decorator for tasks whose first argument is
+    a list of ids, to send a single call per request for them.
+
     """
     abstract = True
 
     def original_apply_async(self, *args, **kwargs):
         return super(PostRequestTask, self).apply_async(*args, **kwargs)
 
-    def apply_async(self, *args, **kwargs):
-        _append_task((self, args, kwargs))
+    def apply_async(self, args=None, kwargs=None, **options):
+        _append_task((self, (tuple(args or ()), kwargs or {}), options))
 
 
 # Replacement `@task` decorator.
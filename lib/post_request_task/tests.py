@@ -1,10 +1,10 @@
 from django.core.signals import request_finished
 from django.test import TestCase
 
-from mock import Mock, patch
-from nose.tools import eq_
+from mock import call, Mock, patch
+from nose.tools import eq_, ok_
 
-from .task import task, _get_task_queue, _discard_tasks
+from .task import task, _get_task_queue, _discard_tasks, _send_tasks
 
 
 task_mock = Mock()
@@ -15,6 +15,11 @@ def test_task():
     task_mock()
 
 
+@task(merge_ids=True)
+def test_merge_task(ids, *args, **kw):
+    task_mock(ids, *args, **kw)
+
+
 class TestTask(TestCase):
 
     def tearDown(self):
@@ -69,3 +74,53 @@ class TestTask(TestCase):
             test_task.delay()
 
         self._verify_task_filled()
+
+    def test_deduplication_unhashable(self):
+        with self.settings(CELERY_ALWAYS_EAGER=False):
+            test_task.delay(set([1]))
+            test_task.delay(set([1]))
+        eq_(len(_get_task_queue()), 1)
+
+
+@patch('lib.post_request_task.task.PostRequestTask.original_apply_async')
+class TestMergeTask(TestCase):
+
+    def tearDown(self):
+        _discard_tasks()
+
+    def test_merge(self, _mock):
+        with self.settings(CELERY_ALWAYS_EAGER=False):
+            test_merge_task.delay([1, 2])
+            test_task.delay()
+            test_merge_task.delay([2, 3])
+            test_merge_task.delay([1])
+        eq_(len(_get_task_queue()), 2)
+        _send_tasks()
+        eq_(_mock.call_args_list,
+            [call(([1, 2, 3],), {}), call((), {})])
+
+    def test_different_args_not_merged(self, _mock):
+        with self.settings(CELERY_ALWAYS_EAGER=False):
+            test_merge_task.delay([1], 'a')
+            test_merge_task.delay([2], 'b')
+            test_merge_task.delay([3], 'a')
+            test_merge_task.delay([4], index='new')
+        _send_tasks()
+        eq_(_mock.call_args_list,
+            [call(([1, 3], 'a'), {}), call(([2], 'b'), {}),
+             call(([4],), {'index': 'new'})])
+
+    def test_chunks(self, _mock):
+        with self.settings(CELERY_ALWAYS_EAGER=False,
+                           POST_REQUEST_TASK_CHUNK_SIZE=2):
+            for i in range(5):
+                test_merge_task.delay([i])
+            _send_tasks()
+        eq_(_mock.call_args_list,
+            [call(([0, 1],), {}), call(([2, 3],), {}), call(([4],), {})])
+
+    def test_empty(self, _mock):
+        with self.settings(CELERY_ALWAYS_EAGER=False):
+            test_merge_task.delay([])
+        _send_tasks()
+        ok_(not _mock.called)
@@ -106,6 +106,10 @@ SERVICES_DATABASE = {
     'HOST': '',
 }
 
+# Number of plugin finder responses kept in memory by every process of the
+# pfs service.
+PFS_CACHE_SIZE = 1000
+
 DATABASE_ROUTERS = ('multidb.PinningMasterSlaveRouter',)
 
 # For use django-mysql-pool backend.
@@ -273,6 +277,9 @@ DUMPED_APPS_PATH = NETAPP_STORAGE + '/dumped-apps'
 # Tarballs in DUMPED_APPS_PATH deleted 30 days after they have been written.
 DUMPED_APPS_DAYS_DELETE = 3600 * 24 * 30
 
+# Number of threads serializing apps in parallel for export_data.
+DUMPED_APPS_THREADS = 4
+
 # Where dumped apps will be written too.
 DUMPED_USERS_PATH = NETAPP_STORAGE + '/dumped-users'
 
@@ -838,6 +845,26 @@ FETCH_BY_ID = True
 # it's not possible to invalidate these queries.
 CACHE_COUNT_TIMEOUT = 60
 
+# Number of seconds translations are kept in the cache. They are invalidated
+# when saved, this only bounds how stale a bulk update() can leave them.
+TRANSLATIONS_CACHE_TIMEOUT = 60 * 60
+
+# Number of seconds the region exclusions index is kept in the cache. It's
+# updated incrementally and rebuilt by the rebuild_region_exclusions cron.
+REGION_EXCLUSIONS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Number of seconds after which a cached packaged app mini manifest is
+# rebuilt in the background. It's still served in the meantime.
+MINI_MANIFEST_FRESH_TIMEOUT = 60 * 60 * 24
+
+# Number of seconds to wait before recomputing the rating aggregates of an
+# add-on that got a new review. Reviews coming in meanwhile are batched.
+REVIEW_AGGREGATES_DELAY = 10
+
+# Maximum number of deferred activity logs (installs...) written per
+# transaction after the response has been sent.
+ACTIVITY_LOG_BATCH_SIZE = 100
+
 # To enable pylibmc compression (in bytes)
 PYLIBMC_MIN_COMPRESS_LEN = 0  # disabled
 
@@ -1045,6 +1072,11 @@ CELERY_EAGER_PROPAGATES_EXCEPTIONS = True
 # a separate, shorter timeout for validation tasks.
 CELERYD_TASK_SOFT_TIME_LIMIT = 60 * 2
 
+# Maximum number of ids in a call of the post request tasks declared with
+# `merge_ids=True`, e.g. index_webapps. A request that queues more is sent
+# in several calls.
+POST_REQUEST_TASK_CHUNK_SIZE = 100
+
 ## Fixture Magic
 CUSTOM_DUMPS = {
     'addon': {  # ./manage.py custom_dump addon id
@@ -1232,6 +1264,16 @@ EXPOSE_VALIDATOR_TRACEBACKS = False
 # limit.
 VALIDATOR_MESSAGE_LIMIT = 500
 
+# Number of seconds validation results are cached for a given file content
+# and validator version.
+VALIDATION_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Revision of app-validator in requirements/prod.txt, part of the key of the
+# cached validation results. Bump it with the requirement: the validator is
+# installed from git, so its package version doesn't change between
+# revisions.
+VALIDATOR_VERSION = 'e4a7a1afc584ea3704f8394b6718fe19e449a304'
+
 # Feature flags
 UNLINK_SITE_STATS = True
 
@@ -1279,6 +1321,11 @@ ES_URLS = ['http://%s' % h for h in ES_HOSTS]
 ES_INDEXES = {'default': 'addons',
               'webapp': 'apps'}
 ES_TIMEOUT = 30
+# Times a request to ES is retried when no node can be reached, waiting
+# ES_RETRY_BACKOFF seconds before the first retry and twice as long before
+# every other one.
+ES_RETRIES = 2
+ES_RETRY_BACKOFF = 0.1
 ES_DEFAULT_NUM_REPLICAS = 2
 ES_DEFAULT_NUM_SHARDS = 5
 ES_USE_PLUGINS = False
@@ -1466,9 +1513,26 @@ APP_FEATURES_VERSION = 4
 # Whether to throttle API requests. Default is True. Disable where appropriate.
 API_THROTTLE = True
 
+# Number of seconds the user id of authenticated API credentials, and whether
+# that user has a role denied from the API, are cached. See mkt.api.identity.
+API_IDENTITY_CACHE_TIMEOUT = 60 * 5
+
+# Number of seconds the index of the purchases and authored add-ons of a user
+# is cached. It's replaced when they change, see users.entitlements.
+ENTITLEMENTS_CACHE_TIMEOUT = 60 * 60 * 6
+
 # Cache timeout on the /search/featured API.
 CACHE_SEARCH_FEATURED_API_TIMEOUT = 60 * 60  # 1 hour.
 
+# Number of seconds the resolution of the featured collections is cached. It's
+# also rebuilt as soon as a collection changes.
+COLLECTIONS_RESOLUTION_TIMEOUT = 60 * 60
+
+# Number of seconds the anonymous search API results are fresh in the cache.
+# They are served stale for as long again while one request refreshes them.
+# Set to 0 to disable the cache.
+SEARCH_CACHE_TIMEOUT = 60
+
 # Whitelist IP addresses of the allowed clients that can post email
 # through the API.
 WHITELISTED_CLIENTS_EMAIL_API = []
@@ -1505,6 +1569,9 @@ IARC_SUBMISSION_ENDPOINT = ''
 IARC_PRIVACY_URL = 'https://www.globalratings.com/IARCPRODClient/privacypolicy.aspx'
 IARC_TOS_URL = 'https://www.globalratings.com/IARCPRODClient/termsofuse.aspx'
 IARC_ALLOW_CERT_REUSE = False
+# Where the parsed IARC WSDL is cached, and for how many days.
+IARC_WSDL_CACHE_PATH = os.path.join(TMP_PATH, 'iarc-wsdl')
+IARC_WSDL_CACHE_DAYS = 30
 
 # The payment providers supported.
 PAYMENT_PROVIDERS = ['bango']
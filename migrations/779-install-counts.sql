@@ -0,0 +1,20 @@
+CREATE TABLE `webapps_install_counts` (
+    `id` int(11) AUTO_INCREMENT NOT NULL PRIMARY KEY,
+    `addon_id` int(11) UNSIGNED NOT NULL,
+    `region` integer UNSIGNED NOT NULL,
+    `count` integer NOT NULL,
+    UNIQUE (`addon_id`, `region`)
+) ENGINE=InnoDB CHARACTER SET utf8 COLLATE utf8_general_ci;
+ALTER TABLE `webapps_install_counts` ADD CONSTRAINT `webapps_install_counts_addon_id`
+    FOREIGN KEY (`addon_id`) REFERENCES `addons` (`id`) ON DELETE CASCADE;
+
+-- Region 0 holds the installs from all the regions.
+INSERT INTO `webapps_install_counts` (`addon_id`, `region`, `count`)
+    SELECT `addon_id`, 0, COUNT(*) FROM `users_install` GROUP BY `addon_id`;
+INSERT INTO `webapps_install_counts` (`addon_id`, `region`, `count`)
+    SELECT `users_install`.`addon_id`, `client_data`.`region`, COUNT(*)
+    FROM `users_install`
+    INNER JOIN `client_data`
+        ON `client_data`.`id` = `users_install`.`client_data_id`
+    WHERE `client_data`.`region` IS NOT NULL
+    GROUP BY `users_install`.`addon_id`, `client_data`.`region`;
@@ -0,0 +1,4 @@
+INSERT INTO waffle_switch_mkt (name, active, created, modified, note)
+VALUES ('search-features-int', 0, NOW(), NOW(),
+        'Filter apps by feature profile with one script filter on the '
+        'features_int bitfield. Turn on once the apps are reindexed.');
@@ -0,0 +1,126 @@
+"""
+Cache of the identities authenticated by the API middlewares.
+
+Once a request has been verified, the middlewares look up who it belongs to.
+Two things are cached for API_IDENTITY_CACHE_TIMEOUT seconds:
+
+* the credential (OAuth consumer key, OAuth access token or shared-secret
+  token) to the user id, invalidated when the credential is revoked;
+* whether the user has a role that isn't allowed to use the API, invalidated
+  when the groups of the user change.
+
+The profile itself isn't cached, profiles are written from too many places,
+including queryset updates, to be cached safely. It's only read from the
+database once something uses it.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import signals
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+
+from access.models import Group, GroupUser
+from users.models import UserProfile
+
+from mkt.api.models import Access, Token
+
+
+# Users with one of these roles can't use the API.
+DENIED_GROUPS = set(['Admins'])
+
+CREDENTIAL_KEY = 'api:identity:%s:%s'
+DENIED_KEY = 'api:identity:denied:%s'
+
+ACCESS = 'access'
+TOKEN = 'token'
+SHARED_SECRET = 'secret'
+
+
+def credential_key(kind, key):
+    # Keys can be long and contain anything, and shared-secret tokens depend
+    # on the SECRET_KEY.
+    return CREDENTIAL_KEY % (kind, hashlib.sha1(
+        '%s%s' % (key, settings.SECRET_KEY)).hexdigest())
+
+
+def get_user_id(kind, key, default):
+    """
+    Return the user id for the credential `key` of type `kind`, calling
+    `default()` to find it if it isn't cached. `default` may raise
+    DoesNotExist, in which case nothing is cached.
+    """
+    cache_key = credential_key(kind, key)
+    uid = cache.get(cache_key)
+    if uid is None:
+        uid = default()
+        cache.set(cache_key, uid, settings.API_IDENTITY_CACHE_TIMEOUT)
+    return uid
+
+
+def get_profile(uid):
+    """
+    Return the UserProfile of `uid`, only read from the database when it's
+    used. Using it raises UserProfile.DoesNotExist if there's none.
+    """
+    return SimpleLazyObject(
+        lambda: UserProfile.objects.select_related('user').get(pk=uid))
+
+
+def get_user(uid):
+    """
+    Return a (UserProfile, denied) tuple for `uid`, where `denied` is True if
+    the user has a role that isn't allowed to use the API. The profile is
+    lazy, see get_profile().
+    """
+    return get_profile(uid), is_denied(uid)
+
+
+def is_denied(uid):
+    denied = cache.get(DENIED_KEY % uid)
+    if denied is None:
+        denied = GroupUser.objects.filter(
+            user=uid, group__name__in=DENIED_GROUPS).exists()
+        cache.set(DENIED_KEY % uid, denied,
+                  settings.API_IDENTITY_CACHE_TIMEOUT)
+    return denied
+
+
+def invalidate_credential(kind, key):
+    cache.delete(credential_key(kind, key))
+
+
+def invalidate_denied(*uids):
+    cache.delete_many([DENIED_KEY % uid for uid in uids])
+
+
+@receiver(signals.post_save, sender=Access,
+          dispatch_uid='api_identity_access_save')
+@receiver(signals.post_delete, sender=Access,
+          dispatch_uid='api_identity_access_delete')
+def access_changed(sender, instance, **kw):
+    invalidate_credential(ACCESS, instance.key)
+
+
+@receiver(signals.post_save, sender=Token,
+          dispatch_uid='api_identity_token_save')
+@receiver(signals.post_delete, sender=Token,
+          dispatch_uid='api_identity_token_delete')
+def token_changed(sender, instance, **kw):
+    invalidate_credential(TOKEN, instance.key)
+
+
+@receiver(signals.post_save, sender=GroupUser,
+          dispatch_uid='api_identity_groupuser_save')
+@receiver(signals.post_delete, sender=GroupUser,
+          dispatch_uid='api_identity_groupuser_delete')
+def group_user_changed(sender, instance, **kw):
+    invalidate_denied(instance.user_id)
+
+
+@receiver(signals.post_save, sender=Group,
+          dispatch_uid='api_identity_group_save')
+def group_changed(sender, instance, **kw):
+    # The group may have been renamed from or to a denied one.
+    invalidate_denied(*instance.users.values_list('id', flat=True))
@@ -10,6 +10,7 @@ from django.core.cache import cache
 from django.middleware.gzip import GZipMiddleware as BaseGZipMiddleware
 from django.middleware.transaction import TransactionMiddleware
 from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
 
 import commonware.log
 from django_statsd.clients import statsd
@@ -19,6 +20,7 @@ from multidb.pinning import (pin_this_thread, this_thread_is_pinned,
                              unpin_this_thread)
 from multidb.middleware import PinningRouterMiddleware
 
+from mkt.api import identity
 from mkt.api.models import Access, ACCESS_TOKEN, Token
 from mkt.api.oauth import OAuthServer
 from mkt.carriers import get_carrier
@@ -74,13 +76,12 @@ class RestOAuthMiddleware(object):
                 log.error(u'Cannot find APIAccess token with that key: %s'
                           % oauth.attempted_key)
                 return
-            uid = Token.objects.filter(
-                token_type=ACCESS_TOKEN,
-                key=oauth_request.resource_owner_key).values_list(
-                    'user_id', flat=True)[0]
-            request.amo_user = UserProfile.objects.select_related(
-                'user').get(pk=uid)
-            request.user = request.amo_user.user
+            key = oauth_request.resource_owner_key
+            uid = identity.get_user_id(
+                identity.TOKEN, key,
+                lambda: Token.objects.filter(
+                    token_type=ACCESS_TOKEN, key=key).values_list(
+                        'user_id', flat=True)[0])
         else:
             # This is 2-legged OAuth.
             log.info('Trying 2 legged OAuth')
@@ -96,31 +97,41 @@ class RestOAuthMiddleware(object):
                 log.error(u'Cannot find APIAccess token with that key: %s'
                           % oauth.attempted_key)
                 return
-            uid = Access.objects.filter(
-                key=oauth_request.client_key).values_list(
-                    'user_id', flat=True)[0]
-            request.amo_user = UserProfile.objects.select_related(
-                'user').get(pk=uid)
-            request.user = request.amo_user.user
+            key = oauth_request.client_key
+            uid = identity.get_user_id(
+                identity.ACCESS, key,
+                lambda: Access.objects.filter(key=key).values_list(
+                    'user_id', flat=True)[0])
+
+        profile, denied = identity.get_user(uid)
 
         # But you cannot have one of these roles.
-        denied_groups = set(['Admins'])
-        roles = set(request.amo_user.groups.values_list('name', flat=True))
-        if roles and roles.intersection(denied_groups):
-            log.info(u'Attempt to use API with denied role, user: %s'
-                     % request.amo_user.pk)
-            # Set request attributes back to None.
-            request.user = request.amo_user = None
+        if denied:
+            log.info(u'Attempt to use API with denied role, user: %s' % uid)
             return
 
-        if request.user:
-            request.authed_from.append('RestOAuth')
+        # Both are only read from the database if the view uses them.
+        request.amo_user = profile
+        request.user = SimpleLazyObject(lambda: profile.user)
+        request.authed_from.append('RestOAuth')
 
-        log.info('Successful OAuth with user: %s' % request.user)
+        log.info('Successful OAuth with user: %s' % uid)
 
 
 class RestSharedSecretMiddleware(object):
 
+    def verify(self, email, hm, unique_id):
+        """
+        Return the id of the user of a shared-secret token, raises ValueError
+        if it doesn't match.
+        """
+        consumer_id = hashlib.sha1(email + settings.SECRET_KEY).hexdigest()
+        if hmac.new(unique_id + settings.SECRET_KEY, consumer_id,
+                    hashlib.sha512).hexdigest() != hm:
+            raise ValueError('Shared-secret auth token does not match')
+        return UserProfile.objects.filter(email=email).values_list(
+            'pk', flat=True).get()
+
     def process_request(self, request):
         # For now we only want these to apply to the API.
         # This attribute is set in RedirectPrefixedURIMiddleware.
@@ -141,22 +152,29 @@ class RestSharedSecretMiddleware(object):
             return
         try:
             email, hm, unique_id = str(auth).split(',')
-            consumer_id = hashlib.sha1(
-                email + settings.SECRET_KEY).hexdigest()
-            matches = hmac.new(unique_id + settings.SECRET_KEY,
-                               consumer_id, hashlib.sha512).hexdigest() == hm
-            if matches:
-                try:
-                    request.amo_user = UserProfile.objects.select_related(
-                        'user').get(email=email)
-                    request.user = request.amo_user.user
-                    request.authed_from.append('RestSharedSecret')
-                except UserProfile.DoesNotExist:
-                    log.info('Auth token matches absent user (%s)' % email)
-                    return
-            else:
+            try:
+                uid = identity.get_user_id(
+                    identity.SHARED_SECRET, auth,
+                    lambda: self.verify(email, hm, unique_id))
+            except ValueError:
                 log.info('Shared-secret auth token does not match')
                 return
+            except UserProfile.DoesNotExist:
+                log.info('Auth token matches absent user (%s)' % email)
+                return
+            profile = identity.get_profile(uid)
+            try:
+                matches = profile.email == email
+            except UserProfile.DoesNotExist:
+                matches = False
+            if not matches:
+                # The email of the user changed since the token was cached.
+                identity.invalidate_credential(identity.SHARED_SECRET, auth)
+                log.info('Auth token matches absent user (%s)' % email)
+                return
+            request.amo_user = profile
+            request.user = request.amo_user.user
+            request.authed_from.append('RestSharedSecret')
 
             log.info('Successful SharedSecret with user: %s' % request.user.pk)
             return
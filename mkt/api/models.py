@@ -63,3 +63,6 @@ class Nonce(ModelBase):
 
 def generate():
     return os.urandom(64).encode('hex')
+
+
+from mkt.api import identity  # noqa: connects the invalidation signals.
@@ -7,6 +7,14 @@ from django.utils.http import urlencode
 from rest_framework import pagination, serializers
 
 
+def replace_query_params(url, params):
+    (scheme, netloc, path, query, fragment) = urlparse.urlsplit(url)
+    query_dict = QueryDict(query).dict()
+    query_dict.update(params)
+    query = urlencode(query_dict)
+    return urlparse.urlunsplit((scheme, netloc, path, query, fragment))
+
+
 class ESPaginator(Paginator):
     """
     A better paginator for search results
@@ -69,11 +77,7 @@ class MetaSerializer(serializers.Serializer):
     limit = serializers.SerializerMethodField('get_limit')
 
     def replace_query_params(self, url, params):
-        (scheme, netloc, path, query, fragment) = urlparse.urlsplit(url)
-        query_dict = QueryDict(query).dict()
-        query_dict.update(params)
-        query = urlencode(query_dict)
-        return urlparse.urlunsplit((scheme, netloc, path, query, fragment))
+        return replace_query_params(url, params)
 
     def get_offset_link_for_page(self, page, number):
         request = self.context.get('request')
@@ -111,3 +115,47 @@ class MetaSerializer(serializers.Serializer):
 class CustomPaginationSerializer(pagination.BasePaginationSerializer):
     meta = MetaSerializer(source='*')  # Takes the page object as the source
     results_field = 'objects'
+
+
+class CursorPage(object):
+    """
+    A page of results fetched with keyset pagination: instead of an offset,
+    the next page is found from an opaque cursor pointing after the last
+    object of this one, so deep pages cost the same as the first.
+    """
+    def __init__(self, object_list, per_page, next_cursor=None, count=None):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.count = count
+
+
+class CursorMetaSerializer(serializers.Serializer):
+    """Serializer for the 'meta' dict of a CursorPage."""
+    next = serializers.SerializerMethodField('get_next')
+    previous = serializers.SerializerMethodField('get_previous')
+    total_count = serializers.SerializerMethodField('get_total_count')
+    limit = serializers.SerializerMethodField('get_limit')
+
+    def get_next(self, page):
+        if not page.next_cursor:
+            return None
+        request = self.context.get('request')
+        url = request and request.get_full_path() or ''
+        return replace_query_params(url, {'cursor': page.next_cursor,
+                                          'limit': page.per_page})
+
+    def get_previous(self, page):
+        # Cursors only go forward.
+        return None
+
+    def get_total_count(self, page):
+        return page.count
+
+    def get_limit(self, page):
+        return page.per_page
+
+
+class CursorPaginationSerializer(pagination.BasePaginationSerializer):
+    meta = CursorMetaSerializer(source='*')
+    results_field = 'objects'
@@ -73,6 +73,44 @@ class TestRestOAuthAuthentication(TestCase):
         self.add_group_user(self.profile, 'App Reviewers')
         ok_(self.auth.authenticate(Request(self.call())))
 
+    def test_identity_cached(self):
+        ok_(self.auth.authenticate(Request(self.call())))
+        with patch('mkt.api.middleware.Access.objects') as objects:
+            req = self.call()
+            ok_(not objects.filter.called)
+        eq_(req.amo_user.pk, self.profile.pk)
+
+    def test_identity_profile_not_cached(self):
+        ok_(self.auth.authenticate(Request(self.call())))
+        self.profile.update(display_name='Changed')
+        eq_(self.call().amo_user.display_name, 'Changed')
+
+    def test_identity_group_change(self):
+        ok_(self.auth.authenticate(Request(self.call())))
+        self.add_group_user(self.profile, 'Admins')
+        ok_(not self.auth.authenticate(Request(self.call())))
+
+    def test_identity_group_renamed(self):
+        self.add_group_user(self.profile, 'App Reviewers')
+        ok_(self.auth.authenticate(Request(self.call())))
+        group = Group.objects.get(name='App Reviewers')
+        group.name = 'Admins'
+        group.save()
+        ok_(not self.auth.authenticate(Request(self.call())))
+
+    def test_identity_denied_cached(self):
+        ok_(self.auth.authenticate(Request(self.call())))
+        with patch('mkt.api.identity.GroupUser.objects') as objects:
+            ok_(self.auth.authenticate(Request(self.call())))
+        ok_(not objects.filter.called)
+
+    def test_identity_profile_lazy(self):
+        with patch('mkt.api.identity.UserProfile.objects') as objects:
+            req = self.call()
+            ok_(not objects.select_related.called)
+        eq_(req.amo_user.pk, self.profile.pk)
+        eq_(req.user.pk, self.profile.user.pk)
+
 
 class TestRestAnonymousAuthentication(TestCase):
 
@@ -140,6 +178,32 @@ class TestSharedSecretAuthentication(TestCase):
         ok_(not self.auth.authenticate(Request(req)))
         assert not getattr(req, 'amo_user', None)
 
+    def test_session_auth_cached(self):
+        auth = ('cfinke@m.com,56b6f1a3dd735d962c56ce7d8f46e02ec1d4748d2c00c4'
+                '07d75f0969d08bb9c68c31b3371aa8130317815c89e5072e31bb94b4121'
+                'c5c165f3515838d4d6c60c4,165d631d3c3045458b4516242dad7ae')
+        for i in range(2):
+            req = RequestFactory().post('/api/?_user=' + auth)
+            with patch.object(RestSharedSecretMiddleware, 'verify') as verify:
+                verify.return_value = self.profile.pk
+                for m in self.middlewares:
+                    m().process_request(req)
+            eq_(verify.called, i == 0)
+            eq_(req.amo_user.pk, self.profile.pk)
+
+    def test_session_auth_email_changed(self):
+        url = ('/api/?_user=cfinke@m.com,56b6f1a3dd735d962c56ce7d8f46e02ec1d4'
+               '748d2c00c407d75f0969d08bb9c68c31b3371aa8130317815c89e5072e31'
+               'bb94b4121c5c165f3515838d4d6c60c4,165d631d3c3045458b4516242da'
+               'd7ae')
+        for m in self.middlewares:
+            m().process_request(RequestFactory().post(url))
+        self.profile.update(email='changed@m.com')
+        req = RequestFactory().post(url)
+        for m in self.middlewares:
+            m().process_request(req)
+        assert not getattr(req, 'amo_user', None)
+
     def test_session_auth_no_post(self):
         req = RequestFactory().post('/api/')
         for m in self.middlewares:
@@ -183,6 +183,12 @@ def remove_deleted_apps(*args, **kwargs):
     CollectionMembership.objects.filter(app_id=instance.pk).delete()
 
 
+def invalidate_resolution(*args, **kwargs):
+    from mkt.collections import resolver, tasks
+    resolver.invalidate()
+    tasks.invalidate_resolution.delay()
+
+
 # Save translations when saving a Collection.
 models.signals.pre_save.connect(save_signal, sender=Collection,
                                 dispatch_uid='collection_translations')
@@ -191,3 +197,10 @@ models.signals.pre_save.connect(save_signal, sender=Collection,
 # not Webapp, because that's the real model underneath).
 models.signals.post_delete.connect(remove_deleted_apps, sender=Addon,
                                    dispatch_uid='apps_collections_cleanup')
+
+# Rebuild the resolution matrix of the featured search API when a collection
+# changes.
+models.signals.post_save.connect(invalidate_resolution, sender=Collection,
+                                 dispatch_uid='collection_resolution_save')
+models.signals.post_delete.connect(invalidate_resolution, sender=Collection,
+                                   dispatch_uid='collection_resolution_delete')
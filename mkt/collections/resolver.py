@@ -0,0 +1,150 @@
+"""
+Precomputed resolution of the public collections, by type and filters.
+
+`CollectionFilterSetWithFallback` runs up to four queries to find the
+collections matching a region, carrier and category, dropping filters until
+something matches. The featured search API needs that for three collection
+types on every request, so instead we compute the result of every
+combination once, from the list of public collections on the master, and
+keep it in the cache until a collection changes: it's dropped when one is
+saved or deleted, and again once the request that did it is over.
+
+The values no public collection uses all behave the same, they're folded
+into `OTHER`, which keeps the matrix small. `ANY` stands for a filter that
+wasn't passed at all.
+"""
+import itertools
+
+from django.conf import settings
+from django.core.cache import cache
+
+import commonware.log
+
+import amo
+import mkt
+from addons.models import Category
+from amo.decorators import write
+
+from .constants import COLLECTION_TYPES
+from .filters import CollectionFilterSetWithFallback
+from .models import Collection
+
+
+log = commonware.log.getLogger('z.collections')
+
+CACHE_KEY = 'collections:resolution'
+
+ANY = 'any'
+OTHER = 'other'
+
+# Sentinel for the filter values the FilterSet would reject.
+INVALID = object()
+
+
+@write
+def build():
+    """Compute the resolution matrix of all the public collections."""
+    collections = list(Collection.public.no_cache().values_list(
+        'id', 'collection_type', 'region', 'carrier', 'category'))
+    collections.sort(key=lambda c: -c[0])  # Collection.Meta.ordering.
+
+    dimensions = []
+    for i in (2, 3, 4):
+        used = set(c[i] for c in collections)
+        dimensions.append([ANY, OTHER] + sorted(used))
+
+    matrix = {}
+    for type_, _ in COLLECTION_TYPES:
+        candidates = [c for c in collections if c[1] == type_]
+        for values in itertools.product(*dimensions):
+            matrix[(type_,) + values] = _resolve(candidates, *values)
+
+    categories = list(Category.objects.no_cache().filter(
+        type=amo.ADDON_WEBAPP).values_list('id', 'slug'))
+    return {
+        'matrix': matrix,
+        'used': [set(d[2:]) for d in dimensions],
+        'categories': dict((slug, id_) for id_, slug in categories),
+        'category_ids': set(id_ for id_, slug in categories),
+    }
+
+
+def _resolve(collections, region, carrier, category):
+    """
+    Return the ids of `collections` matching the filters and the fields
+    that had to be set to NULL, like `CollectionFilterSetWithFallback`.
+    """
+    def find(region, carrier):
+        return [c[0] for c in collections
+                if region in (ANY, c[2]) and carrier in (ANY, c[3]) and
+                category in (ANY, c[4])]
+
+    ids, fallback = find(region, carrier), None
+    if not ids:
+        for fallback in CollectionFilterSetWithFallback.fields_fallback_order:
+            ids = find(None if 'region' in fallback and region != ANY
+                       else region,
+                       None if 'carrier' in fallback and carrier != ANY
+                       else carrier)
+            if ids:
+                break
+    return ids, fallback
+
+
+def get_matrix():
+    data = cache.get(CACHE_KEY)
+    if data is None:
+        log.info('Building the collections resolution matrix.')
+        data = build()
+        cache.set(CACHE_KEY, data, settings.COLLECTIONS_RESOLUTION_TIMEOUT)
+    return data
+
+
+def invalidate(**kw):
+    cache.delete(CACHE_KEY)
+
+
+def _parse_choice(filters, name, lookup):
+    if name not in filters:
+        return ANY
+    value = filters[name]
+    if value in (None, '', 'None'):
+        return None
+    if value.isdigit():
+        value = int(value)
+        ids = set(v.id for v in lookup.values())
+        return value if value in ids else INVALID
+    return lookup[value].id if value in lookup else INVALID
+
+
+def _parse_category(filters, data):
+    if 'cat' not in filters:
+        return ANY
+    value = filters['cat']
+    if value in (None, ''):
+        return None
+    if value.isdigit():
+        value = int(value)
+        return value if value in data['category_ids'] else INVALID
+    return data['categories'].get(value, INVALID)
+
+
+def resolve(filters, collection_type):
+    """
+    Return the ids of the public collections of `collection_type` for the
+    `filters` of a request, most recent first, and the fields that had to be
+    set to NULL to find them.
+
+    Return None when the filters aren't valid, the FilterSet takes care of
+    the errors.
+    """
+    data = get_matrix()
+    values = [_parse_choice(filters, 'region', mkt.regions.REGION_LOOKUP),
+              _parse_choice(filters, 'carrier', mkt.carriers.CARRIER_MAP),
+              _parse_category(filters, data)]
+    if INVALID in values:
+        return None
+    key = [collection_type]
+    for value, used in zip(values, data['used']):
+        key.append(value if value == ANY or value in used else OTHER)
+    return data['matrix'][tuple(key)]
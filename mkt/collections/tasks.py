@@ -4,12 +4,15 @@ import os
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 
 from celeryutils import task
 from rest_framework import serializers
 from test_utils import RequestFactory
 
-from amo.utils import chunked, JSONEncoder
+from amo.utils import JSONEncoder
+from lib.post_request_task.task import task as post_request_task
+from mkt.collections import resolver
 from mkt.collections.models import Collection
 from mkt.collections.serializers import CollectionSerializer
 from mkt.constants.regions import RESTOFWORLD
@@ -76,6 +79,10 @@ def dump_collections(pks):
             for collection in Collection.public.filter(pk__in=pks).iterator()]
 
 
-def dump_all_collections_tasks():
-    all_pks = Collection.public.values_list('pk', flat=True).order_by('pk')
-    return [dump_collections.si(pks) for pks in chunked(all_pks, 100)]
+@post_request_task
+def invalidate_resolution(**kw):
+    """
+    Drop the resolution matrix once the collection changes are committed, in
+    case a request rebuilt it from the old data in the meantime.
+    """
+    cache.delete(resolver.CACHE_KEY)
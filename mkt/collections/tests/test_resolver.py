@@ -0,0 +1,83 @@
+import itertools
+
+from django.core.cache import cache
+
+from nose.tools import eq_, ok_
+
+import amo
+import amo.tests
+import mkt
+from addons.models import Category
+from lib.post_request_task import task as post_request_task
+from mkt.collections import resolver
+from mkt.collections.constants import (COLLECTIONS_TYPE_BASIC,
+                                       COLLECTIONS_TYPE_FEATURED)
+from mkt.collections.filters import CollectionFilterSetWithFallback
+from mkt.collections.models import Collection
+
+
+class TestResolver(amo.tests.TestCase):
+
+    def setUp(self):
+        self.cat = Category.objects.create(type=amo.ADDON_WEBAPP, slug='cat')
+        self.other_cat = Category.objects.create(type=amo.ADDON_WEBAPP,
+                                                 slug='other')
+        self.create(region=mkt.regions.BR.id)
+        self.create(carrier=mkt.carriers.TELEFONICA.id)
+        self.create(region=mkt.regions.BR.id,
+                    carrier=mkt.carriers.TELEFONICA.id, category=self.cat)
+        self.create()
+        self.create(region=mkt.regions.US.id, is_public=False)
+        self.create(collection_type=COLLECTIONS_TYPE_FEATURED,
+                    category=self.cat)
+
+    def create(self, **kw):
+        kw.setdefault('collection_type', COLLECTIONS_TYPE_BASIC)
+        kw.setdefault('is_public', True)
+        kw.setdefault('name', 'Collection')
+        return Collection.objects.create(**kw)
+
+    def filterset(self, filters, collection_type):
+        qs = Collection.public.filter(collection_type=collection_type)
+        qs = CollectionFilterSetWithFallback(filters, queryset=qs).qs
+        return list(qs.values_list('id', flat=True)), qs.filter_fallback
+
+    def test_same_as_filterset(self):
+        choices = {
+            'region': [None, '', 'None', 'br', 'us', 'worldwide',
+                       str(mkt.regions.BR.id)],
+            'carrier': [None, '', 'telefonica', 'vimpelcom'],
+            'cat': [None, '', 'cat', 'other', str(self.cat.id)],
+        }
+        names = choices.keys()
+        for type_ in (COLLECTIONS_TYPE_BASIC, COLLECTIONS_TYPE_FEATURED):
+            for values in itertools.product(*choices.values()):
+                filters = dict((name, value) for name, value
+                               in zip(names, values) if value is not None)
+                eq_(resolver.resolve(filters, type_),
+                    self.filterset(filters, type_), filters)
+
+    def test_invalid(self):
+        eq_(resolver.resolve({'region': 'xx'}, COLLECTIONS_TYPE_BASIC), None)
+        eq_(resolver.resolve({'carrier': '9999'}, COLLECTIONS_TYPE_BASIC),
+            None)
+        eq_(resolver.resolve({'cat': 'nope'}, COLLECTIONS_TYPE_BASIC), None)
+
+    def test_invalidated(self):
+        ok_(resolver.resolve({}, COLLECTIONS_TYPE_BASIC))
+        ok_(cache.get(resolver.CACHE_KEY))
+        collection = self.create(region=mkt.regions.US.id)
+        ok_(not cache.get(resolver.CACHE_KEY))
+        eq_(resolver.resolve({'region': 'us'}, COLLECTIONS_TYPE_BASIC),
+            ([collection.id], None))
+        collection.delete()
+        ok_(not cache.get(resolver.CACHE_KEY))
+
+    def test_invalidated_after_request(self):
+        collection = self.create(region=mkt.regions.US.id)
+        # A request reading the old data rebuilt the matrix meanwhile.
+        cache.set(resolver.CACHE_KEY, {'matrix': {}})
+        post_request_task._send_tasks()
+        ok_(not cache.get(resolver.CACHE_KEY))
+        eq_(resolver.resolve({'region': 'us'}, COLLECTIONS_TYPE_BASIC),
+            ([collection.id], None))
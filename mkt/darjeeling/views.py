@@ -21,7 +21,10 @@ class DarjeelingESAppSerializer(FireplaceESAppSerializer):
         exclude = FireplaceESAppSerializer.Meta.exclude
 
     def is_featured(self, obj):
-        collections = [c['id'] for c in obj.es_data.get('collection', [])]
+        return self.render_featured(obj.es_data)
+
+    def render_featured(self, data):
+        collections = [c['id'] for c in data.get('collection', [])]
         return self.context['featured_pk'] in collections
 
 
@@ -1,5 +1,6 @@
 import datetime
 import logging
+from collections import defaultdict
 
 import cronjobs
 from celery.task.sets import TaskSet
@@ -13,7 +14,8 @@ import lib.iarc
 
 from lib.iarc.utils import DESC_MAPPING, INTERACTIVES_MAPPING, RATINGS_MAPPING
 from mkt.developers.tasks import region_email, region_exclude
-from mkt.webapps.models import AddonExcludedRegion, Webapp
+from mkt.webapps.models import (AddonExcludedRegion, ContentRating,
+                                RatingDescriptors, RatingInteractives, Webapp)
 
 
 log = logging.getLogger('z.mkt.developers.cron')
@@ -77,63 +79,94 @@ def process_iarc_changes(date=None):
     })
     resp = client.Get_Rating_Changes(XMLString=xml)
     data = lib.iarc.utils.IARC_XML_Parser().parse_string(resp)
+    apply_iarc_changes(data.get('rows', []))
 
-    for row in data.get('rows', []):
+
+def _split(value):
+    return filter(None, [s.strip() for s in (value or '').split(',')])
+
+
+def apply_iarc_changes(rows):
+    """
+    Applies the rating changes reported by IARC. The apps of all the rows are
+    fetched in one query, then their descriptors, interactive elements and
+    ratings are written in batches.
+    """
+    changes = []
+    for row in rows:
         iarc_id = row.get('submission_id')
         if not iarc_id:
             log.debug('IARC changes contained no submission ID: %s' % row)
             continue
 
-        try:
-            app = Webapp.objects.get(iarc_info__submission_id=iarc_id)
-        except Webapp.DoesNotExist:
-            log.debug('Could not find app associated with IARC submission ID: '
-                      '%s' % iarc_id)
-            continue
-
         try:  # Any exceptions we catch, log, and keep going.
-            # Process 'new_rating'.
             ratings_body = row.get('rating_system')
             rating = RATINGS_MAPPING[ratings_body].get(row['new_rating'])
+            if rating is None:
+                raise ValueError('Unknown rating: %s' % row['new_rating'])
+            descriptors = filter(None, [
+                DESC_MAPPING[ratings_body].get(desc)
+                for desc in _split(row.get('new_descriptors'))])
+            interactives = filter(None, [
+                INTERACTIVES_MAPPING.get(desc)
+                for desc in _split(row.get('new_interactiveelements'))])
+            changes.append((int(iarc_id), ratings_body, rating, descriptors,
+                            interactives, row.get('change_reason')))
+        except Exception as e:
+            log.debug('Exception: %s' % e)
+            continue
 
-            _flag_rereview_adult(app, ratings_body, rating)
-
-            # Process 'new_descriptors'.
-            native_descs = filter(None, [
-                s.strip() for s in row.get('new_descriptors', '').split(',')])
-            descriptors = filter(None, [DESC_MAPPING[ratings_body].get(desc)
-                                        for desc in native_descs])
-            app.set_descriptors(descriptors)
+    apps = dict((app.iarc_info.submission_id, app) for app in
+                Webapp.objects.no_cache().select_related('iarc_info')
+                .filter(iarc_info__submission_id__in=[c[0] for c in changes]))
+    current = dict(((cr.addon_id, cr.ratings_body), cr.get_rating())
+                   for cr in ContentRating.objects.no_cache().filter(
+                       addon__in=[app.id for app in apps.values()]))
+
+    # When an app has several rows, the descriptors and interactive elements
+    # of the last one win, like when they were set one row at a time.
+    descriptors, interactives = {}, {}
+    ratings = defaultdict(dict)
+    logs = []
+    for iarc_id, ratings_body, rating, descs, inters, reason in changes:
+        app = apps.get(iarc_id)
+        if app is None:
+            log.debug('Could not find app associated with IARC submission ID: '
+                      '%s' % iarc_id)
+            continue
 
-            # Process 'new_interactiveelements'.
-            native_interactives = filter(None, [
-                s.strip() for s in
-                row.get('new_interactiveelements', '').split(',')])
-            interactives = filter(None, [INTERACTIVES_MAPPING.get(desc)
-                                         for desc in native_interactives])
-            app.set_interactives(interactives)
+        old_rating = current.get((app.id, ratings_body.id))
+        if old_rating:
+            _flag_if_adult(app, old_rating, rating)
+        current[app.id, ratings_body.id] = rating
 
-            # Save new rating.
-            app.set_content_ratings({ratings_body: rating})
+        descriptors[app.id] = RatingDescriptors.values_for(descs)
+        interactives[app.id] = RatingInteractives.values_for(inters)
+        ratings[app.id][ratings_body] = rating
+        logs.append((app, ratings_body, rating, reason))
 
-            # Log change reason.
-            reason = row.get('change_reason')
-            amo.log(amo.LOG.CONTENT_RATING_CHANGED, app,
-                    details={'comments': '%s:%s, %s' %
-                             (ratings_body.name, rating.name, reason)})
+    RatingDescriptors.bulk_set(descriptors)
+    RatingInteractives.bulk_set(interactives)
+    ContentRating.bulk_set(ratings)
 
+    for app in apps.values():
+        if app.id not in ratings:
+            continue
+        try:
+            app.content_ratings_changed()
         except Exception as e:
             log.debug('Exception: %s' % e)
-            continue
 
+    # Log change reasons.
+    for app, ratings_body, rating, reason in logs:
+        amo.log(amo.LOG.CONTENT_RATING_CHANGED, app,
+                details={'comments': '%s:%s, %s' %
+                         (ratings_body.name, rating.name, reason)})
 
-def _flag_rereview_adult(app, ratings_body, rating):
-    """Flag app for rereview if it receives an Adult content rating."""
-    old_rating = app.content_ratings.filter(ratings_body=ratings_body.id)
-    if not old_rating.exists():
-        return
 
-    if rating.adult and not old_rating[0].get_rating().adult:
+def _flag_if_adult(app, old_rating, rating):
+    """Flag app for rereview if it receives an Adult content rating."""
+    if rating.adult and not old_rating.adult:
         RereviewQueue.flag(
             app, amo.LOG.CONTENT_RATING_TO_ADULT,
             message=_('Content rating changed to Adult.'))
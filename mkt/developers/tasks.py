@@ -11,10 +11,11 @@ import traceback
 import urlparse
 import uuid
 import zipfile
-from datetime import date
+from datetime import date, datetime
 
 from django import forms
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.storage import default_storage as storage
 from django.utils.http import urlencode
 
@@ -58,8 +59,15 @@ def validator(upload_id, **kw):
         log.info(u'[FileUpload:%s] Does not exist.' % upload_id)
         return
 
+    # Uploads are validated right after being created, so that's how long the
+    # task waited in the queue.
+    wait = datetime.now() - upload.created
+    statsd.timing('mkt.developers.validator.queue_wait',
+                  wait.total_seconds() * 1000)
+
     try:
-        validation_result = run_validator(upload.path, url=kw.get('url'))
+        validation_result = run_validator(upload.path, url=kw.get('url'),
+                                          hash=upload.hash)
         if upload.validation:
             # If there's any preliminary validation result, merge it with the
             # actual validation result.
@@ -102,13 +110,45 @@ def file_validator(file_id, **kw):
         return
     # Unlike upload validation, let the validator raise an exception if there
     # is one.
-    result = run_validator(file.file_path, url=file.version.addon.manifest_url)
+    result = run_validator(file.file_path, url=file.version.addon.manifest_url,
+                           hash=file.hash)
     return FileValidation.from_json(file, result)
 
 
-def run_validator(file_path, url=None):
-    """A pre-configured wrapper around the app validator."""
+def validation_cache_key(hash, url=None):
+    """
+    Returns the key of the validation result of a file with the content
+    `hash` served from `url`, for the installed validator.
+    """
+    key = u'%s:%s:%s:%s' % (hash, url or '', settings.VALIDATOR_VERSION,
+                            ','.join(settings.VALIDATOR_IAF_URLS))
+    return 'validation:%s' % hashlib.md5(key.encode('utf-8')).hexdigest()
+
 
+def run_validator(file_path, url=None, hash=None):
+    """
+    A pre-configured wrapper around the app validator.
+
+    If the content `hash` of the file is given, the result is cached for
+    that content and the version of the validator, so that identical files
+    (re-uploads, files created from an upload) aren't validated again.
+    """
+    if hash:
+        key = validation_cache_key(hash, url)
+        result = cache.get(key)
+        if result is not None:
+            log.info(u'Using cached validation for path: %s' % file_path)
+            statsd.incr('mkt.developers.validator.cache_hit')
+            return result
+        statsd.incr('mkt.developers.validator.cache_miss')
+
+    result = _run_validator(file_path, url=url)
+    if hash:
+        cache.set(key, result, settings.VALIDATION_CACHE_TIMEOUT)
+    return result
+
+
+def _run_validator(file_path, url=None):
     with statsd.timer('mkt.developers.validator'):
         is_packaged = zipfile.is_zipfile(file_path)
         if is_packaged:
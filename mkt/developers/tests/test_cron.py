@@ -8,7 +8,7 @@ from devhub.models import ActivityLog
 
 import mkt
 import mkt.constants
-from mkt.developers.cron import (_flag_rereview_adult, exclude_new_region,
+from mkt.developers.cron import (_flag_if_adult, exclude_new_region,
                                  process_iarc_changes, send_new_region_emails)
 from mkt.webapps.models import IARCInfo
 
@@ -115,33 +115,60 @@ class TestIARCChangesCron(amo.tests.TestCase):
             app.rating_interactives.to_keys(),
             ['has_shares_location', 'has_shares_info'])
 
+    def test_processing_bulk(self):
+        """Both rows of the mock client are applied in batched writes."""
+        amo.set_user(amo.tests.user_factory())
+        app = amo.tests.app_factory()
+        IARCInfo.objects.create(addon=app, submission_id=52,
+                                security_code='FZ32CU8')
+        other = amo.tests.app_factory()
+        IARCInfo.objects.create(addon=other, submission_id=68,
+                                security_code='GZ32CU8')
+        other.set_interactives(['has_shares_info'])
+
+        with mock.patch('mkt.webapps.models.Webapp.content_ratings_changed'
+                        ) as changed:
+            process_iarc_changes()
+        eq_(changed.call_count, 2)
+
+        eq_(app.content_ratings.get().rating,
+            mkt.ratingsbodies.CLASSIND_18.id)
+        eq_(other.content_ratings.get().rating, mkt.ratingsbodies.USK_12.id)
+        eq_(other.reload().rating_interactives.to_keys(),
+            ['has_users_interact'])
+        eq_(ActivityLog.objects.filter(
+            action=amo.LOG.CONTENT_RATING_CHANGED.id).count(), 2)
+
+    def test_processing_unknown_app(self):
+        amo.set_user(amo.tests.user_factory())
+        app = amo.tests.app_factory()
+        IARCInfo.objects.create(addon=app, submission_id=68,
+                                security_code='GZ32CU8')
+        process_iarc_changes()
+        eq_(app.content_ratings.get().rating, mkt.ratingsbodies.USK_12.id)
+        eq_(ActivityLog.objects.filter(
+            action=amo.LOG.CONTENT_RATING_CHANGED.id).count(), 1)
+
     def test_rereview_flag_adult(self):
         amo.set_user(amo.tests.user_factory())
         app = amo.tests.app_factory()
 
-        app.set_content_ratings({
-            mkt.ratingsbodies.ESRB: mkt.ratingsbodies.ESRB_E,
-            mkt.ratingsbodies.CLASSIND: mkt.ratingsbodies.CLASSIND_18,
-        })
-        _flag_rereview_adult(app, mkt.ratingsbodies.ESRB,
-                             mkt.ratingsbodies.ESRB_T)
+        _flag_if_adult(app, mkt.ratingsbodies.ESRB_E,
+                       mkt.ratingsbodies.ESRB_T)
         assert not app.rereviewqueue_set.count()
         assert not ActivityLog.objects.filter(
             action=amo.LOG.CONTENT_RATING_TO_ADULT.id).exists()
 
         # Adult should get flagged to rereview.
-        _flag_rereview_adult(app, mkt.ratingsbodies.ESRB,
-                             mkt.ratingsbodies.ESRB_A)
+        _flag_if_adult(app, mkt.ratingsbodies.ESRB_E,
+                       mkt.ratingsbodies.ESRB_A)
         eq_(app.rereviewqueue_set.count(), 1)
         eq_(ActivityLog.objects.filter(
             action=amo.LOG.CONTENT_RATING_TO_ADULT.id).count(), 1)
 
         # Test things same same if rating stays the same as adult.
-        app.set_content_ratings({
-            mkt.ratingsbodies.ESRB: mkt.ratingsbodies.ESRB_A,
-        })
-        _flag_rereview_adult(app, mkt.ratingsbodies.ESRB,
-                             mkt.ratingsbodies.ESRB_A)
+        _flag_if_adult(app, mkt.ratingsbodies.ESRB_A,
+                       mkt.ratingsbodies.ESRB_A)
         eq_(app.rereviewqueue_set.count(), 1)
         eq_(ActivityLog.objects.filter(
             action=amo.LOG.CONTENT_RATING_TO_ADULT.id).count(), 1)
@@ -14,7 +14,7 @@ from django.core.files.storage import default_storage as storage
 from django.test.utils import override_settings
 
 import mock
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 from PIL import Image, ImageChops
 from requests import RequestException
 
@@ -166,6 +166,40 @@ class TestValidator(amo.tests.TestCase):
         assert error is not None
         assert error.startswith('Traceback (most recent call last)'), error
 
+    @mock.patch('mkt.developers.tasks._run_validator')
+    def test_validation_cached(self, _mock):
+        _mock.return_value = '{"errors": 0}'
+        self.upload.update(hash='sha256:abc')
+        tasks.validator(self.upload.pk)
+        upload = FileUpload.objects.create(hash='sha256:abc')
+        tasks.validator(upload.pk)
+        eq_(_mock.call_count, 1)
+        assert FileUpload.objects.get(pk=upload.pk).valid
+
+    @mock.patch('mkt.developers.tasks._run_validator')
+    def test_validation_cache_per_content(self, _mock):
+        _mock.return_value = '{"errors": 0}'
+        self.upload.update(hash='sha256:abc')
+        tasks.validator(self.upload.pk)
+        upload = FileUpload.objects.create(hash='sha256:def')
+        tasks.validator(upload.pk)
+        eq_(_mock.call_count, 2)
+
+    def test_validation_cache_key(self):
+        key = tasks.validation_cache_key('sha256:abc')
+        eq_(key, tasks.validation_cache_key('sha256:abc', url=None))
+        assert key != tasks.validation_cache_key('sha256:abc',
+                                                 url='http://x.com')
+        with self.settings(VALIDATOR_VERSION='abc'):
+            assert key != tasks.validation_cache_key('sha256:abc')
+
+    def test_validator_version_pinned(self):
+        # VALIDATOR_VERSION must be bumped with the requirement.
+        path = os.path.join(settings.ROOT, 'requirements', 'prod.txt')
+        with open(path) as f:
+            ok_('app-validator.git@%s#' % settings.VALIDATOR_VERSION
+                in f.read())
+
     @mock.patch('mkt.developers.tasks.validate_app')
     @mock.patch('mkt.developers.tasks.storage.open')
     def test_validate_manifest(self, _open, _mock):
@@ -15,7 +15,7 @@ from mkt.collections.serializers import (CollectionMembershipField,
 from mkt.collections.views import CollectionViewSet as BaseCollectionViewSet
 from mkt.search.api import (FeaturedSearchView as BaseFeaturedSearchView,
                             SearchView as BaseSearchView)
-from mkt.search.serializers import SimpleESAppSerializer
+from mkt.search.serializers import es_icon_url, SimpleESAppSerializer
 from mkt.webapps.api import SimpleAppSerializer, AppViewSet as BaseAppViewset
 
 
@@ -47,12 +47,21 @@ class FireplaceESAppSerializer(BaseFireplaceAppSerializer,
         exclude = FireplaceAppSerializer.Meta.exclude
 
     def get_weight(self, obj):
-        return obj.es_data.get('weight', 1)
+        return self.render_weight(obj.es_data)
 
     def get_user_info(self, app):
         # Fireplace search should always be anonymous for extra-cacheability.
         return None
 
+    def render_icons(self, data):
+        return {64: es_icon_url(data, 64)}
+
+    def render_user(self, data):
+        return None
+
+    def render_weight(self, data):
+        return data.get('weight', 1)
+
 
 class FireplaceCollectionMembershipField(CollectionMembershipField):
     app_serializer_classes = {
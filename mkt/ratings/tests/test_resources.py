@@ -636,6 +636,46 @@ class TestRatingResourcePagination(RestOAuth, amo.tests.AMOPaths):
         data = json.loads(res.content)
         eq_(data['meta']['total_count'], 10)
 
+    def test_total_count_user(self):
+        Review.objects.create(addon=self.app, user=self.user,
+                              version=self.app.current_version, rating=0)
+        self.app.update(total_reviews=10)
+        res = self.client.get(self.url, {'user': self.user.pk})
+        data = json.loads(res.content)
+        eq_(data['meta']['total_count'], 1)
+
+    def test_cursor(self):
+        revs = [Review.objects.create(addon=self.app, user=user,
+                                      version=self.app.current_version,
+                                      rating=3)
+                for user in (self.user, self.user2, self.user3)]
+        # Two reviews created at the same time are told apart by their id.
+        revs[0].update(created=self.days_ago(3))
+        revs[1].update(created=self.days_ago(3))
+        revs[2].update(created=self.days_ago(2))
+
+        res = self.client.get(self.url, {'limit': 2, 'cursor': ''})
+        eq_(res.status_code, 200)
+        data = json.loads(res.content)
+        eq_([o['resource_uri'] for o in data['objects']],
+            [reverse('ratings-detail', kwargs={'pk': revs[2].pk}),
+             reverse('ratings-detail', kwargs={'pk': revs[1].pk})])
+        eq_(data['meta']['previous'], None)
+        eq_(data['meta']['limit'], 2)
+        next = urlparse(data['meta']['next'])
+        eq_(next.path, self.url)
+        cursor = QueryDict(next.query)['cursor']
+
+        res = self.client.get(self.url, {'limit': 2, 'cursor': cursor})
+        data = json.loads(res.content)
+        eq_([o['resource_uri'] for o in data['objects']],
+            [reverse('ratings-detail', kwargs={'pk': revs[0].pk})])
+        eq_(data['meta']['next'], None)
+
+    def test_invalid_cursor(self):
+        res = self.client.get(self.url, {'cursor': 'bogus'})
+        eq_(res.status_code, 400)
+
 
 class TestReviewFlagResource(RestOAuth, amo.tests.AMOPaths):
     fixtures = fixture('user_2519', 'webapp_337141')
@@ -1,10 +1,17 @@
+import base64
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q, Sum
 from django.http import Http404
 
+import caching.base as caching
 import commonware.log
 from rest_framework.decorators import action
 from rest_framework.exceptions import (MethodNotAllowed, NotAuthenticated,
-                                       PermissionDenied)
+                                       ParseError, PermissionDenied)
 from rest_framework.mixins import CreateModelMixin
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
@@ -20,6 +27,7 @@ from mkt.api.authentication import (RestAnonymousAuthentication,
 from mkt.api.authorization import (AnyOf, AllowOwner, AllowRelatedAppOwner,
                                    ByHttpMethod, GroupPermission)
 from mkt.api.base import CORSMixin, MarketplaceView
+from mkt.api.paginator import CursorPage, CursorPaginationSerializer
 from mkt.ratings.serializers import RatingFlagSerializer, RatingSerializer
 from mkt.regions import REGIONS_DICT, get_region
 from mkt.webapps.models import Webapp
@@ -27,17 +35,43 @@ from mkt.webapps.models import Webapp
 
 log = commonware.log.getLogger('z.api')
 
+CURSOR_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+def encode_cursor(review):
+    """Returns the opaque cursor pointing after `review`."""
+    return base64.urlsafe_b64encode('%s,%s' % (
+        review.created.strftime(CURSOR_DATE_FORMAT), review.pk))
+
+
+def decode_cursor(cursor):
+    """Returns the (created, id) tuple of `cursor`, raises ParseError."""
+    try:
+        created, pk = base64.urlsafe_b64decode(str(cursor)).split(',')
+        return datetime.strptime(created, CURSOR_DATE_FORMAT), int(pk)
+    except (TypeError, ValueError):
+        raise ParseError('Invalid cursor.')
+
 
 class RatingPaginator(Paginator):
-    # FIXME: This is only right when ?app= filtering is applied, if no
-    # filtering or if ?user= filtering is done, it's completely wrong.
+    """
+    Paginator taking its total from `get_count`, which uses denormalized
+    counters where possible instead of a COUNT query.
+    """
+    def __init__(self, object_list, per_page, get_count=None, **kw):
+        super(RatingPaginator, self).__init__(object_list, per_page, **kw)
+        self.get_count = get_count
+
     @property
     def count(self):
-        try:
-            r = self.object_list[0]
-        except IndexError:
-            return 0
-        return r.addon.total_reviews
+        if self._count is None:
+            try:
+                self.object_list[0]
+            except IndexError:
+                self._count = 0
+            else:
+                self._count = self.get_count()
+        return self._count
 
 
 class RatingViewSet(CORSMixin, MarketplaceView, ModelViewSet):
@@ -90,6 +124,55 @@ class RatingViewSet(CORSMixin, MarketplaceView, ModelViewSet):
             queryset = queryset.filter(**filters)
         return queryset
 
+    def get_approximate_count(self, queryset):
+        """
+        Returns the number of ratings in the listing, taken from the
+        denormalized counters of the apps unless it's filtered on a user,
+        which only has a few of them.
+        """
+        app = getattr(self, 'app', None)
+        if 'user' in self.request.GET:
+            return queryset.count()
+        elif app:
+            return app.total_reviews
+        f = lambda: (Webapp.objects.aggregate(total=Sum('total_reviews'))
+                     ['total'] or 0)
+        return caching.cached(f, 'ratings:count:all',
+                              settings.CACHE_COUNT_TIMEOUT)
+
+    def paginate_queryset(self, queryset, page_size=None):
+        """
+        Uses keyset pagination on (created, id) when a `cursor` is given,
+        the regular offset pagination otherwise.
+        """
+        get_count = partial(self.get_approximate_count, queryset)
+        cursor = self.request.QUERY_PARAMS.get('cursor')
+        if cursor is None:
+            self.paginator_class = partial(RatingPaginator,
+                                           get_count=get_count)
+            return super(RatingViewSet, self).paginate_queryset(
+                queryset, page_size=page_size)
+
+        per_page = self.get_paginate_by()
+        queryset = queryset.order_by('-created', '-id')
+        if cursor:
+            created, pk = decode_cursor(cursor)
+            queryset = queryset.filter(Q(created__lt=created) |
+                                       Q(created=created, id__lt=pk))
+        # Fetch one more to know whether there is a next page.
+        objects = list(queryset[:per_page + 1])
+        next_cursor = None
+        if len(objects) > per_page:
+            objects = objects[:per_page]
+            next_cursor = encode_cursor(objects[-1])
+        return CursorPage(objects, per_page, next_cursor=next_cursor,
+                          count=get_count())
+
+    def get_pagination_serializer(self, page):
+        if isinstance(page, CursorPage):
+            self.pagination_serializer_class = CursorPaginationSerializer
+        return super(RatingViewSet, self).get_pagination_serializer(page)
+
     def get_user(self, ident):
         pk = ident
         if pk == 'mine':
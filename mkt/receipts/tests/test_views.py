@@ -18,7 +18,7 @@ from amo.urlresolvers import reverse
 from devhub.models import AppLog
 from mkt.constants import apps
 from mkt.site.fixtures import fixture
-from mkt.webapps.models import Webapp
+from mkt.webapps.models import InstallCount, Webapp
 from mkt.receipts.utils import create_test_receipt
 from mkt.receipts.views import devhub_verify
 from services.verify import decode_receipt, settings as verify_settings
@@ -194,6 +194,8 @@ class TestInstall(amo.tests.TestCase):
         eq_(ins.client_data.is_chromeless, False)
         eq_(not ins.client_data.language, False)
         eq_(not ins.client_data.region, False)
+        eq_(InstallCount.get_counts(self.addon.id),
+            {InstallCount.ALL_REGIONS: 1, ins.client_data.region: 1})
 
 
 class TestReceiptVerify(amo.tests.TestCase):
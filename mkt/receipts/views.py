@@ -65,10 +65,6 @@ def _record(request, addon):
         # receipt.
         install_type = (apps.INSTALL_TYPE_DEVELOPER if is_dev
                         else apps.INSTALL_TYPE_USER)
-        # Log the install.
-        installed, c = Installed.objects.get_or_create(addon=addon,
-            user=request.amo_user, install_type=install_type)
-
         # Get download source from GET if it exists, if so get the download
         # source object if it exists. Then grab a client data object to hook up
         # with the Installed object.
@@ -86,7 +82,14 @@ def _record(request, addon):
             is_chromeless=request.POST.get('chromeless', False),
             language=request.LANG,
             region=region)
-        installed.update(client_data=client_data)
+
+        # Log the install. New ones get the client data right away so that
+        # they're counted in its region.
+        installed, c = Installed.objects.get_or_create(addon=addon,
+            user=request.amo_user, install_type=install_type,
+            defaults={'client_data': client_data})
+        if not c:
+            installed.update(client_data=client_data)
 
         # Get a suitable uuid for this receipt.
         uuid = get_uuid(addon, request.amo_user)
@@ -12,6 +12,7 @@ from mkt.api.authentication import (RestSharedSecretAuthentication,
                                     RestOAuthAuthentication)
 from mkt.api.base import CORSMixin, form_errors, MarketplaceView
 from mkt.api.paginator import ESPaginator
+from mkt.collections import resolver
 from mkt.collections.constants import (COLLECTIONS_TYPE_BASIC,
                                        COLLECTIONS_TYPE_FEATURED,
                                        COLLECTIONS_TYPE_OPERATOR)
@@ -19,6 +20,7 @@ from mkt.collections.filters import CollectionFilterSetWithFallback
 from mkt.collections.models import Collection
 from mkt.collections.serializers import CollectionSerializer
 from mkt.features.utils import get_feature_profile
+from mkt.search import cache
 from mkt.search.views import _filter_search
 from mkt.search.forms import ApiSearchForm, TARAKO_CATEGORIES_MAPPING
 from mkt.search.serializers import (ESAppSerializer, RocketbarESAppSerializer,
@@ -50,8 +52,28 @@ class SearchView(CORSMixin, MarketplaceView, GenericAPIView):
         return self.get_pagination_serializer(page), query
 
     def get(self, request, *args, **kwargs):
-        serializer, _ = self.search(request)
-        return Response(serializer.data)
+        return Response(self.search_data(request))
+
+    def search_data(self, request):
+        """
+        Return the serialized search results. Anonymous results come from
+        the cache when possible, without querying ES.
+        """
+        return self.cached(request, lambda: self.search(request)[0].data)
+
+    def cached(self, request, build, extra=None):
+        """
+        Return what `build()` returns for `request`, from the cache if it's
+        anonymous. `extra` is what it depends on besides the search filters.
+        """
+        if not cache.is_enabled(request):
+            return build()
+        key = cache.get_key(request, self.__class__.__name__,
+                            self.get_search_data(request),
+                            region=self.get_region_from_request(request),
+                            profile=get_feature_profile(request),
+                            extra=extra)
+        return cache.get_or_build(key, build)
 
     def get_search_data(self, request):
         form = self.form_class(request.GET if request else None)
@@ -79,11 +101,19 @@ class FeaturedSearchView(SearchView):
         region = self.get_region_from_request(request)
         if region:
             filters.setdefault('region', region.slug)
+        resolved = None
         if collection_type is not None:
-            qs = Collection.public.filter(collection_type=collection_type)
+            resolved = resolver.resolve(filters, collection_type)
+        if resolved is not None:
+            ids, fallback = resolved
+            qs = Collection.public.filter(pk__in=ids[:limit])
         else:
-            qs = Collection.public.all()
-        qs = CollectionFilterSetWithFallback(filters, queryset=qs).qs
+            if collection_type is not None:
+                qs = Collection.public.filter(collection_type=collection_type)
+            else:
+                qs = Collection.public.all()
+            qs = CollectionFilterSetWithFallback(filters, queryset=qs).qs
+            fallback = getattr(qs, 'filter_fallback', None)
         preview_mode = filters.get('preview', False)
         serializer = self.collections_serializer_class(qs[:limit], many=True,
             context={
@@ -91,12 +121,16 @@ class FeaturedSearchView(SearchView):
                 'view': self,
                 'use-es-for-apps': not preview_mode
         })
-        return serializer.data, getattr(qs, 'filter_fallback', None)
+        return serializer.data, fallback
 
     def get(self, request, *args, **kwargs):
-        serializer, _ = self.search(request)
-        data, filter_fallbacks = self.add_featured_etc(request,
-                                                       serializer.data)
+        # The collections and their fallbacks are cached with the results,
+        # they depend on all the query string.
+        data, filter_fallbacks = self.cached(
+            request,
+            lambda: self.add_featured_etc(request,
+                                          self.search(request)[0].data),
+            extra=sorted(request.GET.items()))
         response = Response(data)
         for name, value in filter_fallbacks.items():
             response['API-Fallback-%s' % name] = ','.join(value)
@@ -0,0 +1,119 @@
+"""
+Cache of the anonymous responses of the search API.
+
+An anonymous response only depends on the cleaned form data and on the
+filters `APIFilterMiddleware` varies on: region, carrier, device flags,
+feature profile and language. The key is a hash of their normalized values,
+so `?cat=games&sort=downloads` and `?q=&sort=downloads&cat=games` share an
+entry.
+
+Entries are fresh for SEARCH_CACHE_TIMEOUT seconds and kept twice as long:
+once an entry is stale, one request rebuilds it while the others are served
+the stale copy. When there's no entry at all, the requests that didn't get
+to build it wait a little for the one that does. All the keys are in a
+namespace that is bumped when reindex_mkt points the alias to a new index.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+import commonware.log
+import waffle
+from django_statsd.clients import statsd
+
+from amo.utils import cache_ns_key
+from mkt.carriers import get_carrier
+
+
+log = commonware.log.getLogger('z.mkt.search')
+
+NAMESPACE = 'search-api'
+
+# How long a request waits for another one to build a missing entry.
+WAIT = 0.5
+WAIT_STEP = 0.05
+
+
+def is_enabled(request):
+    return (settings.SEARCH_CACHE_TIMEOUT > 0 and
+            not request.user.is_authenticated())
+
+
+def get_key(request, view, data, region=None, profile=None, extra=None):
+    """
+    Return the cache key of the `view` results for `request`, `data` being
+    the cleaned search form data and `extra` anything else the results of
+    that view depend on.
+    """
+    parts = {
+        'view': view,
+        'data': sorted((k, v) for k, v in data.items()
+                       if v not in (None, '', [])),
+        'region': region.slug if region else None,
+        'request_region': request.REGION.slug,
+        'carrier': get_carrier(),
+        'devices': [request.GAIA, request.MOBILE, request.TABLET],
+        'profile': profile.to_signature() if profile else None,
+        'lang': request.LANG,
+        'page': [request.GET.get(k) for k in ('limit', 'offset', 'page')],
+        'override': waffle.flag_is_active(request,
+                                          'override-region-exclusion'),
+        'extra': extra,
+    }
+    digest = hashlib.md5(json.dumps(parts, sort_keys=True,
+                                    default=unicode)).hexdigest()
+    return 'search:%s:%s' % (cache_ns_key(NAMESPACE), digest)
+
+
+def get_or_build(key, build):
+    """
+    Return the cached value of `key`, calling `build()` to refresh it when
+    it's missing or stale.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        fresh_until, value = entry
+        if fresh_until > time.time() or not _lock(key):
+            statsd.incr('search.cache.hit')
+            return value
+        statsd.incr('search.cache.stale')
+        return _build(key, build)
+
+    if _lock(key):
+        statsd.incr('search.cache.miss')
+        return _build(key, build)
+
+    # Somebody else is building it, give them a chance to finish.
+    waited = 0
+    while waited < WAIT:
+        time.sleep(WAIT_STEP)
+        waited += WAIT_STEP
+        entry = cache.get(key)
+        if entry is not None:
+            statsd.incr('search.cache.hit')
+            return entry[1]
+    statsd.incr('search.cache.miss')
+    return build()
+
+
+def invalidate():
+    """Forget all the cached responses, e.g. after a reindex."""
+    log.info('Invalidating the search API cache.')
+    cache_ns_key(NAMESPACE, increment=True)
+
+
+def _lock(key):
+    return cache.add(key + ':lock', 1, settings.SEARCH_CACHE_TIMEOUT)
+
+
+def _build(key, build):
+    try:
+        value = build()
+        timeout = settings.SEARCH_CACHE_TIMEOUT
+        cache.set(key, (time.time() + timeout, value), timeout * 2)
+        return value
+    finally:
+        cache.delete(key + ':lock')
@@ -0,0 +1,45 @@
+import time
+from optparse import make_option
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test.client import RequestFactory
+
+import mkt
+from mkt.search.serializers import ESAppSerializer
+from mkt.search.utils import S
+from mkt.webapps.models import WebappIndexer
+
+
+class FakeAppSerializer(ESAppSerializer):
+    render_directly = False
+
+
+class Command(BaseCommand):
+    help = ('Measure how many search results per second ESAppSerializer '
+            'renders, through fake apps and directly.')
+    option_list = BaseCommand.option_list + (
+        make_option('--hits', action='store', type='int', default=25,
+                    help='Number of results per page [default: 25].'),
+        make_option('--rounds', action='store', type='int', default=20,
+                    help='Number of pages to render [default: 20].'),
+    )
+
+    def handle(self, *args, **kw):
+        hits = S(WebappIndexer)[:kw['hits']].execute().objects
+        if not hits:
+            raise CommandError('There are no apps in the index.')
+
+        request = RequestFactory().get('/')
+        request.REGION = mkt.regions.RESTOFWORLD
+        request.user = AnonymousUser()
+        context = {'request': request}
+
+        for name, serializer_class in (('fake apps', FakeAppSerializer),
+                                       ('direct', ESAppSerializer)):
+            start = time.time()
+            for i in range(kw['rounds']):
+                serializer_class(hits, many=True, context=context).data
+            elapsed = time.time() - start
+            self.stdout.write('%-10s %8.0f results/s' % (
+                name, len(hits) * kw['rounds'] / elapsed))
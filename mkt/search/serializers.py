@@ -1,6 +1,8 @@
+import time
 from datetime import datetime
 
 from django.conf import settings
+from django.utils.http import urlquote
 
 from rest_framework import serializers
 
@@ -9,19 +11,79 @@ from addons.models import Category, Preview
 from amo.helpers import absolutify
 from amo.urlresolvers import reverse
 from constants.applications import DEVICE_TYPES
+from users.entitlements import get_entitlements
 from versions.models import Version
 
 import mkt
-from mkt.api.fields import ESTranslationSerializerField
+from mkt.api.fields import (ESTranslationSerializerField,
+                            TranslationSerializerField)
 from mkt.submit.serializers import SimplePreviewSerializer
-from mkt.webapps.models import Geodata, Webapp
+from mkt.webapps.models import Geodata, Installed, Webapp
 from mkt.webapps.utils import (dehydrate_content_rating,
                                dehydrate_descriptors,
                                dehydrate_interactives)
 from mkt.webapps.api import AppSerializer, SimpleAppSerializer
 
 
+# Stands for the id or slug of an app in the URL templates.
+PLACEHOLDER = 31415926535
+
+
+class _Placeholder(object):
+    pk = id = PLACEHOLDER
+
+
+def _url_template(url):
+    """Turn a URL reversed for PLACEHOLDER into a %-format string."""
+    return url.replace('%', '%%').replace(str(PLACEHOLDER), '%s')
+
+
+def es_icon_url(data, size):
+    """Like Webapp.get_icon_url(size) for an app in ES, always a PNG."""
+    if size not in amo.ADDON_ICON_SIZES and size >= amo.ADDON_ICON_SIZES[0]:
+        size = [s for s in amo.ADDON_ICON_SIZES if s < size][-1]
+    elif size < amo.ADDON_ICON_SIZES[0]:
+        size = amo.ADDON_ICON_SIZES[0]
+    return settings.ADDON_ICON_URL % (str(data['id'])[:-3] or 0, data['id'],
+                                      size, data.get('icon_hash') or 'never')
+
+
+def _preview_url(preview, url_template):
+    """Like Preview._image_url() for a preview of an app in ES."""
+    modified = preview['modified']
+    modified = int(time.mktime(modified.timetuple())) if modified else 0
+    args = [preview['id'] / 1000, preview['id'], modified]
+    if '.png' not in url_template:
+        filetype = preview['filetype']
+        args.insert(2, filetype.split('/')[1] if filetype else 'png')
+    return url_template % tuple(args)
+
+
+def _defined_in(cls, name):
+    """
+    Return the position in the MRO of `cls` of the class defining the
+    attribute `name`, or None.
+    """
+    for index, klass in enumerate(cls.__mro__):
+        if name in vars(klass):
+            return index
+
+
 class ESAppSerializer(AppSerializer):
+    """
+    Serializes apps straight from their ES documents.
+
+    Every field has a `render_<field>(data)` method that computes its value
+    from the document, so that a hit is rendered without building the fake
+    Webapp and related instances, nor going through each field of the
+    serializer. Subclasses adding a field or overriding a `get_<field>`
+    method must provide the matching `render_<field>` method, otherwise or
+    when `render_directly` is False the hits go through `create_fake_app()`
+    and the regular serializer instead. So do premium apps, whose prices
+    aren't in ES.
+    """
+    render_directly = True
+
     # Fields specific to search.
     absolute_url = serializers.SerializerMethodField('get_absolute_url')
     is_offline = serializers.BooleanField()
@@ -61,6 +123,8 @@ class ESAppSerializer(AppSerializer):
         for field_name in self.fields:
             self.fields[field_name].read_only = True
 
+        self._renderers = None
+
     @property
     def data(self):
         """
@@ -80,9 +144,74 @@ class ESAppSerializer(AppSerializer):
         return [self.to_native(item) for item in obj.object_list]
 
     def to_native(self, obj):
-        app = self.create_fake_app(obj._source)
+        data = obj._source
+        if self.can_render(data):
+            return self.render(data)
+        app = self.create_fake_app(data)
         return super(ESAppSerializer, self).to_native(app)
 
+    def can_render(self, data):
+        if self._renderers is None:
+            self._renderers = self.get_renderers()
+        return (bool(self._renderers) and
+                data.get('premium_type') not in amo.ADDON_PREMIUMS)
+
+    def get_renderers(self):
+        """
+        Return the (key, render method, conversion) of each field, or an
+        empty list if some field can't be rendered directly.
+        """
+        if not self.render_directly:
+            return []
+        renderers = []
+        for field_name, field in self.fields.items():
+            render = getattr(self, 'render_%s' % field_name, None)
+            if render is None:
+                return []
+            # A getter overridden below the render method would be ignored.
+            getter = (field.method_name
+                      if isinstance(field, serializers.SerializerMethodField)
+                      else 'get_%s' % field_name)
+            getter_index = _defined_in(type(self), getter)
+            if (getter_index is not None and
+                getter_index < _defined_in(type(self),
+                                           'render_%s' % field_name)):
+                return []
+            field.initialize(parent=self, field_name=field_name)
+            # Translations, nested serializers and related fields render
+            # their final value, the others still need converting, e.g. the
+            # dates to strings.
+            convert = (None if isinstance(field, (
+                TranslationSerializerField, serializers.BaseSerializer,
+                serializers.RelatedField)) else field.to_native)
+            renderers.append((self.get_field_key(field_name), render, convert))
+
+        # What doesn't change from one app to the other.
+        self._url_templates = {}
+        for field_name in ('privacy_policy', 'resource_uri'):
+            if field_name in self.fields:
+                self._url_templates[field_name] = _url_template(
+                    self.fields[field_name].field_to_native(_Placeholder(),
+                                                            field_name))
+        if 'absolute_url' in self.fields:
+            app = Webapp(app_slug=str(PLACEHOLDER), type=amo.ADDON_WEBAPP)
+            self._url_templates['absolute_url'] = _url_template(
+                absolutify(app.get_absolute_url()))
+        self._regions = sorted(
+            (mkt.regions.REGIONS_CHOICES_ID_DICT[region_id]
+             for region_id in mkt.regions.ALL_REGION_IDS),
+            key=lambda region: region.slug)
+        self._rendered_regions = {}
+        return renderers
+
+    def render(self, data):
+        """Render the ES document `data` like to_native() would."""
+        ret = self._dict_class()
+        for key, render, convert in self._renderers:
+            value = render(data)
+            ret[key] = convert(value) if convert else value
+        return ret
+
     def create_fake_app(self, data):
         """Create a fake instance of Webapp and related models from ES data."""
         is_packaged = data['app_type'] != amo.ADDON_WEBAPP_HOSTED
@@ -144,29 +273,184 @@ class ESAppSerializer(AppSerializer):
         return obj
 
     def get_content_ratings(self, obj):
+        return self.render_content_ratings(obj.es_data)
+
+    def get_versions(self, obj):
+        return self.render_versions(obj.es_data)
+
+    def get_ratings_aggregates(self, obj):
+        return self.render_ratings(obj.es_data)
+
+    def get_upsell(self, obj):
+        return self.render_upsell(obj.es_data)
+
+    def get_absolute_url(self, obj):
+        return absolutify(obj.get_absolute_url())
+
+    def get_tags(self, obj):
+        return self.render_tags(obj.es_data)
+
+    def _translation(self, data, field_name, source=None):
+        """Like ESTranslationSerializerField.field_to_native()."""
+        translations = dict(
+            (v.get('lang', ''), v.get('string', ''))
+            for v in data.get('%s_translations' % (source or field_name),
+                              {}) or {})
+        language = self.fields[field_name].requested_language
+        if not language:
+            return translations or None
+        return (translations.get(language) or
+                translations.get(data.get('default_locale')) or
+                translations.get(settings.LANGUAGE_CODE) or None)
+
+    def render_absolute_url(self, data):
+        return self._url_templates['absolute_url'] % urlquote(
+            data['app_slug'])
+
+    def render_app_type(self, data):
+        return amo.ADDON_WEBAPP_TYPES[data['app_type']]
+
+    def render_author(self, data):
+        return data['author']
+
+    def render_banner_message(self, data):
+        return self._translation(data, 'banner_message')
+
+    def render_banner_regions(self, data):
+        # The fake Geodata never has any.
+        return []
+
+    def render_categories(self, data):
+        return list(data['category'])
+
+    def render_content_ratings(self, data):
         body = (mkt.regions.REGION_TO_RATINGS_BODY().get(
             self.context['request'].REGION.slug, 'generic'))
         return {
             'body': body,
             'rating': dehydrate_content_rating(
-                (obj.es_data.get('content_ratings') or {})
+                (data.get('content_ratings') or {})
                 .get(body)) or None,
             'descriptors': dehydrate_descriptors(
-                obj.es_data.get('content_descriptors', {})
+                data.get('content_descriptors', {})
             ).get(body, []),
             'interactives': dehydrate_interactives(
-                obj.es_data.get('interactive_elements', [])),
+                data.get('interactive_elements', [])),
         }
 
-    def get_versions(self, obj):
-        return dict((v['version'], v['resource_uri'])
-                    for v in obj.es_data['versions'])
+    def render_created(self, data):
+        return data.get('created')
 
-    def get_ratings_aggregates(self, obj):
-        return obj.es_data.get('ratings', {})
+    def render_current_version(self, data):
+        return data['current_version']
 
-    def get_upsell(self, obj):
-        upsell = obj.es_data.get('upsell', False)
+    def render_default_locale(self, data):
+        return data.get('default_locale')
+
+    def render_description(self, data):
+        return self._translation(data, 'description')
+
+    def render_device_types(self, data):
+        return [DEVICE_TYPES[d].api_name for d in data['device']]
+
+    def render_homepage(self, data):
+        return self._translation(data, 'homepage')
+
+    def render_icons(self, data):
+        return dict((size, es_icon_url(data, size))
+                    for size in (16, 48, 64, 128))
+
+    def render_id(self, data):
+        return data['id']
+
+    def render_is_offline(self, data):
+        return data.get('is_offline')
+
+    def render_is_packaged(self, data):
+        return data['app_type'] != amo.ADDON_WEBAPP_HOSTED
+
+    def render_manifest_url(self, data):
+        return data.get('manifest_url')
+
+    def render_name(self, data):
+        return self._translation(data, 'name')
+
+    # Premium apps aren't rendered directly, for the others these are
+    # constant.
+    def render_payment_account(self, data):
+        return None
+
+    def render_payment_required(self, data):
+        return False
+
+    def render_price(self, data):
+        return None
+
+    def render_price_locale(self, data):
+        return None
+
+    def render_premium_type(self, data):
+        return data.get('premium_type')
+
+    def render_previews(self, data):
+        return [{'image_url': _preview_url(p, settings.PREVIEW_FULL_URL),
+                 'thumbnail_url': _preview_url(
+                     p, settings.PREVIEW_THUMBNAIL_URL)}
+                for p in data['previews']]
+
+    def render_privacy_policy(self, data):
+        return self._url_templates['privacy_policy'] % data['id']
+
+    def render_public_stats(self, data):
+        return data['has_public_stats']
+
+    def render_ratings(self, data):
+        return data.get('ratings', {})
+
+    def render_regions(self, data):
+        excluded = set(data['region_exclusions'] or [])
+        regions = []
+        for region in self._regions:
+            if region.id not in excluded:
+                if region.id not in self._rendered_regions:
+                    self._rendered_regions[region.id] = (
+                        self.fields['regions'].to_native(region))
+                regions.append(self._rendered_regions[region.id])
+        return regions
+
+    def render_release_notes(self, data):
+        return self._translation(data, 'release_notes')
+
+    def render_resource_uri(self, data):
+        return self._url_templates['resource_uri'] % data['id']
+
+    def render_reviewed(self, data):
+        return data.get('reviewed')
+
+    def render_slug(self, data):
+        return data['app_slug']
+
+    def render_status(self, data):
+        return data.get('status')
+
+    def render_support_email(self, data):
+        return self._translation(data, 'support_email')
+
+    def render_support_url(self, data):
+        return self._translation(data, 'support_url')
+
+    def render_supported_locales(self, data):
+        locales = data['supported_locales']
+        if locales:
+            return (locales.split(',') if isinstance(locales, basestring)
+                    else locales)
+        return []
+
+    def render_tags(self, data):
+        return data['tags']
+
+    def render_upsell(self, data):
+        upsell = data.get('upsell', False)
         if upsell:
             region_id = self.context['request'].REGION.id
             exclusions = upsell.get('region_exclusions')
@@ -177,11 +461,24 @@ class ESAppSerializer(AppSerializer):
                 upsell = False
         return upsell
 
-    def get_absolute_url(self, obj):
-        return absolutify(obj.get_absolute_url())
+    def render_user(self, data):
+        user = getattr(self.context.get('request'), 'amo_user', None)
+        if user:
+            return {
+                'developed': get_entitlements(user).has_role(
+                    data['id'], [amo.AUTHOR_ROLE_OWNER]),
+                'installed': Installed.objects.filter(
+                    addon=data['id'], user=user).exists(),
+                'purchased': data['id'] in user.purchase_ids(),
+            }
+
+    def render_versions(self, data):
+        return dict((v['version'], v['resource_uri'])
+                    for v in data['versions'])
 
-    def get_tags(self, obj):
-        return obj.es_data['tags']
+    def render_weekly_downloads(self, data):
+        if data['has_public_stats']:
+            return data.get('weekly_downloads')
 
 
 class SimpleESAppSerializer(ESAppSerializer):
@@ -199,6 +496,9 @@ class SuggestionsESAppSerializer(ESAppSerializer):
     def get_icon(self, app):
         return app.get_icon_url(64)
 
+    def render_icon(self, data):
+        return es_icon_url(data, 64)
+
 
 class RocketbarESAppSerializer(serializers.Serializer):
     name = ESTranslationSerializerField()
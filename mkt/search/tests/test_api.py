@@ -3,9 +3,11 @@ import json
 from urlparse import urlparse
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db.models.query import QuerySet
 from django.http import QueryDict
 from django.test.client import RequestFactory
+from django.test.utils import override_settings
 
 from mock import MagicMock, patch
 from nose.tools import eq_, ok_
@@ -13,7 +15,8 @@ from nose.tools import eq_, ok_
 import amo
 import mkt
 from access.middleware import ACLMiddleware
-from addons.models import AddonCategory, AddonDeviceType, AddonUpsell, Category
+from addons.models import (AddonCategory, AddonDeviceType, AddonUpsell,
+                           Category, Preview)
 from amo.helpers import absolutify
 from amo.tests import app_factory, ESTestCase, TestCase
 from amo.urlresolvers import reverse
@@ -30,9 +33,14 @@ from mkt.collections.constants import (COLLECTIONS_TYPE_BASIC,
 from mkt.collections.models import Collection
 from mkt.constants import regions
 from mkt.constants.features import FeatureProfile
+from mkt.darjeeling.views import DarjeelingESAppSerializer
+from mkt.fireplace.api import FireplaceESAppSerializer
 from mkt.regions.middleware import RegionMiddleware
-from mkt.search.api import SearchView
-from mkt.search.serializers import SimpleESAppSerializer
+from mkt.search import cache as search_cache
+from mkt.search.api import FeaturedSearchView, SearchView
+from mkt.search.serializers import (es_icon_url, ESAppSerializer,
+                                    SimpleESAppSerializer,
+                                    SuggestionsESAppSerializer)
 from mkt.search.forms import DEVICE_CHOICES_IDS
 from mkt.search.utils import S
 from mkt.search.views import DEFAULT_SORTING
@@ -723,6 +731,93 @@ class TestApi(RestOAuth, ESTestCase):
         self.assertSetEqual(obj['tags'], ['tagtagtag', 'tarako'])
 
 
+@override_settings(SEARCH_CACHE_TIMEOUT=60)
+class TestSearchCache(RestOAuth, ESTestCase):
+    fixtures = fixture('user_2519', 'webapp_337141')
+
+    def setUp(self):
+        super(TestSearchCache, self).setUp()
+        self.url = reverse('search-api')
+        self.webapp = Webapp.objects.get(pk=337141)
+        self.refresh('webapp')
+        cache.clear()
+
+    def tearDown(self):
+        unindex_webapps([self.webapp.pk])
+        super(TestSearchCache, self).tearDown()
+
+    def hide(self):
+        self.webapp.update(disabled_by_user=True)
+        self.refresh('webapp')
+
+    def test_anonymous_cached(self):
+        eq_(self.anon.get(self.url, {'q': '', 'sort': 'downloads'})
+            .json['meta']['total_count'], 1)
+        self.hide()
+        # Same normalized query, different order and empty values.
+        res = self.anon.get(self.url + '?sort=downloads&q=')
+        eq_(res.json['meta']['total_count'], 1)
+        search_cache.invalidate()
+        eq_(self.anon.get(self.url).json['meta']['total_count'], 0)
+
+    def test_filters_in_key(self):
+        eq_(self.anon.get(self.url).json['meta']['total_count'], 1)
+        self.hide()
+        for params in ({'region': 'br'}, {'lang': 'fr'}, {'dev': 'android'},
+                       {'carrier': 'telefonica'}, {'limit': 1}):
+            eq_(self.anon.get(self.url, params).json['meta']['total_count'],
+                0, params)
+
+    @patch.object(FeaturedSearchView, 'collections')
+    def test_featured_cached(self, collections):
+        collections.return_value = [], ['region']
+        url = reverse('featured-search-api')
+        for i in range(2):
+            res = self.anon.get(url)
+            eq_(res.json['meta']['total_count'], 1)
+            eq_(res.json['featured'], [])
+            eq_(res['API-Fallback-featured'], 'region')
+            eq_(collections.call_count, 3)
+            self.hide()
+
+        # The collections depend on all the query string.
+        self.anon.get(url, {'preview': 'true'})
+        eq_(collections.call_count, 6)
+
+    def test_authenticated_not_cached(self):
+        eq_(self.client.get(self.url).json['meta']['total_count'], 1)
+        self.hide()
+        eq_(self.client.get(self.url).json['meta']['total_count'], 0)
+
+    def test_errors_not_cached(self):
+        eq_(self.anon.get(self.url, {'sort': 'awesomeness'}).status_code, 400)
+        eq_(self.anon.get(self.url, {'sort': 'awesomeness'}).status_code, 400)
+
+    @patch('mkt.search.cache.time')
+    def test_stale(self, time):
+        time.time.return_value = 1000
+        build = MagicMock(side_effect=['old', 'new'])
+        eq_(search_cache.get_or_build('k', build), 'old')
+        eq_(search_cache.get_or_build('k', build), 'old')
+        eq_(build.call_count, 1)
+
+        # Stale: someone else is refreshing it, serve the old value.
+        time.time.return_value = 1061
+        cache.add('k:lock', 1)
+        eq_(search_cache.get_or_build('k', build), 'old')
+        cache.delete('k:lock')
+        eq_(search_cache.get_or_build('k', build), 'new')
+        eq_(build.call_count, 2)
+
+    @patch('mkt.search.cache.time')
+    def test_wait_for_builder(self, time):
+        cache.add('k:lock', 1)
+        time.sleep.side_effect = lambda s: cache.set('k', (0, 'built'))
+        build = MagicMock()
+        eq_(search_cache.get_or_build('k', build), 'built')
+        ok_(not build.called)
+
+
 class TestApiFeatures(RestOAuth, ESTestCase):
     fixtures = fixture('webapp_337141')
 
@@ -1183,3 +1278,80 @@ class TestSimpleESAppSerializer(amo.tests.ESTestCase):
         ok_('regions' in self.serializer.data)
         eq_(len(self.serializer.data['regions']),
             len(self.webapp.get_regions()))
+
+
+class TestESAppSerializerRender(ESTestCase):
+    fixtures = fixture('webapp_337141', 'user_2519')
+
+    def setUp(self):
+        self.webapp = Webapp.objects.get(pk=337141)
+        self.webapp.addonexcludedregion.create(region=mkt.regions.BR.id)
+        self.webapp.name = {'fr': u'Nöm'}
+        self.webapp.save()
+        Preview.objects.create(addon=self.webapp, filetype='image/png')
+        Preview.objects.create(addon=self.webapp, filetype='video/webm')
+        self.reindex(Webapp, 'webapp')
+
+    def get_request(self, **data):
+        request = RequestFactory().get('/', data)
+        RegionMiddleware().process_request(request)
+        return request
+
+    def serialize(self, serializer_class, **context):
+        context.setdefault('request', self.get_request())
+        hit = S(WebappIndexer).filter(id=337141).execute().objects[0]
+        serializer = serializer_class(hit, context=context)
+        return serializer.can_render(hit._source), serializer.data
+
+    def check(self, serializer_class, **context):
+        rendered, data = self.serialize(serializer_class, **context)
+        ok_(rendered)
+        with patch.object(serializer_class, 'render_directly', False):
+            rendered, expected = self.serialize(serializer_class, **context)
+        ok_(not rendered)
+        eq_(data, expected)
+
+    def test_es_app_serializer(self):
+        self.check(ESAppSerializer)
+
+    def test_lang(self):
+        self.check(ESAppSerializer, request=self.get_request(lang='fr'))
+        self.check(ESAppSerializer, request=self.get_request(lang='de'))
+
+    def test_user(self):
+        request = self.get_request()
+        request.amo_user = UserProfile.objects.get(pk=2519)
+        Installed.objects.create(addon=self.webapp, user=request.amo_user)
+        self.check(ESAppSerializer, request=request)
+
+    def test_subclasses(self):
+        self.check(SimpleESAppSerializer)
+        self.check(SuggestionsESAppSerializer)
+        self.check(FireplaceESAppSerializer)
+        self.check(DarjeelingESAppSerializer, featured_pk=1)
+
+    def test_getter_overridden(self):
+        class Serializer(FireplaceESAppSerializer):
+            def get_icons(self, app):
+                return {32: app.get_icon_url(32)}
+
+        rendered, data = self.serialize(Serializer)
+        ok_(not rendered)
+        eq_(data['icons'].keys(), [32])
+
+    def test_getter_overridden_with_render(self):
+        class Serializer(FireplaceESAppSerializer):
+            def get_icons(self, app):
+                return {32: app.get_icon_url(32)}
+
+            def render_icons(self, data):
+                return {32: es_icon_url(data, 32)}
+
+        self.check(Serializer)
+
+    def test_premium(self):
+        self.webapp.update(premium_type=amo.ADDON_PREMIUM)
+        self.reindex(Webapp, 'webapp')
+        rendered, data = self.serialize(ESAppSerializer)
+        ok_(not rendered)
+        eq_(data['id'], self.webapp.id)
@@ -1,7 +1,7 @@
 import json
 
 import test_utils
-from nose.tools import ok_
+from nose.tools import eq_, ok_
 
 from django.contrib.auth.models import AnonymousUser
 
@@ -10,6 +10,7 @@ from addons.models import Category
 
 from mkt import regions
 from mkt.api.tests.test_oauth import BaseOAuth
+from mkt.constants.features import FeatureProfile
 from mkt.regions import set_region
 from mkt.reviewers.forms import ApiReviewersSearchForm
 from mkt.search.forms import (ApiSearchForm, DEVICE_CHOICES_IDS,
@@ -177,3 +178,27 @@ class TestSearchFilters(BaseOAuth):
         qs = self._filter(self.req, {'q': 'search terms'}, region=regions.CO)
         ok_({'not': {'filter': {'term': {'region_exclusions': regions.CO.id}}}}
             not in qs['filter']['and'])
+
+    def _profile_query(self, profile):
+        form = self.form_class({})
+        ok_(form.is_valid())
+        return _filter_search(self.req, Webapp.from_search(self.req),
+                              form.cleaned_data,
+                              profile=profile)._build_query()
+
+    def test_profile(self):
+        profile = FeatureProfile(apps=True, sms=True)
+        qs = json.dumps(self._profile_query(profile))
+        ok_('"script"' not in qs)
+        ok_('{"term": {"features.has_pay": false}}' in qs)
+        ok_('features.has_apps' not in qs)
+
+    def test_profile_int(self):
+        self.create_switch('search-features-int')
+        profile = FeatureProfile(apps=True, sms=True)
+        qs = self._profile_query(profile)
+        filters = [f for f in qs['filter']['and'] if 'script' in f]
+        eq_(len(filters), 1)
+        mask = filters[0]['script']['params']['mask']
+        eq_(mask & profile.to_int(), 0)
+        eq_(mask | profile.to_int(), 2 ** 63 - 1)
@@ -1,9 +1,26 @@
 from elasticutils.contrib.django import S as eu_S
 from statsd import statsd
 
+from lib.es.client import get_es
+
 
 class S(eu_S):
 
+    def get_es(self, default_builder=None):
+        # Skip the Django S, which always builds with its own get_es.
+        return super(eu_S, self).get_es(default_builder=get_es)
+
+    def process_filter_subset(self, key, value, action):
+        """
+        `<field>__subset=<int>` keeps the documents whose `field` bitfield
+        only has bits that are also set in `value`, in one cached filter.
+        """
+        return {'script': {
+            'script': "(doc['%s'].value & mask) == 0" % key,
+            'params': {'mask': ~value & (2 ** 63 - 1)},
+            '_cache': True,
+        }}
+
     def raw(self):
         with statsd.timer('search.raw'):
             hits = super(S, self).raw()
@@ -1,3 +1,5 @@
+import waffle
+
 import amo
 from apps.search.views import _get_locale_analyzer
 
@@ -157,7 +159,11 @@ def _filter_search(request, qs, query, filters=None, sorting=None,
         qs = qs.order_by(sorting_default)
 
     if profile:
-        # Exclude apps that require any features we don't support.
-        qs = qs.filter(**profile.to_kwargs(prefix='features.has_'))
+        # Exclude apps that require any features we don't support. The
+        # bitfield check needs the apps to be indexed with features_int.
+        if waffle.switch_is_active('search-features-int'):
+            qs = qs.filter(features_int__subset=profile.to_int())
+        else:
+            qs = qs.filter(**profile.to_kwargs(prefix='features.has_'))
 
     return qs
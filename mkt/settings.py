@@ -339,3 +339,7 @@ PRE_GENERATE_APKS = True
 # See https://github.com/mozilla/apk-factory-service
 PRE_GENERATE_APK_URL = (
     'https://apk-controller.dev.mozaws.net/application.apk')
+
+# When True, wsgi/mkt.py loads the models, URLs and translations before the
+# server forks its workers, so that they share them. See mkt.site.preload.
+WSGI_PRELOAD = False
@@ -0,0 +1,97 @@
+import os
+import traceback
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mkt.site.preload import preload
+
+
+FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean',
+          'Private_Dirty')
+
+
+def smaps(pid):
+    """Return the totals of the memory mappings of `pid`, in kB."""
+    totals = dict.fromkeys(FIELDS, 0)
+    with open('/proc/%s/smaps' % pid) as fd:
+        for line in fd:
+            parts = line.split()
+            key = parts[0].rstrip(':')
+            if key in totals:
+                totals[key] += int(parts[1])
+    return totals
+
+
+def fork_workers(count):
+    """
+    Fork `count` workers that load what they'd load on their first requests
+    and return their memory usage, measured while they're all alive.
+    """
+    ready_r, ready_w = os.pipe()
+    exit_r, exit_w = os.pipe()
+    pids = []
+    for i in range(count):
+        pid = os.fork()
+        if not pid:
+            status = 1
+            try:
+                os.close(ready_r)
+                os.close(exit_w)
+                preload()
+                os.write(ready_w, '.')
+                os.close(ready_w)
+                # Wait for the parent to be done measuring.
+                os.read(exit_r, 1)
+                status = 0
+            except Exception:
+                traceback.print_exc()
+            finally:
+                os._exit(status)
+        pids.append(pid)
+
+    os.close(ready_w)
+    os.close(exit_r)
+    ready = 0
+    while True:
+        data = os.read(ready_r, count)
+        if not data:
+            break
+        ready += len(data)
+    os.close(ready_r)
+    usage = [smaps(pid) for pid in pids] if ready == count else None
+    os.close(exit_w)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    if usage is None:
+        raise CommandError('%s workers failed to start.' % (count - ready))
+    return usage
+
+
+class Command(BaseCommand):
+    help = ('Compare the memory used by forked workers without and with '
+            'preloading the application in their parent (WSGI_PRELOAD).')
+    option_list = BaseCommand.option_list + (
+        make_option('--workers', action='store', type='int', default=4,
+                    help='Number of workers to fork [default: 4].'),
+    )
+
+    def handle(self, *args, **kw):
+        if not os.path.exists('/proc/self/smaps'):
+            raise CommandError('This needs /proc/<pid>/smaps (Linux).')
+        count = kw['workers']
+
+        results = [('lazy', fork_workers(count))]
+        preload()
+        results.append(('preloaded', fork_workers(count)))
+
+        self.stdout.write('Average per worker of %s workers, in kB:' % count)
+        self.stdout.write('%-10s %10s %10s %10s %10s' % (
+            '', 'RSS', 'PSS', 'Shared', 'Private'))
+        for name, usage in results:
+            average = lambda *keys: sum(u[k] for u in usage
+                                        for k in keys) / len(usage)
+            self.stdout.write('%-10s %10s %10s %10s %10s' % (
+                name, average('Rss'), average('Pss'),
+                average('Shared_Clean', 'Shared_Dirty'),
+                average('Private_Clean', 'Private_Dirty')))
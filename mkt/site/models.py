@@ -1,3 +1,7 @@
+import datetime
+from collections import defaultdict
+
+
 class DynamicBoolFieldsMixin(object):
 
     def _fields(self):
@@ -16,3 +20,29 @@ class DynamicBoolFieldsMixin(object):
         field_names = [self.field_source[key[4:].upper()]['name']
                        for key in keys]
         return sorted(field_names)
+
+    @classmethod
+    def bulk_set(cls, data):
+        """
+        Sets the fields of several apps at once, `data` being a dict of
+        {<addon id>: {<field name>: <bool>, ...}, ...}. Apps getting the same
+        values are updated in one query, the missing rows are all created in
+        another one.
+        """
+        existing = dict((obj.addon_id, obj) for obj in
+                        cls.objects.no_cache().filter(addon__in=data.keys()))
+        groups = defaultdict(list)
+        for addon_id, values in data.items():
+            if addon_id in existing:
+                groups[tuple(sorted(values.items()))].append(addon_id)
+
+        now = datetime.datetime.now()
+        for values, addon_ids in groups.items():
+            cls.objects.filter(addon__in=addon_ids).update(modified=now,
+                                                           **dict(values))
+        if existing:
+            cls.objects.invalidate(*existing.values())
+
+        cls.objects.bulk_create([cls(addon_id=addon_id, **values)
+                                 for addon_id, values in data.items()
+                                 if addon_id not in existing])
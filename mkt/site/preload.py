@@ -0,0 +1,55 @@
+"""
+Warm up a WSGI process before the server forks its workers.
+
+Each worker otherwise builds the same things again on its first requests:
+the models and the constant tables derived from them (APP_FEATURES fields,
+regions, carriers, device types, search analyzers), the URL resolver with
+every view module behind it and the gettext catalogs of every language.
+When `WSGI_PRELOAD` is on, the WSGI script calls `preload()` in the master,
+so that the workers share all of that with it, copy-on-write, instead.
+
+This only helps when the server loads the application before forking, e.g.
+`gunicorn --preload` or uWSGI without `lazy-apps`.
+"""
+import gc
+
+from django.conf import settings
+from django.core.urlresolvers import get_resolver
+from django.db import connections
+from django.db.models import get_models
+from django.utils.importlib import import_module
+
+import commonware.log
+import tower
+
+
+log = commonware.log.getLogger('z.preload')
+
+MODULES = (
+    'amo',
+    'mkt',
+    'mkt.carriers',
+    'mkt.constants',
+    'mkt.regions',
+    'mkt.webapps.models',
+)
+
+
+def preload():
+    for name in MODULES:
+        import_module(name)
+    get_models()
+    get_resolver(None)._populate()
+
+    for lang in settings.AMO_LANGUAGES:
+        tower.activate(lang)
+    tower.activate(settings.LANGUAGE_CODE)
+
+    # The workers must open their own connections.
+    for connection in connections.all():
+        connection.close()
+
+    # Free the garbage of the imports now rather than in each worker, where
+    # it'd unshare the pages it lives in.
+    collected = gc.collect()
+    log.info('Preloaded the application (%s objects collected).' % collected)
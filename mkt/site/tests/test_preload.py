@@ -0,0 +1,35 @@
+import os
+
+from django.conf import settings
+
+import mock
+from nose.exc import SkipTest
+from nose.tools import eq_, ok_
+
+import amo.tests
+from mkt.site.management.commands.preload_memory import smaps
+from mkt.site.preload import preload
+
+
+class TestPreload(amo.tests.TestCase):
+
+    # Closing the connections for real would end the test transaction.
+    @mock.patch('mkt.site.preload.gc.collect')
+    @mock.patch('mkt.site.preload.connections')
+    @mock.patch('mkt.site.preload.tower.activate')
+    def test_preload(self, activate, connections, collect):
+        connection = mock.Mock()
+        connections.all.return_value = [connection]
+        collect.return_value = 0
+        preload()
+        eq_([c[0][0] for c in activate.call_args_list],
+            list(settings.AMO_LANGUAGES) + [settings.LANGUAGE_CODE])
+        ok_(connection.close.called)
+        ok_(collect.called)
+
+    def test_smaps(self):
+        if not os.path.exists('/proc/self/smaps'):
+            raise SkipTest('No /proc/self/smaps.')
+        usage = smaps(os.getpid())
+        ok_(usage['Rss'] > 0)
+        ok_(usage['Pss'] <= usage['Rss'])
@@ -18,6 +18,7 @@ from constants.payments import PROVIDER_BANGO
 from files.models import FileUpload, Platform
 from lib.metrics import record_action
 from market.models import AddonPremium, Price
+from users.entitlements import get_entitlements
 
 import mkt
 from mkt.api.authentication import (RestAnonymousAuthentication,
@@ -37,7 +38,8 @@ from mkt.regions import get_region
 from mkt.submit.api import PreviewViewSet
 from mkt.submit.forms import mark_for_rereview
 from mkt.submit.serializers import PreviewSerializer, SimplePreviewSerializer
-from mkt.webapps.models import AppFeatures, get_excluded_in, Webapp
+from mkt.webapps.models import (AppFeatures, get_excluded_in, Installed,
+                                Webapp)
 
 
 log = commonware.log.getLogger('z.api')
@@ -151,6 +153,31 @@ class AppSerializer(serializers.ModelSerializer):
             'status', 'support_email', 'support_url', 'supported_locales',
             'tags', 'upsell', 'upsold', 'user', 'versions', 'weekly_downloads']
 
+    @staticmethod
+    def prefetch(apps, request=None):
+        """
+        Attach everything the serializer needs to a list of apps in a fixed
+        number of queries, so serializing a page of apps doesn't fan out into
+        several queries per app.
+        """
+        apps = list(apps)
+        Webapp.api_transformer(apps)
+        user = getattr(request, 'amo_user', None)
+        if user and apps:
+            ids = [app.id for app in apps]
+            entitlements = get_entitlements(user)
+            installed = set(Installed.objects.filter(addon__in=ids, user=user)
+                            .values_list('addon', flat=True))
+            purchased = set(entitlements.purchased())
+            for app in apps:
+                app._user_info = {
+                    'developed': entitlements.has_role(
+                        app.id, [amo.AUTHOR_ROLE_OWNER]),
+                    'installed': app.id in installed,
+                    'purchased': app.id in purchased,
+                }
+        return apps
+
     def _get_region_id(self):
         request = self.context.get('request')
         REGION = getattr(request, 'REGION', None)
@@ -245,14 +272,22 @@ class AppSerializer(serializers.ModelSerializer):
     def get_user_info(self, app):
         user = getattr(self.context.get('request'), 'amo_user', None)
         if user:
+            # If prefetch() was called, use what it attached.
+            if hasattr(app, '_user_info'):
+                return app._user_info
             return {
-                'developed': app.addonuser_set.filter(
-                    user=user, role=amo.AUTHOR_ROLE_OWNER).exists(),
+                'developed': get_entitlements(user).has_role(
+                    app.pk, [amo.AUTHOR_ROLE_OWNER]),
                 'installed': app.has_installed(user),
                 'purchased': app.pk in user.purchase_ids(),
             }
 
     def get_versions(self, app):
+        # If prefetch() was called, use what it attached.
+        if hasattr(app, '_versions'):
+            return dict((v.version,
+                         reverse('version-detail', kwargs={'pk': v.pk}))
+                        for v in app._versions)
         # Disable transforms, we only need two fields: version and pk.
         # Unfortunately, cache-machine gets in the way so we can't use .only()
         # (.no_transforms() is ignored, defeating the purpose), and we can't use
@@ -420,6 +455,13 @@ class AppViewSet(CORSMixin, SlugOrIdMixin, MarketplaceView,
     def get_base_queryset(self):
         return Webapp.objects.all()
 
+    def paginate_queryset(self, queryset, page_size=None):
+        page = super(AppViewSet, self).paginate_queryset(queryset, page_size)
+        if page is not None:
+            page.object_list = AppSerializer.prefetch(page.object_list,
+                                                      self.request)
+        return page
+
     def get_object(self, queryset=None):
         try:
             app = super(AppViewSet, self).get_object()
@@ -7,14 +7,14 @@ from django.conf import settings
 
 import commonware.log
 import cronjobs
-from celery import chord
 
 import amo
 from amo.utils import chunked
 
-from .models import Installed, Webapp
-from .tasks import (dump_user_installs, update_downloads, update_trending,
-                    zip_users)
+from . import exclusions
+from .models import Webapp
+from .tasks import (dump_user_installs, reconcile_install_counts,
+                    update_downloads, update_trending)
 
 
 log = commonware.log.getLogger('z.cron')
@@ -57,25 +57,15 @@ def update_app_trending():
 @cronjobs.register
 def dump_user_installs_cron():
     """
-    Sets up tasks to do user install dumps.
+    Dumps the user installs into a tarball, in a single pass over the
+    installs.
     """
-    chunk_size = 100
-    # Get valid users to dump.
-    user_ids = set(Installed.objects.filter(addon__type=amo.ADDON_WEBAPP)
-                   .values_list('user', flat=True))
-
-    # Remove old dump data before running.
+    # Remove the directory of the old, per-file, dumps.
     user_dir = os.path.join(settings.DUMPED_USERS_PATH, 'users')
     if os.path.exists(user_dir):
         shutil.rmtree(user_dir)
 
-    grouping = []
-    for chunk in chunked(user_ids, chunk_size):
-        grouping.append(dump_user_installs.subtask(args=[chunk]))
-
-    post = zip_users.subtask(immutable=True)
-    ts = chord(grouping, post)
-    ts.apply_async()
+    dump_user_installs.delay()
 
 
 @cronjobs.register
@@ -97,3 +87,23 @@ def update_app_downloads():
     for ids in chunked(all_ids, chunk_size):
         update_downloads.delay(ids, countdown=countdown)
         countdown += seconds_between
+
+
+@cronjobs.register
+def reconcile_app_install_counts():
+    """
+    Recount the installs of all the apps, to catch the installs that didn't
+    go through the ORM signals.
+    """
+    ids = list(Webapp.with_deleted.values_list('id', flat=True))
+    for chunk in chunked(ids, 100):
+        reconcile_install_counts.delay(chunk)
+
+
+@cronjobs.register
+def rebuild_region_exclusions():
+    """
+    Rebuild the region exclusions index, to catch changes that didn't go
+    through the ORM signals (bulk updates).
+    """
+    exclusions.rebuild()
@@ -0,0 +1,171 @@
+"""
+Index of the apps excluded from each region.
+
+An app is excluded from a region if it has an `AddonExcludedRegion` for it,
+or if one of its `Geodata` flags excludes it (pre-IARC games in Brazil and
+Germany, USK refused apps in Germany). Price tiers aren't part of the index:
+they're edited in bulk, so `Webapp.get_excluded_region_ids` adds them live.
+
+Two views of the same data are kept in the cache:
+
+* for every region, a sorted array of excluded app ids, used to filter
+  listings and to answer membership with a binary search;
+* for every app, the sorted array of regions it's excluded from, used to
+  answer "is this app excluded from this region?" and for indexing.
+
+Both are built lazily from the database. When the exclusions of an app
+change, the entries that no longer match the database are deleted, right
+away and again once the transaction is committed, rather than patched: two
+concurrent patches of the same array would lose one of the writes. The
+`rebuild_region_exclusions` cron rebuilds everything to catch changes made
+behind the ORM's back (bulk updates).
+"""
+import array
+import bisect
+
+from django.conf import settings
+from django.core.cache import cache
+
+import commonware.log
+
+import mkt
+from amo.utils import chunked
+from mkt.regions.utils import parse_region
+
+
+log = commonware.log.getLogger('z.webapps')
+
+REGION_KEY = 'exclusions:region:%s'
+APP_KEY = 'exclusions:app:%s'
+
+
+def _pack(ids):
+    return array.array('l', sorted(ids)).tostring()
+
+
+def _unpack(data):
+    rv = array.array('l')
+    rv.fromstring(data)
+    return rv
+
+
+def _contains(arr, value):
+    i = bisect.bisect_left(arr, value)
+    return i < len(arr) and arr[i] == value
+
+
+def _set(key, ids):
+    cache.set(key, _pack(ids), settings.REGION_EXCLUSIONS_CACHE_TIMEOUT)
+
+
+def build_region(region_id):
+    """Return the set of app ids excluded from `region_id`, from the db."""
+    from mkt.webapps.models import AddonExcludedRegion, Geodata
+
+    excluded = set(AddonExcludedRegion.objects.no_cache()
+                   .filter(region=region_id).values_list('addon', flat=True))
+
+    region = parse_region(region_id)
+    flags = []
+    # For pre-IARC unrated games in Brazil/Germany.
+    if region in (mkt.regions.BR, mkt.regions.DE):
+        flags.append('region_%s_iarc_exclude' % region.slug)
+    # For USK_RATING_REFUSED apps in Germany.
+    if region == mkt.regions.DE:
+        flags.append('region_de_usk_exclude')
+    for flag in flags:
+        excluded.update(Geodata.objects.no_cache().filter(**{flag: True})
+                        .values_list('addon', flat=True))
+
+    return excluded
+
+
+def build_apps(app_ids):
+    """
+    Return a {app id: set of excluded region ids} dict for `app_ids`, from
+    the db, in a fixed number of queries.
+    """
+    from mkt.webapps.models import AddonExcludedRegion, Geodata
+
+    rv = dict((app_id, set()) for app_id in app_ids)
+    if not rv:
+        return rv
+
+    for app_id, region in (AddonExcludedRegion.objects.no_cache()
+                           .filter(addon__in=rv)
+                           .values_list('addon', 'region')):
+        rv[app_id].add(region)
+
+    for app_id, br_iarc, de_iarc, de_usk in (
+            Geodata.objects.no_cache().filter(addon__in=rv)
+            .values_list('addon', 'region_br_iarc_exclude',
+                         'region_de_iarc_exclude', 'region_de_usk_exclude')):
+        if br_iarc:
+            rv[app_id].add(mkt.regions.BR.id)
+        if de_iarc or de_usk:
+            rv[app_id].add(mkt.regions.DE.id)
+    return rv
+
+
+def get_excluded_apps(region_id):
+    """Return the sorted array of app ids excluded from `region_id`."""
+    key = REGION_KEY % region_id
+    data = cache.get(key)
+    if data is None:
+        excluded = build_region(region_id)
+        _set(key, excluded)
+        return array.array('l', sorted(excluded))
+    return _unpack(data)
+
+
+def get_excluded_regions(app_ids):
+    """
+    Return a {app id: sorted array of excluded region ids} dict for
+    `app_ids`. Uses one cache round-trip, plus a fixed number of queries for
+    the apps that weren't in the cache.
+    """
+    keys = dict((APP_KEY % app_id, app_id) for app_id in app_ids)
+    rv = dict((keys[k], _unpack(v))
+              for k, v in cache.get_many(keys.keys()).items())
+    missing = [app_id for app_id in app_ids if app_id not in rv]
+    if missing:
+        built = build_apps(missing)
+        cache.set_many(dict((APP_KEY % k, _pack(v)) for k, v in built.items()),
+                       settings.REGION_EXCLUSIONS_CACHE_TIMEOUT)
+        rv.update((k, array.array('l', sorted(v))) for k, v in built.items())
+    return rv
+
+
+def is_excluded(app_id, region_id):
+    """Return whether `app_id` is excluded from `region_id`."""
+    return _contains(get_excluded_regions([app_id])[app_id], region_id)
+
+
+def update_app(app_id):
+    """
+    Delete the cached exclusions of `app_id` and the region arrays that
+    don't agree with the db anymore. Region arrays that aren't in the cache
+    are left alone, they'll be built from the db when needed.
+    """
+    cache.delete(APP_KEY % app_id)
+    new = build_apps([app_id])[app_id]
+    keys = dict((REGION_KEY % region_id, region_id)
+                for region_id in mkt.regions.ALL_REGION_IDS)
+    stale = [key for key, data in cache.get_many(keys.keys()).items()
+             if _contains(_unpack(data), app_id) != (keys[key] in new)]
+    if stale:
+        cache.delete_many(stale)
+
+
+def rebuild():
+    """Rebuild the whole index from the db."""
+    from mkt.webapps.models import Webapp
+
+    for region_id in mkt.regions.ALL_REGION_IDS:
+        _set(REGION_KEY % region_id, build_region(region_id))
+    ids = Webapp.with_deleted.no_cache().values_list('id', flat=True)
+    for chunk in chunked(list(ids), 500):
+        cache.set_many(dict((APP_KEY % k, _pack(v))
+                            for k, v in build_apps(chunk).items()),
+                       settings.REGION_EXCLUSIONS_CACHE_TIMEOUT)
+    log.info('Rebuilt region exclusions for %s apps.' % len(ids))
@@ -0,0 +1,341 @@
+"""
+Export of the public apps and collections as a tarball for third-parties,
+and of the user installs for the recommendation engine.
+
+Apps are serialized in batches by a pool of DUMPED_APPS_THREADS threads and
+every JSON document is streamed straight into the compressed tarball, with no
+temporary file or directory. Threads rather than processes, because the export
+runs in a daemonic celery worker, which can't fork. Incremental
+exports copy the entries of apps that didn't change from the previous tarball
+and only reserialize the apps that were modified, or had one of the related
+objects the serializer reads modified, since it was started. Deleting a
+related object (an excluded region, a category...) leaves no trace, the
+daily full export picks those up.
+"""
+import datetime
+import hashlib
+import itertools
+import json
+import logging
+import os
+import tarfile
+import time
+from contextlib import closing
+from cStringIO import StringIO
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.db.models import get_model
+from django.template import Context, loader
+
+import pytz
+from test_utils import RequestFactory
+
+import amo
+from amo.utils import chunked, JSONEncoder
+from mkt.constants.regions import RESTOFWORLD
+from mkt.webapps.models import Webapp
+
+
+task_log = logging.getLogger('z.task')
+
+EXTRA_FILES = ['license.txt', 'readme.txt']
+# Remembers which tarball was written last, and when it was started.
+STATE_FILE = 'latest.json'
+# Models that AppSerializer reads, with the lookup from them to the app.
+RELATED_MODELS = (
+    ('addons.Preview', 'addon'),
+    ('files.File', 'version__addon'),
+    ('market.AddonPremium', 'addon'),
+    ('market.Price', 'addonpremium__addon'),
+    ('market.PriceCurrency', 'tier__addonpremium__addon'),
+    ('reviews.Review', 'addon'),
+    ('versions.Version', 'addon'),
+    ('webapps.AddonExcludedRegion', 'addon'),
+    ('webapps.AppFeatures', 'version__addon'),
+    ('webapps.ContentRating', 'addon'),
+    ('webapps.Geodata', 'addon'),
+)
+
+
+def get_dump_request():
+    req = RequestFactory().get('/')
+    req.user = AnonymousUser()
+    req.REGION = RESTOFWORLD
+    return req
+
+
+def app_arcname(pk):
+    return os.path.join('apps', str(pk / 1000), '{0}.json'.format(pk))
+
+
+def app_pk_from_arcname(name):
+    """Return the app pk for an app entry of the tarball, None otherwise."""
+    if name.startswith('apps/') and name.endswith('.json'):
+        try:
+            return int(os.path.basename(name)[:-len('.json')])
+        except ValueError:
+            pass
+
+
+def serialize_apps(pks):
+    """Return a list of (arcname, json) tuples for the apps in `pks`."""
+    from mkt.webapps.api import AppSerializer
+    req = get_dump_request()
+    apps = AppSerializer.prefetch(Webapp.objects.filter(pk__in=pks), req)
+    return [(app_arcname(app.pk),
+             json.dumps(AppSerializer(app, context={'request': req}).data,
+                        cls=JSONEncoder))
+            for app in sorted(apps, key=lambda app: app.pk)]
+
+
+def serialize_collections():
+    """Yield (arcname, json) tuples for all the public collections."""
+    from mkt.collections.models import Collection
+    from mkt.collections.tasks import collection_data, object_path
+    for collection in Collection.public.order_by('pk').iterator():
+        yield (os.path.join('collections', object_path(collection)),
+               json.dumps(collection_data(collection), cls=JSONEncoder))
+
+
+def _serialize_apps_in_thread(pks):
+    try:
+        return serialize_apps(pks)
+    finally:
+        # Every thread has its own connections, don't leave them open.
+        for connection in connections.all():
+            connection.close()
+
+
+def iter_serialized_apps(pks, chunk_size=100, threads=None):
+    """
+    Yield (arcname, json) tuples for the apps in `pks`, serialized in
+    chunks of `chunk_size` apps by `threads` threads, DUMPED_APPS_THREADS
+    by default. The order of `pks` is kept.
+    """
+    threads = threads or settings.DUMPED_APPS_THREADS
+    chunks = chunked(pks, chunk_size)
+    if threads == 1:
+        for chunk in chunks:
+            for entry in serialize_apps(chunk):
+                yield entry
+        return
+
+    pool = ThreadPool(threads)
+    try:
+        # Only `threads` chunks at a time, so that the serialized apps don't
+        # pile up in memory faster than they are written.
+        for batch in chunked(chunks, threads):
+            for entries in pool.map(_serialize_apps_in_thread, batch):
+                for entry in entries:
+                    yield entry
+    finally:
+        pool.terminate()
+
+
+def modified_since(pks, since):
+    """
+    Return the set of apps in `pks` that were modified since `since`, or
+    whose translations or related objects in RELATED_MODELS were.
+    """
+    pks = set(pks)
+    rv = set(Webapp.objects.filter(modified__gte=since)
+             .values_list('pk', flat=True))
+    for field in Webapp._meta.translated_fields:
+        rv.update(Webapp.objects.filter(
+            **{'%s__modified__gte' % field.name: since})
+            .values_list('pk', flat=True))
+    for model, lookup in RELATED_MODELS:
+        model = get_model(*model.split('.'))
+        rv.update(model.objects.filter(modified__gte=since)
+                  .values_list(lookup, flat=True))
+    return rv.intersection(pks)
+
+
+def add_entry(tar, arcname, data, mtime):
+    info = tarfile.TarInfo(arcname)
+    info.size = len(data)
+    info.mtime = mtime
+    info.mode = 0644
+    tar.addfile(info, StringIO(data))
+
+
+def read_state(target_dir):
+    try:
+        with open(os.path.join(target_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+def write_state(target_dir, state):
+    with open(os.path.join(target_dir, STATE_FILE), 'w') as f:
+        json.dump(state, f)
+
+
+def export(filename, incremental=False):
+    """
+    Write the tarball `filename`.tgz in DUMPED_APPS_PATH/tarballs and return
+    its path.
+
+    If `incremental` is True and a previous tarball exists, only the apps
+    modified since that tarball was started (see `modified_since`) are
+    serialized again, the other ones are copied over from it.
+    """
+    # Note: not using storage because all these operations should be local.
+    target_dir = os.path.join(settings.DUMPED_APPS_PATH, 'tarballs')
+    target_file = os.path.join(target_dir, filename + '.tgz')
+    if not os.path.exists(target_dir):
+        os.makedirs(target_dir)
+
+    started = time.time()
+    mtime = int(started)
+    pks = list(Webapp.objects.visible().order_by('pk')
+               .values_list('pk', flat=True))
+    visible = set(pks)
+    to_serialize = set(pks)
+
+    previous = None
+    state = read_state(target_dir) if incremental else None
+    if state:
+        previous = os.path.join(target_dir, state['filename'])
+        if os.path.exists(previous) and previous != target_file:
+            since = datetime.datetime.fromtimestamp(state['started'])
+            to_serialize = modified_since(pks, since)
+        else:
+            previous = None
+
+    task_log.info(u'Creating dump {0}: {1} apps, {2} to serialize.'
+                  .format(target_file, len(pks), len(to_serialize)))
+
+    # Write to a temporary name so that a failed export never replaces a
+    # good tarball.
+    tmp_file = target_file + '.tmp'
+    with closing(tarfile.open(tmp_file, 'w:gz')) as tar:
+        context = Context({'date': datetime.date.today().strftime('%Y-%m-%d'),
+                           'url': settings.SITE_URL})
+        for f in EXTRA_FILES:
+            template = loader.get_template('webapps/dump/apps/' + f)
+            add_entry(tar, f, template.render(context).encode('utf-8'), mtime)
+
+        if previous:
+            copied = set()
+            with closing(tarfile.open(previous, 'r:gz')) as old:
+                for member in old:
+                    pk = app_pk_from_arcname(member.name)
+                    if pk not in visible or pk in to_serialize:
+                        continue
+                    tar.addfile(member, old.extractfile(member))
+                    copied.add(pk)
+            # Apps missing from the previous tarball need to be serialized.
+            to_serialize.update(visible.difference(copied))
+            task_log.info(u'Copied {0} apps from {1}.'.format(len(copied),
+                                                             previous))
+
+        for arcname, data in iter_serialized_apps(sorted(to_serialize)):
+            add_entry(tar, arcname, data, mtime)
+
+        for arcname, data in serialize_collections():
+            add_entry(tar, arcname, data, mtime)
+
+    os.rename(tmp_file, target_file)
+    write_state(target_dir, {'filename': os.path.basename(target_file),
+                             'started': started})
+    task_log.info(u'Created dump {0} in {1:.1f}s.'
+                  .format(target_file, time.time() - started))
+    return target_file
+
+
+def _stream_rows(qs, size=1000):
+    """
+    Yield the rows of a values_list() queryset, using a server-side cursor
+    on MySQL so that they're never all loaded in memory.
+    """
+    db = qs.db
+    sql, params = qs.query.get_compiler(using=db).as_sql()
+    connection = connections[db]
+    if connection.vendor == 'mysql':
+        from MySQLdb.cursors import SSCursor
+        # Make sure there is a connection to get the raw cursor from.
+        connection.ensure_connection()
+        cursor = connection.connection.cursor(SSCursor)
+    else:
+        cursor = connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+    finally:
+        cursor.close()
+
+
+def user_hash(user_id):
+    return hashlib.sha256('%s%s' % (str(user_id),
+                                    settings.SECRET_KEY)).hexdigest()
+
+
+def export_user_installs(filename):
+    """
+    Write the tarball of the user installs `filename`.tgz in
+    DUMPED_USERS_PATH/tarballs and return its path.
+
+    The installs are read with a single query ordered by user and grouped on
+    the fly, every user record is written straight into the tarball.
+    """
+    from mkt.webapps.models import Installed
+
+    # Note: not using storage because all these operations should be local.
+    target_dir = os.path.join(settings.DUMPED_USERS_PATH, 'tarballs')
+    target_file = os.path.join(target_dir, filename + '.tgz')
+    if not os.path.exists(target_dir):
+        os.makedirs(target_dir)
+
+    started = time.time()
+    mtime = int(started)
+    zone = pytz.timezone(settings.TIME_ZONE)
+    # We can't recommend deleted apps, so don't include them.
+    qs = (Installed.objects.filter(addon__type=amo.ADDON_WEBAPP)
+          .exclude(addon__status=amo.STATUS_DELETED)
+          .order_by('user', 'id')
+          .values_list('user', 'user__region', 'user__lang', 'addon',
+                       'addon__app_slug', 'created'))
+
+    task_log.info(u'Creating user dump {0}'.format(target_file))
+    users = 0
+    tmp_file = target_file + '.tmp'
+    with closing(tarfile.open(tmp_file, 'w:gz')) as tar:
+        context = Context({'date': filename, 'url': settings.SITE_URL})
+        for f in EXTRA_FILES:
+            template = loader.get_template('webapps/dump/users/' + f)
+            add_entry(tar, os.path.join('users', f),
+                      template.render(context).encode('utf-8'), mtime)
+
+        for user_id, rows in itertools.groupby(_stream_rows(qs),
+                                               lambda row: row[0]):
+            rows = list(rows)
+            hash = user_hash(user_id)
+            data = {
+                'user': hash,
+                'region': rows[0][1],
+                'lang': rows[0][2],
+                'installed_apps': [{
+                    'id': app_id,
+                    'slug': slug,
+                    'installed': pytz.utc.normalize(
+                        zone.localize(created)).strftime('%Y-%m-%dT%H:%M:%S')
+                } for _, _, _, app_id, slug, created in rows],
+            }
+            add_entry(tar, os.path.join('users', hash[0], '%s.json' % hash),
+                      json.dumps(data, cls=JSONEncoder), mtime)
+            users += 1
+
+    os.rename(tmp_file, target_file)
+    task_log.info(u'Created user dump {0} with {1} users in {2:.1f}s.'
+                  .format(target_file, users, time.time() - started))
+    return target_file
@@ -0,0 +1,143 @@
+import json
+import time
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+import amo
+from mkt.site.fixtures import fixture
+from mkt.webapps.models import Webapp, WebappIndexer
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_analyzer_fields(obj):
+    """
+    Returns the name_<analyzer> and description_<analyzer> fields of `obj` as
+    they used to be built: every analyzer, scanning the strings each time.
+    """
+    d = {}
+    for analyzer, languages in amo.SEARCH_ANALYZER_MAP.iteritems():
+        if (not settings.ES_USE_PLUGINS and
+            analyzer in amo.SEARCH_ANALYZER_PLUGINS):
+            continue
+
+        d['name_' + analyzer] = list(
+            set(string for locale, string in obj.translations[obj.name_id]
+                if locale.lower() in languages))
+        d['description_' + analyzer] = list(
+            set(string for locale, string
+                in obj.translations[obj.description_id]
+                if locale.lower() in languages))
+    return d
+
+
+def timed(func, objs, iterations):
+    """Returns the number of calls of `func` per second over `objs`."""
+    start = time.time()
+    for i in range(iterations):
+        for obj in objs:
+            func(obj)
+    return len(objs) * iterations / (time.time() - start)
+
+
+class Command(BaseCommand):
+    """
+    The fixtures (names of mkt/site/fixtures/data, e.g. webapp_337141) are
+    loaded in a transaction that's rolled back at the end. Without any, the
+    apps of the database are used. With --index, both kinds of documents are
+    also bulk indexed into a throwaway index.
+    """
+    help = ('Compare the size of the app documents and how fast they are '
+            'built and indexed, with and without the name and description '
+            'fields of the analyzers of locales the app has no strings in.')
+    args = '[fixture ...]'
+    option_list = BaseCommand.option_list + (
+        make_option('--apps',
+                    help='Comma-separated list of app ids (default: all '
+                         'the apps)'),
+        make_option('--iterations', type='int', default=20,
+                    help='Number of times the fields of every app are '
+                         'built [default: 20]'),
+        make_option('--index', action='store_true', default=False,
+                    help='Also time the indexing of the documents'),
+    )
+
+    def handle(self, *args, **kwargs):
+        files = fixture(*args)
+        if len(files) != len(args):
+            raise CommandError('Missing fixtures.')
+        try:
+            with transaction.atomic():
+                if files:
+                    call_command('loaddata', *files, verbosity=0)
+                self.compare(**kwargs)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def compare(self, **kwargs):
+        qs = Webapp.with_deleted.no_cache()
+        if kwargs.get('apps'):
+            qs = qs.filter(id__in=kwargs['apps'].split(','))
+        objs = list(Webapp.indexing_transformer(qs.order_by('id')))
+        if not objs:
+            raise CommandError('No apps.')
+
+        docs = {'current': [], 'legacy': []}
+        for obj in objs:
+            doc = WebappIndexer.extract_document(obj.id, obj)
+            docs['current'].append(doc)
+            current = WebappIndexer.extract_analyzer_fields(obj)
+            legacy = dict((key, value) for key, value in doc.iteritems()
+                          if key not in current)
+            legacy.update(legacy_analyzer_fields(obj))
+            docs['legacy'].append(legacy)
+
+        speed = {
+            'current': timed(WebappIndexer.extract_analyzer_fields, objs,
+                             kwargs['iterations']),
+            'legacy': timed(legacy_analyzer_fields, objs,
+                            kwargs['iterations']),
+        }
+        index_speed = self.index(docs) if kwargs['index'] else {}
+
+        self.stdout.write('Average per document of %s apps:' % len(objs))
+        self.stdout.write('%-8s %8s %8s %14s %14s' % (
+            '', 'fields', 'bytes', 'analyzers/s', 'indexed/s'))
+        for name in ('legacy', 'current'):
+            sizes = [len(json.dumps(doc, cls=DjangoJSONEncoder))
+                     for doc in docs[name]]
+            fields = [len(doc) for doc in docs[name]]
+            self.stdout.write('%-8s %8s %8s %14.0f %14s' % (
+                name, sum(fields) / len(fields), sum(sizes) / len(sizes),
+                speed[name],
+                '%.0f' % index_speed[name] if name in index_speed else '-'))
+
+    def index(self, docs):
+        """
+        Returns the number of documents of each kind indexed per second, in
+        a throwaway index.
+        """
+        es = WebappIndexer.get_es()
+        index = '%s-compare-%d' % (WebappIndexer.get_index(), time.time())
+        es.create_index(index, {
+            'mappings': WebappIndexer.get_mapping(),
+            'settings': WebappIndexer.get_settings({'number_of_replicas': 0,
+                                                    'refresh_interval': '-1'}),
+        })
+        try:
+            rv = {}
+            for name in ('legacy', 'current'):
+                start = time.time()
+                WebappIndexer.bulk_index(docs[name], es=es, index=index)
+                rv[name] = len(docs[name]) / (time.time() - start)
+            return rv
+        finally:
+            es.delete_index(index)
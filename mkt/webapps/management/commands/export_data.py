@@ -1,3 +1,5 @@
+from optparse import make_option
+
 from django.core.management.base import BaseCommand
 
 from mkt.webapps.tasks import export_data
@@ -5,7 +7,12 @@ from mkt.webapps.tasks import export_data
 
 class Command(BaseCommand):
     help = 'Export our data as a tgz for third-parties'
+    option_list = BaseCommand.option_list + (
+        make_option('--incremental', action='store_true', default=False,
+                    help='Only serialize the apps modified since the last '
+                         'export, copy the others from its tarball.'),
+    )
 
     def handle(self, *args, **kwargs):
         # Execute as a celery task so we get the right permissions.
-        export_data.delay()
+        export_data.delay(incremental=kwargs['incremental'])
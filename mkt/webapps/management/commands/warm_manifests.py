@@ -0,0 +1,44 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from mkt.webapps.tasks import warm_cached_manifests
+
+HELP = 'Rebuild the cached mini manifests of the public packaged apps'
+
+
+class Command(BaseCommand):
+    """
+    Usage:
+
+        python manage.py warm_manifests [--concurrency=4] [--apps=1,2,3]
+
+    Run after a deploy or a cache flush, so that installs don't have to build
+    the mini manifests. The most popular apps are done first.
+
+    """
+
+    option_list = BaseCommand.option_list + (
+        make_option('--concurrency', type='int', default=4,
+                    help='Number of apps done at the same time'),
+        make_option('--apps',
+                    help='Comma-separated list of app ids (default: all '
+                         'the public packaged apps)'),
+    )
+
+    help = HELP
+
+    def handle(self, *args, **kwargs):
+        ids = None
+        if kwargs.get('apps'):
+            ids = [int(id) for id in kwargs['apps'].split(',')]
+
+        def progress(done, failed, total):
+            self.stdout.write('%s/%s mini manifests, %s failed.\n'
+                              % (done, total, failed))
+
+        failed = warm_cached_manifests(ids, concurrency=kwargs['concurrency'],
+                                       progress=progress)
+        if failed:
+            self.stderr.write('%s mini manifests could not be built, see '
+                              'the logs.\n' % failed)
@@ -14,14 +14,14 @@ from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.storage import default_storage as storage
 from django.core.urlresolvers import NoReverseMatch
-from django.db import models
-from django.db.models import Max, Min, Q, signals as dbsignals
+from django.db import connection, models, transaction
+from django.db.models import Max, Min, signals as dbsignals
+from django.db.models.query import prefetch_related_objects
 from django.dispatch import receiver
 
 import commonware.log
 import json_field
 import waffle
-from cache_nuggets.lib import memoize, memoize_key
 from elasticutils.contrib.django import F, Indexable, MappingType
 from tower import ugettext as _
 
@@ -42,12 +42,13 @@ from constants.applications import DEVICE_GAIA, DEVICE_TYPES
 from constants.payments import PROVIDER_CHOICES
 from files.models import File, nfd_str, Platform
 from files.utils import parse_addon, WebAppParser
-from market.models import AddonPremium
+from market.models import AddonPremium, default_providers, PriceCurrency
 from stats.models import ClientData
 from translations.fields import PurifiedField, save_signal
 from versions.models import Version
 
 from lib.crypto import packaged
+from lib.es.client import get_es
 from lib.iarc.client import get_iarc_client
 from lib.iarc.utils import (get_iarc_app_title, render_xml,
                             REVERSE_DESC_MAPPING, REVERSE_INTERACTIVES_MAPPING)
@@ -58,6 +59,7 @@ from mkt.developers.models import AddonPaymentAccount
 from mkt.regions.utils import parse_region
 from mkt.search.utils import S
 from mkt.site.models import DynamicBoolFieldsMixin
+from mkt.webapps import exclusions
 from mkt.webapps.utils import (dehydrate_content_rating, dehydrate_descriptors,
                                dehydrate_interactives, get_locale_properties,
                                get_supported_locales)
@@ -260,6 +262,55 @@ class Webapp(Addon):
             qs = apps.transform(t)
         return qs
 
+    @staticmethod
+    def api_transformer(apps):
+        """
+        Attach everything AppSerializer needs on top of what
+        Webapp.transformer already attached, using a fixed number of queries
+        whatever the number of apps.
+        """
+        if not apps:
+            return
+        apps_dict = dict((a.id, a) for a in apps)
+
+        # Related managers (app.tags.all(), app.content_ratings.all(), ...)
+        # and reverse one-to-ones will use these instead of querying.
+        prefetch_related_objects(apps, [
+            'categories', 'tags', 'content_ratings', 'addonexcludedregion',
+            '_geodata', 'rating_descriptors', 'rating_interactives',
+            '_upsell_from__premium', '_upsell_to__free'])
+
+        # Versions, only what we need to build the versions dict.
+        versions = (Version.objects.filter(addon__in=apps_dict)
+                    .no_transforms().order_by('-created', '-modified'))
+        for app in apps:
+            app._versions = []
+        for version in versions:
+            apps_dict[version.addon_id]._versions.append(version)
+
+        # Payment accounts and paid regions, for premium apps only.
+        premium = dict((a.id, a) for a in apps if a.is_premium())
+        if not premium:
+            return
+        for app in premium.values():
+            app._payment_accounts = {}
+        accounts = (AddonPaymentAccount.objects.filter(addon__in=premium)
+                    .select_related('payment_account'))
+        for acct in accounts:
+            premium[acct.addon_id]._payment_accounts.setdefault(
+                acct.payment_account.provider, acct)
+
+        tiers = dict((a.id, a.premium.price_id) for a in premium.values()
+                     if a.premium and a.premium.price_id)
+        paid = defaultdict(list)
+        for tier, region in (PriceCurrency.objects
+                             .filter(tier__in=set(tiers.values()), paid=True,
+                                     provider__in=default_providers())
+                             .values_list('tier', 'region')):
+            paid[tier].append(region)
+        for app in premium.values():
+            app._price_region_ids = sorted(paid.get(tiers.get(app.id), []))
+
     @property
     def geodata(self):
         if hasattr(self, '_geodata'):
@@ -483,6 +534,15 @@ class Webapp(Addon):
                 .all())
 
     def payment_account(self, provider_id):
+        # If the api transformer attached the accounts, use them.
+        if hasattr(self, '_payment_accounts'):
+            try:
+                return self._payment_accounts[provider_id]
+            except KeyError:
+                raise self.PayAccountDoesNotExist(
+                    'No payment account for {app} named {pr}.'
+                    .format(app=self, pr=PROVIDER_CHOICES[provider_id]))
+
         qs = (self.app_payment_accounts.select_related('payment_account')
               .filter(payment_account__provider=provider_id))
 
@@ -757,8 +817,8 @@ class Webapp(Addon):
         else:
             all_ids = mkt.regions.REGION_IDS
         if excluded is None:
-            excluded = list(self.addonexcludedregion
-                                .values_list('region', flat=True))
+            # Iterate over .all() so that prefetched regions are used.
+            excluded = [aer.region for aer in self.addonexcludedregion.all()]
 
         return sorted(set(all_ids) - set(excluded or []))
 
@@ -772,8 +832,7 @@ class Webapp(Addon):
 
         Note: free and in-app are not included in this.
         """
-        excluded = set(self.addonexcludedregion
-                           .values_list('region', flat=True))
+        excluded = set(exclusions.get_excluded_regions([self.id])[self.id])
 
         if self.is_premium():
             all_regions = set(mkt.regions.ALL_REGION_IDS)
@@ -782,15 +841,12 @@ class Webapp(Addon):
             excluded = excluded.union(
                 all_regions.difference(self.get_price_region_ids()))
 
-        geo = self.geodata
-        if geo.region_de_iarc_exclude or geo.region_de_usk_exclude:
-            excluded.add(mkt.regions.DE.id)
-        if geo.region_br_iarc_exclude:
-            excluded.add(mkt.regions.BR.id)
-
         return sorted(list(excluded))
 
     def get_price_region_ids(self):
+        # If the api transformer attached the regions, use them.
+        if hasattr(self, '_price_region_ids'):
+            return self._price_region_ids
         tier = self.get_tier()
         if tier:
             return sorted(p['region'] for p in tier.prices() if p['paid'])
@@ -901,6 +957,9 @@ class Webapp(Addon):
         version of this manifest, e.g., when a new version of the packaged app
         is approved.
 
+        A cached manifest older than MINI_MANIFEST_FRESH_TIMEOUT is still
+        returned, and rebuilt in the background.
+
         If the addon is not a packaged app, this will not cache anything.
 
         """
@@ -910,37 +969,47 @@ class Webapp(Addon):
         key = 'webapp:{0}:manifest'.format(self.pk)
 
         if not force:
-            data = cache.get(key)
+            cached = cache.get_many([key, key + ':fresh'])
+            data = cached.get(key)
             if data:
+                # Only one rebuild at a time.
+                if (key + ':fresh' not in cached and
+                    cache.add(key + ':refresh', 1, 60 * 5)):
+                    from mkt.webapps.tasks import update_cached_manifests
+                    update_cached_manifests.delay(self.pk)
                 return data
 
-        version = self.current_version
-        if not version:
-            data = {}
-        else:
-            file_obj = version.all_files[0]
-            manifest = self.get_manifest_json(file_obj)
-            package_path = absolutify(
-                os.path.join(reverse('downloads.file', args=[file_obj.id]),
-                             file_obj.filename))
-
-            data = {
-                'name': manifest['name'],
-                'version': version.version,
-                'size': storage.size(file_obj.signed_file_path),
-                'release_notes': version.releasenotes,
-                'package_path': package_path,
-            }
-            for key in ['developer', 'icons', 'locales']:
-                if key in manifest:
-                    data[key] = manifest[key]
-
-        data = json.dumps(data, cls=JSONEncoder)
+        data = json.dumps(self.get_mini_manifest(), cls=JSONEncoder)
 
         cache.set(key, data, None)
+        cache.set(key + ':fresh', 1, settings.MINI_MANIFEST_FRESH_TIMEOUT)
 
         return data
 
+    def get_mini_manifest(self):
+        """Build the "mini" manifest of a packaged app, as a dict."""
+        version = self.current_version
+        if not version:
+            return {}
+
+        file_obj = version.all_files[0]
+        manifest = self.get_manifest_json(file_obj)
+        package_path = absolutify(
+            os.path.join(reverse('downloads.file', args=[file_obj.id]),
+                         file_obj.filename))
+
+        data = {
+            'name': manifest['name'],
+            'version': version.version,
+            'size': storage.size(file_obj.signed_file_path),
+            'release_notes': version.releasenotes,
+            'package_path': package_path,
+        }
+        for key in ['developer', 'icons', 'locales']:
+            if key in manifest:
+                data[key] = manifest[key]
+        return data
+
     def sign_if_packaged(self, version_pk, reviewer=False):
         if not self.is_packaged:
             return
@@ -1254,8 +1323,6 @@ class Webapp(Addon):
             {<ratingsbodies class>: <rating class>, ...}
 
         """
-        from . import tasks
-
         if not data:
             return
 
@@ -1271,6 +1338,15 @@ class Webapp(Addon):
         log.info('IARC content ratings set for app:%s:%s' %
                  (self.id, self.app_slug))
 
+        self.content_ratings_changed()
+
+    def content_ratings_changed(self):
+        """
+        Syncs with IARC, updates the region exclusions and the status of the
+        app after its content ratings were set.
+        """
+        from . import tasks
+
         self.set_iarc_storefront_data()  # Ratings updated, sync with IARC.
 
         geodata, c = Geodata.objects.get_or_create(addon=self)
@@ -1290,6 +1366,13 @@ class Webapp(Addon):
         geodata.region_br_iarc_exclude = False
         geodata.region_de_iarc_exclude = False
 
+        # Flips the app's status from NULL if it has everything else together,
+        # like update_status_content_ratings does for the ratings saved one
+        # at a time (bulk_set doesn't send post_save).
+        if (self.has_incomplete_status() and
+            self.is_fully_complete(ignore_ratings=True)):
+            self.update(status=amo.STATUS_PENDING)
+
         # Un-disable apps that were disabled by the great IARC purge.
         if (self.status == amo.STATUS_DISABLED and self.iarc_purged):
             self.update(status=amo.STATUS_PUBLIC, iarc_purged=False)
@@ -1314,11 +1397,7 @@ class Webapp(Addon):
         log.info('IARC setting descriptors for app:%s:%s' %
                  (self.id, self.app_slug))
 
-        create_kwargs = {}
-        for desc in mkt.ratingdescriptors.RATING_DESCS.keys():
-            has_desc_attr = 'has_%s' % desc.lower()
-            create_kwargs[has_desc_attr] = has_desc_attr in data
-
+        create_kwargs = RatingDescriptors.values_for(data)
         rd, created = RatingDescriptors.objects.get_or_create(
             addon=self, defaults=create_kwargs)
         if not created:
@@ -1339,12 +1418,7 @@ class Webapp(Addon):
             [<has_interactive_1>, <has_interactive name 2>]
 
         """
-        create_kwargs = {}
-        for interactive in mkt.ratinginteractives.RATING_INTERACTIVES.keys():
-            interactive = 'has_%s' % interactive.lower()
-            create_kwargs[interactive] = interactive in map(
-                lambda x: x.lower(), data)
-
+        create_kwargs = RatingInteractives.values_for(data)
         ri, created = RatingInteractives.objects.get_or_create(
             addon=self, defaults=create_kwargs)
         if not created:
@@ -1429,6 +1503,9 @@ class WebappIndexer(MappingType, Indexable):
     By default we will return these objects rather than hit the database so
     include here all the things we need to avoid hitting the database.
     """
+    # (SEARCH_LANGUAGE_TO_ANALYZER, ES_USE_PLUGINS, filtered copy), see
+    # get_language_analyzers().
+    _language_analyzers = (None, None, None)
 
     @classmethod
     def get_mapping_type_name(cls):
@@ -1444,6 +1521,12 @@ class WebappIndexer(MappingType, Indexable):
     def get_index(cls):
         return settings.ES_INDEXES[cls.get_mapping_type_name()]
 
+    @classmethod
+    def get_es(cls, **overrides):
+        """Returns the shared ES client of the indexing tasks."""
+        overrides.setdefault('name', 'indexing')
+        return get_es(**overrides)
+
     @classmethod
     def get_model(cls):
         return Webapp
@@ -1593,6 +1676,8 @@ class WebappIndexer(MappingType, Indexable):
                             ('has_%s' % f.lower(), {'type': 'boolean'})
                             for f in APP_FEATURES)
                     },
+                    # The same features as a bitfield, see AppFeatures.to_int.
+                    'features_int': {'type': 'long'},
                     'has_public_stats': {'type': 'boolean'},
                     'icon_hash': {'type': 'string',
                                   'index': 'not_analyzed'},
@@ -1723,8 +1808,7 @@ class WebappIndexer(MappingType, Indexable):
         latest_version = obj.latest_version
         version = obj.current_version
         geodata = obj.geodata
-        features = (version.features.to_dict()
-                    if version else AppFeatures().to_dict())
+        features = version.features if version else AppFeatures()
         is_escalated = obj.escalationqueue_set.exists()
 
         try:
@@ -1732,8 +1816,8 @@ class WebappIndexer(MappingType, Indexable):
         except IndexError:
             status = None
 
-        installed_ids = list(Installed.objects.filter(addon=obj)
-                             .values_list('id', flat=True))
+        installs = InstallCount.get_counts(obj.id)
+        total_installs = installs.pop(InstallCount.ALL_REGIONS, 0)
 
         attrs = ('app_slug', 'average_daily_users', 'bayesian_rating',
                  'created', 'id', 'is_disabled', 'last_updated', 'modified',
@@ -1758,7 +1842,8 @@ class WebappIndexer(MappingType, Indexable):
         d['description'] = list(
             set(string for _, string in obj.translations[obj.description_id]))
         d['device'] = getattr(obj, 'device_ids', [])
-        d['features'] = features
+        d['features'] = features.to_dict()
+        d['features_int'] = features.to_int()
         d['has_public_stats'] = obj.public_stats
         d['icon_hash'] = obj.icon_hash
         d['interactive_elements'] = obj.get_interactives_slugs()
@@ -1784,7 +1869,7 @@ class WebappIndexer(MappingType, Indexable):
         d['name_sort'] = unicode(obj.name).lower()
         d['owners'] = [au.user.id for au in
                        obj.addonuser_set.filter(role=amo.AUTHOR_ROLE_OWNER)]
-        d['popularity'] = d['_boost'] = len(installed_ids)
+        d['popularity'] = d['_boost'] = total_installs
         d['previews'] = [{'filetype': p.filetype, 'modified': p.modified,
                           'id': p.id} for p in obj.previews.all()]
         try:
@@ -1856,16 +1941,13 @@ class WebappIndexer(MappingType, Indexable):
 
         # Calculate regional popularity for "mature regions"
         # (installs + reviews/installs from that region).
-        installs = dict(ClientData.objects.filter(installed__in=installed_ids)
-                        .annotate(region_counts=models.Count('region'))
-                        .values_list('region', 'region_counts').distinct())
         for region in mkt.regions.ALL_REGION_IDS:
             cnt = installs.get(region, 0)
             if cnt:
                 # Magic number (like all other scores up in this piece).
                 d['popularity_%s' % region] = d['popularity'] + cnt * 10
             else:
-                d['popularity_%s' % region] = len(installed_ids)
+                d['popularity_%s' % region] = total_installs
             d['_boost'] += cnt * 10
 
         # Bump the boost if the add-on is public.
@@ -1891,23 +1973,47 @@ class WebappIndexer(MappingType, Indexable):
                 }
             }
 
-        # Indices for each language. languages is a list of locales we want to
-        # index with analyzer if the string's locale matches.
-        for analyzer, languages in amo.SEARCH_ANALYZER_MAP.iteritems():
-            if (not settings.ES_USE_PLUGINS and
-                analyzer in amo.SEARCH_ANALYZER_PLUGINS):
-                continue
-
-            d['name_' + analyzer] = list(
-                set(string for locale, string in obj.translations[obj.name_id]
-                    if locale.lower() in languages))
-            d['description_' + analyzer] = list(
-                set(string for locale, string
-                    in obj.translations[obj.description_id]
-                    if locale.lower() in languages))
+        d.update(cls.extract_analyzer_fields(obj))
 
         return d
 
+    @classmethod
+    def get_language_analyzers(cls):
+        """
+        Returns amo.SEARCH_LANGUAGE_TO_ANALYZER without the analyzers that
+        need a plugin when ES_USE_PLUGINS is off. It's only filtered again
+        when either of them changes.
+        """
+        source, use_plugins, analyzers = cls._language_analyzers
+        if (source is not amo.SEARCH_LANGUAGE_TO_ANALYZER or
+            use_plugins != settings.ES_USE_PLUGINS):
+            source = amo.SEARCH_LANGUAGE_TO_ANALYZER
+            use_plugins = settings.ES_USE_PLUGINS
+            analyzers = dict(
+                (language, analyzer)
+                for language, analyzer in source.iteritems()
+                if use_plugins or
+                analyzer not in amo.SEARCH_ANALYZER_PLUGINS)
+            cls._language_analyzers = source, use_plugins, analyzers
+        return analyzers
+
+    @classmethod
+    def extract_analyzer_fields(cls, obj):
+        """
+        Returns the name_<analyzer> and description_<analyzer> fields of
+        `obj`, only for the analyzers of the locales the app has a name or
+        description in.
+        """
+        analyzers = cls.get_language_analyzers()
+        strings = defaultdict(set)
+        for field in ('name', 'description'):
+            translations = obj.translations[getattr(obj, '%s_id' % field)]
+            for locale, string in translations:
+                analyzer = analyzers.get(locale.lower())
+                if analyzer:
+                    strings['%s_%s' % (field, analyzer)].add(string)
+        return dict((key, list(value)) for key, value in strings.iteritems())
+
     @classmethod
     def get_indexable(cls):
         """Returns the queryset of ids of all things to be indexed."""
@@ -2037,6 +2143,102 @@ def add_uuid(sender, **kw):
             install.save()
 
 
+class InstallCount(models.Model):
+    """
+    Number of installs of an app, in total and by region of the client.
+
+    Kept up to date when `Installed` rows are created or deleted, and
+    reconciled with them by the `reconcile_app_install_counts` cron. Not
+    cached by cache-machine since it's written with raw SQL.
+    """
+    # The region of the total number of installs.
+    ALL_REGIONS = 0
+
+    addon = models.ForeignKey('addons.Addon', related_name='install_counts')
+    region = models.PositiveIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'webapps_install_counts'
+        unique_together = ('addon', 'region')
+
+    @classmethod
+    def _regions(cls, region):
+        return [cls.ALL_REGIONS, region] if region else [cls.ALL_REGIONS]
+
+    @classmethod
+    def increment(cls, addon_id, region=None):
+        """Count an install of `addon_id`, in total and in `region`."""
+        regions = cls._regions(region)
+        sql = ('INSERT INTO %s (addon_id, region, count) VALUES %s '
+               'ON DUPLICATE KEY UPDATE count = count + 1' % (
+                   cls._meta.db_table,
+                   ', '.join(['(%s, %s, 1)'] * len(regions))))
+        params = []
+        for r in regions:
+            params.extend([addon_id, r])
+        connection.cursor().execute(sql, params)
+
+    @classmethod
+    def decrement(cls, addon_id, region=None):
+        # Never creates rows, so that it's harmless while the add-on itself
+        # is being deleted.
+        (cls.objects.filter(addon=addon_id, region__in=cls._regions(region),
+                            count__gt=0)
+         .update(count=models.F('count') - 1))
+
+    @classmethod
+    def get_counts(cls, addon_id):
+        """
+        Return a {region id: installs} dict for `addon_id`, with the total
+        under ALL_REGIONS.
+        """
+        return dict(cls.objects.filter(addon=addon_id)
+                    .values_list('region', 'count'))
+
+    @classmethod
+    @transaction.commit_on_success
+    def reconcile(cls, addon_ids):
+        """Recount the installs of `addon_ids` from the `Installed` rows."""
+        counts = defaultdict(int)
+        for addon_id, region, count in (
+                Installed.objects.filter(addon__in=addon_ids)
+                .values_list('addon', 'client_data__region')
+                .annotate(models.Count('id')).order_by()):
+            counts[addon_id, cls.ALL_REGIONS] += count
+            if region:
+                counts[addon_id, region] += count
+        cls.objects.filter(addon__in=addon_ids).delete()
+        cls.objects.bulk_create(
+            cls(addon_id=addon_id, region=region, count=count)
+            for (addon_id, region), count in counts.items())
+
+
+def _install_region(install):
+    if not install.client_data_id:
+        return None
+    # Don't query the client data again if the caller set it.
+    cache_name = Installed._meta.get_field('client_data').get_cache_name()
+    client_data = getattr(install, cache_name, None)
+    if client_data is not None:
+        return client_data.region
+    return (ClientData.objects.filter(pk=install.client_data_id)
+            .values_list('region', flat=True).first())
+
+
+@receiver(models.signals.post_save, sender=Installed,
+          dispatch_uid='installed_count_save')
+def count_install(sender, instance, created, **kw):
+    if created and not kw.get('raw'):
+        InstallCount.increment(instance.addon_id, _install_region(instance))
+
+
+@receiver(models.signals.post_delete, sender=Installed,
+          dispatch_uid='installed_count_delete')
+def uncount_install(sender, instance, **kw):
+    InstallCount.decrement(instance.addon_id, _install_region(instance))
+
+
 class AddonExcludedRegion(amo.models.ModelBase):
     """
     Apps are listed in all regions by default.
@@ -2059,38 +2261,21 @@ class AddonExcludedRegion(amo.models.ModelBase):
         return mkt.regions.REGIONS_CHOICES_ID_DICT.get(self.region)
 
 
-@memoize(prefix='get_excluded_in')
 def get_excluded_in(region_id):
     """
     Return IDs of Webapp objects excluded from a particular region or excluded
     due to Geodata flags.
     """
-    aers = list(AddonExcludedRegion.objects.filter(region=region_id)
-                .values_list('addon', flat=True))
-
-    # For pre-IARC unrated games in Brazil/Germany.
-    geodata_qs = Q()
-    region = parse_region(region_id)
-    if region in (mkt.regions.BR, mkt.regions.DE):
-        geodata_qs |= Q(**{'region_%s_iarc_exclude' % region.slug: True})
-    # For USK_RATING_REFUSED apps in Germany.
-    if region == mkt.regions.DE:
-        geodata_qs |= Q(**{'region_de_usk_exclude': True})
-
-    geodata_exclusions = []
-    if geodata_qs:
-        geodata_exclusions = list(Geodata.objects.filter(geodata_qs)
-                                  .values_list('addon', flat=True))
-    return set(aers + geodata_exclusions)
-
-
-@receiver(models.signals.post_save, sender=AddonExcludedRegion,
-          dispatch_uid='clean_memoized_exclusions')
-def clean_memoized_exclusions(sender, **kw):
+    return set(exclusions.get_excluded_apps(region_id))
+
+
+def update_exclusions(sender, instance, **kw):
     if not kw.get('raw'):
-        for k in mkt.regions.ALL_REGION_IDS:
-            cache.delete_many([memoize_key('get_excluded_in', k)
-                               for k in mkt.regions.ALL_REGION_IDS])
+        from . import tasks
+        exclusions.update_app(instance.addon_id)
+        # And again once committed, for the requests that read the db
+        # between now and then.
+        tasks.update_exclusions.delay([instance.addon_id])
 
 
 class IARCInfo(amo.models.ModelBase):
@@ -2123,6 +2308,39 @@ class ContentRating(amo.models.ModelBase):
         db_table = 'webapps_contentrating'
         unique_together = ('addon', 'ratings_body')
 
+    @classmethod
+    def bulk_set(cls, data):
+        """
+        Sets the ratings of several apps at once, `data` being a dict of
+        {<addon id>: {<ratingsbodies class>: <rating class>, ...}, ...}.
+        Like `Webapp.set_content_ratings`, this overwrites or creates ratings
+        but doesn't delete any. Ratings getting the same value are updated in
+        one query, the missing ones are all created in another one.
+
+        No post_save is sent: call `Webapp.content_ratings_changed` on the
+        apps afterwards.
+        """
+        existing = dict(((cr.addon_id, cr.ratings_body), cr) for cr in
+                        cls.objects.no_cache().filter(addon__in=data.keys()))
+        groups = defaultdict(list)
+        new = []
+        for addon_id, ratings in data.items():
+            for body, rating in ratings.items():
+                if (addon_id, body.id) in existing:
+                    groups[body.id, rating.id].append(addon_id)
+                else:
+                    new.append(cls(addon_id=addon_id, ratings_body=body.id,
+                                   rating=rating.id))
+
+        now = datetime.datetime.now()
+        for (body_id, rating_id), addon_ids in groups.items():
+            cls.objects.filter(addon__in=addon_ids,
+                               ratings_body=body_id).update(
+                rating=rating_id, modified=now)
+        if existing:
+            cls.objects.invalidate(*existing.values())
+        cls.objects.bulk_create(new)
+
     def __unicode__(self):
         return u'%s: %s' % (self.addon, self.get_label())
 
@@ -2197,6 +2415,18 @@ class RatingDescriptors(amo.models.ModelBase, DynamicBoolFieldsMixin):
     def __unicode__(self):
         return u'%s: %s' % (self.id, self.addon.name)
 
+    @classmethod
+    def values_for(cls, descriptors):
+        """
+        Returns the values of all the fields for the list of descriptors
+        `descriptors`, of the form ['has_<descriptor 1>', ...].
+        """
+        values = {}
+        for desc in mkt.ratingdescriptors.RATING_DESCS.keys():
+            has_desc_attr = 'has_%s' % desc.lower()
+            values[has_desc_attr] = has_desc_attr in descriptors
+        return values
+
     def iarc_deserialize(self, body=None):
         """Map our descriptor strings back to the IARC ones (comma-sep.)."""
         keys = self.to_keys()
@@ -2226,6 +2456,19 @@ class RatingInteractives(amo.models.ModelBase, DynamicBoolFieldsMixin):
     def __unicode__(self):
         return u'%s: %s' % (self.id, self.addon.name)
 
+    @classmethod
+    def values_for(cls, interactives):
+        """
+        Returns the values of all the fields for the list of interactive
+        elements `interactives`, of the form ['has_<interactive 1>', ...].
+        """
+        interactives = [x.lower() for x in interactives]
+        values = {}
+        for interactive in mkt.ratinginteractives.RATING_INTERACTIVES.keys():
+            interactive = 'has_%s' % interactive.lower()
+            values[interactive] = interactive in interactives
+        return values
+
     def iarc_deserialize(self):
         """Map our descriptor strings back to the IARC ones (comma-sep.)."""
         return ', '.join(REVERSE_INTERACTIVES_MAPPING.get(inter)
@@ -2278,14 +2521,25 @@ class AppFeatures(amo.models.ModelBase, DynamicBoolFieldsMixin):
         string indexing.
         """
         fields = self._fields()
-        # Grab the profile part of the signature and convert to binary string.
+        # Grab the profile part of the signature and convert it to an int.
         try:
-            profile = bin(int(signature.split('.')[0], 16)).lstrip('0b')
-            n = len(fields) - 1
-            for i, f in enumerate(fields):
-                setattr(self, f, bool(int(profile, 2) & 2 ** (n - i)))
+            profile = int(signature.split('.')[0], 16)
         except ValueError as e:
             log.error(u'ValueError converting %s. %s' % (signature, e))
+            return
+        n = len(fields) - 1
+        for i, f in enumerate(fields):
+            setattr(self, f, bool(profile >> (n - i) & 1))
+
+    def to_int(self):
+        """
+        Returns the flags as an integer bitfield, the first feature being the
+        most significant bit, like `FeatureProfile.to_int()`.
+        """
+        features = 0
+        for f in self._fields():
+            features = features << 1 | bool(getattr(self, f))
+        return features
 
     def to_signature(self):
         """
@@ -2304,9 +2558,7 @@ class AppFeatures(amo.models.ModelBase, DynamicBoolFieldsMixin):
             '457eab.23.1'
 
         """
-        profile = ''.join('1' if getattr(self, f) else '0'
-                          for f in self._fields())
-        return '%x.%s.%s' % (int(profile, 2), len(profile),
+        return '%x.%s.%s' % (self.to_int(), len(self._fields()),
                              settings.APP_FEATURES_VERSION)
 
 
@@ -2464,3 +2716,12 @@ for region in (mkt.regions.BR, mkt.regions.DE):
 # Save geodata translations when a Geodata instance is saved.
 models.signals.pre_save.connect(save_signal, sender=Geodata,
                                 dispatch_uid='geodata_translations')
+
+# Keep the region exclusions index up to date.
+for sender in (AddonExcludedRegion, Geodata):
+    models.signals.post_save.connect(
+        update_exclusions, sender=sender,
+        dispatch_uid='%s_save_exclusions' % sender._meta.db_table)
+    models.signals.post_delete.connect(
+        update_exclusions, sender=sender,
+        dispatch_uid='%s_delete_exclusions' % sender._meta.db_table)
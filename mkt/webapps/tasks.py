@@ -1,29 +1,25 @@
 import datetime
 import hashlib
+import itertools
 import json
 import logging
 import os
 import shutil
-import subprocess
 import time
+from multiprocessing.pool import ThreadPool
 
 from django.conf import settings
-from django.contrib.auth.models import AnonymousUser
 from django.core.files.storage import default_storage as storage
-from django.template import Context, loader
+from django.db import connection
 
-import pytz
 import requests
-from celery import chord
 from celery.exceptions import RetryTaskError
 from celeryutils import task
 from pyelasticsearch.exceptions import ElasticHttpNotFoundError
 from requests.exceptions import RequestException
-from test_utils import RequestFactory
 from tower import ugettext as _
 
 import amo
-from addons.models import Addon
 from amo.decorators import use_master, write
 from amo.helpers import absolutify
 from amo.urlresolvers import reverse
@@ -34,14 +30,16 @@ from files.utils import WebAppParser
 from lib.es.utils import get_indices
 from lib.metrics import get_monolith_client
 from lib.post_request_task.task import task as post_request_task
-from users.models import UserProfile
 from users.utils import get_task_user
 
 import mkt
-from mkt.constants.regions import RESTOFWORLD
 from mkt.developers.tasks import (_fetch_manifest, fetch_icon, pngcrush_image,
                                   resize_preview, validator)
-from mkt.webapps.models import AppManifest, Webapp, WebappIndexer
+from mkt.webapps.export import (export, export_user_installs,
+                                 get_dump_request)
+from mkt.webapps import exclusions
+from mkt.webapps.models import (AppManifest, InstallCount, Webapp,
+                                WebappIndexer)
 from mkt.webapps.utils import get_locale_properties
 
 
@@ -269,6 +267,63 @@ def update_cached_manifests(id, **kw):
     _log(webapp, u'Updated cached mini manifest')
 
 
+def _warm_cached_manifests(ids):
+    failed = 0
+    for webapp in Webapp.objects.no_cache().filter(pk__in=ids):
+        try:
+            webapp.get_cached_manifest(force=True)
+        except Exception:
+            _log(webapp, u'Error updating cached mini manifest',
+                 exc_info=True)
+            failed += 1
+    return len(ids), failed
+
+
+def _warm_cached_manifests_thread(ids):
+    try:
+        return _warm_cached_manifests(ids)
+    finally:
+        # Every thread has its own connection.
+        connection.close()
+
+
+def warm_cached_manifests(ids=None, concurrency=4, chunk_size=20,
+                          progress=None):
+    """
+    Rebuild the cached mini manifests of the packaged apps in `ids`, or of
+    all the public packaged apps, most popular first, with `concurrency`
+    threads. `progress(done, failed, total)` is called after every chunk of
+    `chunk_size` apps. Returns the number of apps that failed.
+    """
+    if ids is None:
+        ids = list(Webapp.objects.filter(
+            is_packaged=True, disabled_by_user=False,
+            status__in=[amo.STATUS_PUBLIC, amo.STATUS_BLOCKED])
+            .order_by('-weekly_downloads').values_list('id', flat=True))
+    chunks = chunked(ids, chunk_size)
+    pool = None
+    if concurrency > 1:
+        pool = ThreadPool(concurrency)
+        results = pool.imap_unordered(_warm_cached_manifests_thread, chunks)
+    else:
+        results = itertools.imap(_warm_cached_manifests, chunks)
+
+    done = failed = 0
+    try:
+        for count, errors in results:
+            done += count
+            failed += errors
+            if progress:
+                progress(done, failed, len(ids))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    task_log.info(u'Warmed %s cached mini manifests, %s failed.'
+                  % (done - failed, failed))
+    return failed
+
+
 @task
 @write
 def add_uuids(ids, **kw):
@@ -295,7 +350,7 @@ def update_supported_locales(ids, **kw):
                 _log(app, u'Updating supported locales failed.', exc_info=True)
 
 
-@post_request_task(acks_late=True)
+@post_request_task(acks_late=True, merge_ids=True)
 @write
 def index_webapps(ids, **kw):
     task_log.info('Indexing apps %s-%s. [%s]' % (ids[0], ids[-1], len(ids)))
@@ -314,7 +369,7 @@ def index_webapps(ids, **kw):
             WebappIndexer.index(doc, id_=obj.id, es=es, index=idx)
 
 
-@post_request_task(acks_late=True)
+@post_request_task(acks_late=True, merge_ids=True)
 @write
 def unindex_webapps(ids, **kw):
     if not ids:
@@ -338,54 +393,39 @@ def unindex_webapps(ids, **kw):
                     u'[Webapp:%s] Unindexing app but not found in index' % id_)
 
 
-@task
-def dump_app(id, **kw):
+@post_request_task(merge_ids=True)
+@write
+def update_exclusions(ids, **kw):
+    """Drop the cached region exclusions of `ids` that the request changed."""
+    for id_ in ids:
+        exclusions.update_app(id_)
+
+
+def _dump_app(obj, req):
     from mkt.webapps.api import AppSerializer
     # Because @robhudson told me to.
     # Note: not using storage because all these operations should be local.
     target_dir = os.path.join(settings.DUMPED_APPS_PATH, 'apps',
-                              str(id / 1000))
-    target_file = os.path.join(target_dir, str(id) + '.json')
-
-    try:
-        obj = Webapp.objects.get(pk=id)
-    except Webapp.DoesNotExist:
-        task_log.info(u'Webapp does not exist: {0}'.format(id))
-        return
-
-    req = RequestFactory().get('/')
-    req.user = AnonymousUser()
-    req.REGION = RESTOFWORLD
+                              str(obj.id / 1000))
+    target_file = os.path.join(target_dir, str(obj.id) + '.json')
 
     if not os.path.exists(target_dir):
         os.makedirs(target_dir)
 
-    task_log.info('Dumping app {0} to {1}'.format(id, target_file))
+    task_log.info('Dumping app {0} to {1}'.format(obj.id, target_file))
     res = AppSerializer(obj, context={'request': req}).data
     json.dump(res, open(target_file, 'w'), cls=JSONEncoder)
     return target_file
 
 
 @task
-def clean_apps(pks, **kw):
-    app_dir = os.path.join(settings.DUMPED_APPS_PATH, 'apps')
-    rm_directory(app_dir)
-    return pks
-
-
-@task(ignore_result=False)
-def dump_apps(ids, **kw):
-    task_log.info(u'Dumping apps {0} to {1}. [{2}]'
-                  .format(ids[0], ids[-1], len(ids)))
-    for id in ids:
-        dump_app(id)
-
-
-@task
-def zip_apps(*args, **kw):
-    today = datetime.datetime.today().strftime('%Y-%m-%d')
-    files = ['apps'] + compile_extra_files(date=today)
-    return compress_export(filename=today, files=files)
+def dump_app(id, **kw):
+    try:
+        obj = Webapp.objects.get(pk=id)
+    except Webapp.DoesNotExist:
+        task_log.info(u'Webapp does not exist: {0}'.format(id))
+        return
+    return _dump_app(obj, get_dump_request())
 
 
 def rm_directory(path):
@@ -393,134 +433,18 @@ def rm_directory(path):
         shutil.rmtree(path)
 
 
-def dump_all_apps_tasks():
-    all_pks = (Webapp.objects.visible()
-                             .values_list('pk', flat=True)
-                             .order_by('pk'))
-    return [dump_apps.si(pks) for pks in chunked(all_pks, 100)]
-
-
 @task
-def export_data(name=None):
-    from mkt.collections.tasks import dump_all_collections_tasks
-    today = datetime.datetime.today().strftime('%Y-%m-%d')
+def export_data(name=None, incremental=False):
     if name is None:
-        name = today
-    root = settings.DUMPED_APPS_PATH
-    directories = ['apps', 'collections']
-    for directory in directories:
-        rm_directory(os.path.join(root, directory))
-    files = directories + compile_extra_files(date=today)
-    chord(dump_all_apps_tasks() + dump_all_collections_tasks(),
-          compress_export.si(filename=name, files=files)).apply_async()
-
-
-def compile_extra_files(date):
-    # Put some .txt files in place.
-    context = Context({'date': date, 'url': settings.SITE_URL})
-    files = ['license.txt', 'readme.txt']
-    if not os.path.exists(settings.DUMPED_APPS_PATH):
-        os.makedirs(settings.DUMPED_APPS_PATH)
-    created_files = []
-    for f in files:
-        template = loader.get_template('webapps/dump/apps/' + f)
-        dest = os.path.join(settings.DUMPED_APPS_PATH, f)
-        open(dest, 'w').write(template.render(context))
-        created_files.append(f)
-    return created_files
+        name = datetime.datetime.today().strftime('%Y-%m-%d')
+    return export(name, incremental=incremental)
 
 
 @task
-def compress_export(filename, files):
-    # Note: not using storage because all these operations should be local.
-    target_dir = os.path.join(settings.DUMPED_APPS_PATH, 'tarballs')
-    target_file = os.path.join(target_dir, filename + '.tgz')
-
-    if not os.path.exists(target_dir):
-        os.makedirs(target_dir)
-
-    # Put some .txt files in place.
-    cmd = ['tar', 'czf', target_file, '-C',
-           settings.DUMPED_APPS_PATH] + files
-    task_log.info(u'Creating dump {0}'.format(target_file))
-    subprocess.call(cmd)
-    return target_file
-
-
-@task(ignore_result=False)
-def dump_user_installs(ids, **kw):
-    task_log.info(u'Dumping user installs {0} to {1}. [{2}]'
-                  .format(ids[0], ids[-1], len(ids)))
-
-    for user_id in ids:
-        try:
-            user = UserProfile.objects.get(pk=user_id)
-        except UserProfile.DoesNotExist:
-            task_log.info('User profile does not exist: {0}'.format(user_id))
-            continue
-
-        hash = hashlib.sha256('%s%s' % (str(user.id),
-                                        settings.SECRET_KEY)).hexdigest()
-        target_dir = os.path.join(settings.DUMPED_USERS_PATH, 'users', hash[0])
-        target_file = os.path.join(target_dir, '%s.json' % hash)
-
-        if not os.path.exists(target_dir):
-            try:
-                os.makedirs(target_dir)
-            except OSError:
-                pass  # Catch race condition if file exists now.
-
-        # Gather data about user.
-        installed = []
-        zone = pytz.timezone(settings.TIME_ZONE)
-        for install in user.installed_set.filter(addon__type=amo.ADDON_WEBAPP):
-            try:
-                app = install.addon
-            except Addon.DoesNotExist:
-                continue
-
-            installed.append({
-                'id': app.id,
-                'slug': app.app_slug,
-                'installed': pytz.utc.normalize(
-                    zone.localize(install.created)).strftime(
-                        '%Y-%m-%dT%H:%M:%S')
-            })
-
-        data = {
-            'user': hash,
-            'region': user.region,
-            'lang': user.lang,
-            'installed_apps': installed,
-        }
-
-        task_log.info('Dumping user {0} to {1}'.format(user.id, target_file))
-        json.dump(data, open(target_file, 'w'), cls=JSONEncoder)
-
-
-@task
-def zip_users(*args, **kw):
-    # Note: not using storage because all these operations should be local.
-    today = datetime.datetime.utcnow().strftime('%Y-%m-%d')
-    target_dir = os.path.join(settings.DUMPED_USERS_PATH, 'tarballs')
-    target_file = os.path.join(target_dir, '{0}.tgz'.format(today))
-
-    if not os.path.exists(target_dir):
-        os.makedirs(target_dir)
-
-    # Put some .txt files in place.
-    context = Context({'date': today, 'url': settings.SITE_URL})
-    files = ['license.txt', 'readme.txt']
-    for f in files:
-        template = loader.get_template('webapps/dump/users/' + f)
-        dest = os.path.join(settings.DUMPED_USERS_PATH, 'users', f)
-        open(dest, 'w').write(template.render(context))
-
-    cmd = ['tar', 'czf', target_file, '-C',
-           settings.DUMPED_USERS_PATH, 'users']
-    task_log.info(u'Creating user dump {0}'.format(target_file))
-    subprocess.call(cmd)
-    return target_file
+def dump_user_installs(name=None):
+    if name is None:
+        name = datetime.datetime.utcnow().strftime('%Y-%m-%d')
+    return export_user_installs(name)
 
 
 def _fix_missing_icons(id):
@@ -767,6 +691,15 @@ def update_downloads(ids, **kw):
                   % (count, len(ids)))
 
 
+@task
+@write
+def reconcile_install_counts(ids, **kw):
+    """Recount the installs of the apps in `ids`."""
+    task_log.info('[%s@%s] Reconciling install counts.'
+                  % (len(ids), reconcile_install_counts.rate_limit))
+    InstallCount.reconcile(ids)
+
+
 class PreGenAPKError(Exception):
     """
     An error encountered while trying to pre-generate an APK.
@@ -89,3 +89,49 @@ class TestSimpleAppSerializer(amo.tests.TestCase):
         acct = self.add_pay_account()
         eq_(self.app().data['payment_account'],
             reverse('payment-account-detail', args=[acct.pk]))
+
+
+class TestAppSerializerPrefetch(amo.tests.TestCase):
+    fixtures = fixture('webapp_337141', 'user_2519')
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.request.amo_user = UserProfile.objects.get(pk=2519)
+
+    def serialize(self, app):
+        return AppSerializer(app, context={'request': self.request}).data
+
+    def test_same_data(self):
+        expected = self.serialize(Webapp.objects.get(pk=337141))
+        app = AppSerializer.prefetch(Webapp.objects.filter(pk=337141),
+                                     self.request)[0]
+        eq_(self.serialize(app), expected)
+
+    def test_same_data_premium(self):
+        app = Webapp.objects.get(pk=337141)
+        self.make_premium(app)
+        expected = self.serialize(Webapp.objects.get(pk=337141))
+        app = AppSerializer.prefetch(Webapp.objects.filter(pk=337141),
+                                     self.request)[0]
+        eq_(self.serialize(app), expected)
+
+    def test_user_info(self):
+        app = Webapp.objects.get(pk=337141)
+        app.installed.create(user=self.request.amo_user)
+        app = AppSerializer.prefetch([app], self.request)[0]
+        with self.assertNumQueries(0):
+            eq_(AppSerializer(context={'request': self.request})
+                .get_user_info(app),
+                {'developed': False, 'installed': True, 'purchased': False})
+
+    def test_no_per_app_queries(self):
+        amo.tests.app_factory()
+        apps = AppSerializer.prefetch(Webapp.objects.all(), self.request)
+        serializer = AppSerializer(context={'request': self.request})
+        with self.assertNumQueries(0):
+            for app in apps:
+                serializer.get_tags(app)
+                serializer.get_versions(app)
+                serializer.get_content_ratings(app)
+                serializer.get_upsell(app)
+                serializer.get_payment_account(app)
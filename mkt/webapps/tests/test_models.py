@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 
 from django.conf import settings
 from django.core import mail
+from django.core.cache import cache
 from django.core.files.storage import default_storage as storage
 from django.db.models.signals import post_delete, post_save
 from django.test.utils import override_settings
@@ -38,19 +39,23 @@ from lib.crypto.tests import mock_sign
 from lib.iarc.utils import (DESC_MAPPING, INTERACTIVES_MAPPING,
                             REVERSE_DESC_MAPPING, REVERSE_INTERACTIVES_MAPPING)
 from market.models import AddonPremium, Price
+from stats.models import ClientData
 from users.models import UserProfile
 from versions.models import update_status, Version
 
 import mkt
 from mkt.constants import apps
+from mkt.constants.features import FeatureProfile
 from mkt.developers.models import (AddonPaymentAccount, PaymentAccount,
                                    SolitudeSeller)
 from mkt.site.fixtures import fixture
 from mkt.site.tests import DynamicBoolFieldsTestMixin
 from mkt.submit.tests.test_views import BasePackagedAppTest, BaseWebAppTest
+from mkt.webapps import exclusions
 from mkt.webapps.models import (AddonExcludedRegion, AppFeatures, AppManifest,
                                 ContentRating, Geodata, get_excluded_in,
-                                IARCInfo, Installed, RatingDescriptors,
+                                IARCInfo, InstallCount, Installed,
+                                RatingDescriptors,
                                 RatingInteractives, Webapp, WebappIndexer)
 
 
@@ -1065,6 +1070,48 @@ class TestExclusions(amo.tests.TestCase):
         ok_(mkt.regions.BR.id in excluded)
         ok_(mkt.regions.DE.id in excluded)
 
+    def test_removed(self):
+        ok_(exclusions.is_excluded(self.app.id, mkt.regions.US.id))
+        self.app.addonexcludedregion.get(region=mkt.regions.US.id).delete()
+        self.app.update(premium_type=amo.ADDON_FREE)
+        eq_(self.app.get_excluded_region_ids(), [])
+        ok_(not exclusions.is_excluded(self.app.id, mkt.regions.US.id))
+
+    def test_region_index_updated(self):
+        ok_(self.app.id in get_excluded_in(mkt.regions.US.id))
+        # Premium apps without a tier are only left out of the index.
+        ok_(self.app.id not in get_excluded_in(mkt.regions.PL.id))
+        self.app.addonexcludedregion.create(region=mkt.regions.PL.id)
+        ok_(self.app.id in get_excluded_in(mkt.regions.PL.id))
+        self.app.addonexcludedregion.get(region=mkt.regions.US.id).delete()
+        ok_(self.app.id not in get_excluded_in(mkt.regions.US.id))
+
+    def test_get_excluded_regions_bulk(self):
+        other = Webapp.objects.create()
+        exclusions.get_excluded_regions([self.app.id, other.id])
+        with self.assertNumQueries(0):
+            exclusions.get_excluded_regions([self.app.id, other.id])
+        exclusions.rebuild()
+        excluded = exclusions.get_excluded_regions([self.app.id, other.id])
+        ok_(mkt.regions.US.id in excluded[self.app.id])
+        eq_(list(excluded[other.id]), [])
+
+    def test_update_after_request(self):
+        with mock.patch('mkt.webapps.tasks.update_exclusions.delay') as delay:
+            self.app.addonexcludedregion.create(region=mkt.regions.PL.id)
+        delay.assert_called_with([self.app.id])
+
+    def test_update_deletes_stale(self):
+        ok_(self.app.id in get_excluded_in(mkt.regions.US.id))
+        ok_(self.app.id not in get_excluded_in(mkt.regions.PL.id))
+        AddonExcludedRegion.objects.filter(addon=self.app).update(
+            region=mkt.regions.PL.id)
+        exclusions.update_app(self.app.id)
+        ok_(self.app.id not in get_excluded_in(mkt.regions.US.id))
+        ok_(self.app.id in get_excluded_in(mkt.regions.PL.id))
+        eq_(self.app.get_excluded_region_ids(),
+            sorted(mkt.regions.ALL_REGION_IDS))
+
 
 class TestPackagedAppManifestUpdates(amo.tests.TestCase):
     # Note: More extensive tests for `Addon.update_names` are in the Addon
@@ -1325,6 +1372,21 @@ class TestPackagedManifest(BasePackagedAppTest):
         with self.assertNumQueries(0):
             webapp.get_cached_manifest()
 
+    @mock.patch('mkt.webapps.tasks.update_cached_manifests.delay')
+    def test_cached_manifest_stale(self, delay):
+        webapp = self.post_addon()
+        data = webapp.get_cached_manifest()
+        delay.reset_mock()
+        webapp.get_cached_manifest()
+        assert not delay.called
+        cache.delete('webapp:%s:manifest:fresh' % webapp.pk)
+        with self.assertNumQueries(0):
+            eq_(webapp.get_cached_manifest(), data)
+        delay.assert_called_once_with(webapp.pk)
+        # Only one rebuild is queued.
+        webapp.get_cached_manifest()
+        eq_(delay.call_count, 1)
+
     def test_cached_manifest_contents(self):
         webapp = self.post_addon(
             data={'packaged': True, 'free_platforms': 'free-firefoxos'})
@@ -1594,6 +1656,34 @@ class TestContentRating(amo.tests.WebappTestCase):
                 rating=mkt.ratingsbodies.ESRB_E.id).get_rating().label,
             '10')
 
+    def test_bulk_set(self):
+        other = amo.tests.app_factory()
+        ContentRating.objects.create(
+            addon=self.app, ratings_body=mkt.ratingsbodies.ESRB.id,
+            rating=mkt.ratingsbodies.ESRB_E.id)
+        ContentRating.bulk_set({
+            self.app.id: {mkt.ratingsbodies.ESRB: mkt.ratingsbodies.ESRB_T,
+                          mkt.ratingsbodies.USK: mkt.ratingsbodies.USK_12},
+            other.id: {mkt.ratingsbodies.ESRB: mkt.ratingsbodies.ESRB_T},
+        })
+        eq_(dict(self.app.content_ratings.values_list('ratings_body',
+                                                      'rating')),
+            {mkt.ratingsbodies.ESRB.id: mkt.ratingsbodies.ESRB_T.id,
+             mkt.ratingsbodies.USK.id: mkt.ratingsbodies.USK_12.id})
+        eq_(dict(other.content_ratings.values_list('ratings_body', 'rating')),
+            {mkt.ratingsbodies.ESRB.id: mkt.ratingsbodies.ESRB_T.id})
+
+    @mock.patch('mkt.webapps.models.Webapp.set_iarc_storefront_data')
+    @mock.patch('mkt.webapps.models.Webapp.is_fully_complete')
+    def test_bulk_set_incomplete(self, complete, storefront):
+        complete.return_value = True
+        self.app.update(status=amo.STATUS_NULL)
+        ContentRating.bulk_set(
+            {self.app.id: {mkt.ratingsbodies.ESRB: mkt.ratingsbodies.ESRB_T}})
+        eq_(self.app.reload().status, amo.STATUS_NULL)
+        self.app.content_ratings_changed()
+        eq_(self.app.reload().status, amo.STATUS_PENDING)
+
 
 class TestContentRatingsIn(amo.tests.WebappTestCase):
 
@@ -1786,6 +1876,50 @@ class TestInstalled(amo.tests.TestCase):
         assert self.m(install_type=apps.INSTALL_TYPE_REVIEWER)[1]
 
 
+class TestInstallCount(amo.tests.TestCase):
+
+    def setUp(self):
+        self.user = UserProfile.objects.create(email='f@f.com')
+        self.app = Addon.objects.create(type=amo.ADDON_WEBAPP)
+        self.br = ClientData.objects.create(region=mkt.regions.BR.id)
+
+    def install(self, **kw):
+        return Installed.objects.create(user=self.user, addon=self.app, **kw)
+
+    def test_counted(self):
+        self.install()
+        self.install(client_data=self.br)
+        self.install(client_data=self.br,
+                     install_type=apps.INSTALL_TYPE_REVIEWER)
+        eq_(InstallCount.get_counts(self.app.id),
+            {InstallCount.ALL_REGIONS: 3, mkt.regions.BR.id: 2})
+
+    def test_client_data_not_queried_again(self):
+        with mock.patch('mkt.webapps.models.ClientData.objects') as objects:
+            self.install(client_data=self.br)
+        ok_(not objects.filter.called)
+        self.install(client_data_id=self.br.id,
+                     install_type=apps.INSTALL_TYPE_REVIEWER)
+        eq_(InstallCount.get_counts(self.app.id),
+            {InstallCount.ALL_REGIONS: 2, mkt.regions.BR.id: 2})
+
+    def test_uncounted(self):
+        self.install()
+        self.install(client_data=self.br).delete()
+        eq_(InstallCount.get_counts(self.app.id),
+            {InstallCount.ALL_REGIONS: 1, mkt.regions.BR.id: 0})
+
+    def test_reconcile(self):
+        self.install(client_data=self.br)
+        other = Addon.objects.create(type=amo.ADDON_WEBAPP)
+        Installed.objects.create(user=self.user, addon=other)
+        InstallCount.objects.all().update(count=42)
+        InstallCount.reconcile([self.app.id, other.id])
+        eq_(InstallCount.get_counts(self.app.id),
+            {InstallCount.ALL_REGIONS: 1, mkt.regions.BR.id: 1})
+        eq_(InstallCount.get_counts(other.id), {InstallCount.ALL_REGIONS: 1})
+
+
 class TestAppFeatures(DynamicBoolFieldsTestMixin, amo.tests.TestCase):
 
     def setUp(self):
@@ -1813,6 +1947,13 @@ class TestAppFeatures(DynamicBoolFieldsTestMixin, amo.tests.TestCase):
         self.af.set_flags(signature)
         self._check(self.af)
 
+    def test_to_int(self):
+        self._flag()
+        features = self.app.current_version.features
+        profile = FeatureProfile.from_signature(features.to_signature())
+        eq_(features.to_int(), profile.to_int())
+        eq_(AppFeatures().to_int(), 0)
+
     def test_bad_data(self):
         self.af.set_flags('foo')
         self.af.set_flags('<script>')
@@ -1881,6 +2022,16 @@ class TestWebappIndexer(amo.tests.TestCase):
         eq_(doc['latest_version']['has_editor_comment'], False)
         eq_(doc['latest_version']['has_info_request'], False)
 
+    def test_extract_popularity(self):
+        user = UserProfile.objects.create(email='f@f.com')
+        br = ClientData.objects.create(region=mkt.regions.BR.id)
+        Installed.objects.create(addon=self.app, user=user)
+        Installed.objects.create(addon=self.app, user=user, client_data=br)
+        obj, doc = self._get_doc()
+        eq_(doc['popularity'], 2)
+        eq_(doc['popularity_%s' % mkt.regions.BR.id], 2 + 10)
+        eq_(doc['popularity_%s' % mkt.regions.US.id], 2)
+
     def test_extract_category(self):
         cat = Category.objects.create(name='c', type=amo.ADDON_WEBAPP)
         AddonCategory.objects.create(addon=self.app, category=cat)
@@ -1956,6 +2107,28 @@ class TestWebappIndexer(amo.tests.TestCase):
             {'body': mkt.ratingsbodies.PEGI.id,
              'rating': mkt.ratingsbodies.PEGI_12.id})
 
+    @mock.patch.object(amo, 'SEARCH_LANGUAGE_TO_ANALYZER',
+                       {'en-us': 'english', 'es': 'spanish'})
+    def test_extract_analyzers(self):
+        self.app.name = {'es': u'Nombre'}
+        self.app.save()
+        obj, doc = self._get_doc()
+        eq_(doc['name_english'], [unicode(obj.name)])
+        eq_(doc['name_spanish'], [u'Nombre'])
+        eq_(doc['description_english'], [unicode(obj.description)])
+        ok_('description_spanish' not in doc)
+
+    @mock.patch.object(amo, 'SEARCH_LANGUAGE_TO_ANALYZER',
+                       {'en-us': 'english', 'pl': 'polish'})
+    def test_language_analyzers(self):
+        with self.settings(ES_USE_PLUGINS=False):
+            analyzers = WebappIndexer.get_language_analyzers()
+            eq_(analyzers, {'en-us': 'english'})
+            ok_(WebappIndexer.get_language_analyzers() is analyzers)
+        with self.settings(ES_USE_PLUGINS=True):
+            eq_(WebappIndexer.get_language_analyzers(),
+                {'en-us': 'english', 'pl': 'polish'})
+
     def test_extract_release_notes(self):
         release_notes = {
             'fr': u'Dès notes de version.',
@@ -3,8 +3,8 @@ import datetime
 import hashlib
 import json
 import os
-import stat
 import tarfile
+from contextlib import closing
 from copy import deepcopy
 from tempfile import mkdtemp
 
@@ -13,6 +13,8 @@ from django.core.files.storage import default_storage as storage
 from django.core import mail
 from django.core.management import call_command
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 import mock
 from nose.tools import eq_, ok_
@@ -25,10 +27,12 @@ from amo.helpers import absolutify
 from devhub.models import ActivityLog
 from editors.models import RereviewQueue
 from files.models import File, FileUpload
+from translations.models import Translation
 from users.models import UserProfile
 from versions.models import Version
 
 from mkt.site.fixtures import fixture
+from mkt.webapps import export
 from mkt.webapps.models import Webapp
 from mkt.webapps.tasks import (dump_app, dump_user_installs,
                                export_data,
@@ -37,7 +41,7 @@ from mkt.webapps.tasks import (dump_app, dump_user_installs,
                                PreGenAPKError,
                                rm_directory,
                                update_manifests,
-                               zip_apps)
+                               warm_cached_manifests)
 
 
 original = {
@@ -516,39 +520,6 @@ class TestDumpApps(amo.tests.TestCase):
         result = json.load(open(fn, 'r'))
         eq_(result['id'], 337141)
 
-    def test_zip_apps(self):
-        dump_app(337141)
-        fn = zip_apps()
-        for f in ['license.txt', 'readme.txt']:
-            ok_(os.path.exists(os.path.join(settings.DUMPED_APPS_PATH, f)))
-        ok_(os.stat(fn)[stat.ST_SIZE])
-
-    @mock.patch('mkt.webapps.tasks.dump_app')
-    def test_not_public(self, dump_app):
-        app = Addon.objects.get(pk=337141)
-        app.update(status=amo.STATUS_PENDING)
-        call_command('process_addons', task='dump_apps')
-        assert not dump_app.called
-
-    def test_removed(self):
-        # At least one public app must exist for dump_apps to run.
-        amo.tests.app_factory(name='second app', status=amo.STATUS_PUBLIC)
-        app_path = os.path.join(settings.DUMPED_APPS_PATH, 'apps', '337',
-                                '337141.json')
-        app = Addon.objects.get(pk=337141)
-        app.update(status=amo.STATUS_PUBLIC)
-        call_command('process_addons', task='dump_apps')
-        assert os.path.exists(app_path)
-
-        app.update(status=amo.STATUS_PENDING)
-        call_command('process_addons', task='dump_apps')
-        assert not os.path.exists(app_path)
-
-    @mock.patch('mkt.webapps.tasks.dump_app')
-    def test_public(self, dump_app):
-        call_command('process_addons', task='dump_apps')
-        assert dump_app.called
-
 
 class TestDumpUserInstalls(amo.tests.TestCase):
     fixtures = fixture('user_2519', 'webapp_337141')
@@ -560,12 +531,16 @@ class TestDumpUserInstalls(amo.tests.TestCase):
         self.app.installed.create(user=self.user)
         self.hash = hashlib.sha256('%s%s' % (str(self.user.pk),
                                              settings.SECRET_KEY)).hexdigest()
-        self.path = os.path.join(settings.DUMPED_USERS_PATH, 'users',
-                                 self.hash[0], '%s.json' % self.hash)
+        self.arcname = os.path.join('users', self.hash[0],
+                                    '%s.json' % self.hash)
+
+    def tearDown(self):
+        rm_directory(os.path.join(settings.DUMPED_USERS_PATH, 'tarballs'))
+        super(TestDumpUserInstalls, self).tearDown()
 
     def dump_and_load(self):
-        dump_user_installs([self.user.pk])
-        return json.load(open(self.path, 'r'))
+        with closing(tarfile.open(dump_user_installs(), 'r:gz')) as tar:
+            return json.load(tar.extractfile(self.arcname))
 
     def test_dump_user_installs(self):
         data = self.dump_and_load()
@@ -591,6 +566,34 @@ class TestDumpUserInstalls(amo.tests.TestCase):
         installed = data['installed_apps'][0]
         eq_(installed['id'], self.app.id)
 
+    def export_and_count(self):
+        # On MySQL the installs are read by a raw server-side cursor that
+        # the query log doesn't see, so only compare the logged queries.
+        with CaptureQueriesContext(connection) as queries:
+            with mock.patch.object(export, '_stream_rows',
+                                   wraps=export._stream_rows) as stream:
+                filename = export.export_user_installs('test')
+        eq_(stream.call_count, 1)
+        with closing(tarfile.open(filename, 'r:gz')) as tar:
+            names = tar.getnames()
+        return names, len(queries)
+
+    def test_dump_single_query(self):
+        other = UserProfile.objects.create(username='other')
+        self.app.installed.create(user=other)
+        names, count = self.export_and_count()
+        ok_(self.arcname in names)
+        ok_('users/license.txt' in names)
+        eq_(len([n for n in names if n.endswith('.json')]), 2)
+
+        # No query per user or install.
+        another = UserProfile.objects.create(username='another')
+        self.app.installed.create(user=another)
+        amo.tests.app_factory().installed.create(user=another)
+        names, more = self.export_and_count()
+        eq_(len([n for n in names if n.endswith('.json')]), 3)
+        eq_(more, count)
+
 
 class TestFixMissingIcons(amo.tests.TestCase):
     fixtures = fixture('webapp_337141')
@@ -684,6 +687,31 @@ class TestPreGenAPKs(amo.tests.WebappTestCase):
             pre_generate_apk.delay(self.app.id)
 
 
+class TestWarmCachedManifests(amo.tests.TestCase):
+
+    def setUp(self):
+        self.app = amo.tests.app_factory(is_packaged=True)
+        amo.tests.app_factory(is_packaged=True, disabled_by_user=True)
+        amo.tests.app_factory(is_packaged=False)
+
+    @mock.patch.object(Webapp, 'get_cached_manifest')
+    def test_warm(self, get_cached_manifest):
+        progress = mock.Mock()
+        eq_(warm_cached_manifests(concurrency=1, progress=progress), 0)
+        get_cached_manifest.assert_called_once_with(force=True)
+        progress.assert_called_with(1, 0, 1)
+
+    @mock.patch.object(Webapp, 'get_cached_manifest')
+    def test_failed(self, get_cached_manifest):
+        get_cached_manifest.side_effect = IOError
+        other = amo.tests.app_factory(is_packaged=True)
+        progress = mock.Mock()
+        eq_(warm_cached_manifests([self.app.pk, other.pk], concurrency=1,
+                                  chunk_size=1, progress=progress), 2)
+        eq_(progress.call_args_list,
+            [mock.call(1, 1, 2), mock.call(2, 2, 2)])
+
+
 class TestExportData(amo.tests.TestCase):
     fixtures = fixture('webapp_337141', 'collection_81721')
 
@@ -695,9 +723,9 @@ class TestExportData(amo.tests.TestCase):
     def tearDown(self):
         rm_directory(self.export_directory)
 
-    def create_export(self, name):
+    def create_export(self, name, incremental=False):
         with self.settings(DUMPED_APPS_PATH=self.export_directory):
-            export_data(name=name)
+            export_data(name=name, incremental=incremental)
         tarball_path = os.path.join(self.export_directory,
                                     'tarballs',
                                     name + '.tgz')
@@ -720,3 +748,64 @@ class TestExportData(amo.tests.TestCase):
         collection_file = tarball.extractfile(self.collection_path)
         collection_data = json.loads(collection_file.read())
         eq_(collection_data['apps'][0]['filepath'], self.app_path)
+
+    def test_no_temporary_files(self):
+        self.create_export('tarball-name')
+        eq_(sorted(os.listdir(self.export_directory)), ['tarballs'])
+        eq_(sorted(os.listdir(os.path.join(self.export_directory,
+                                           'tarballs'))),
+            ['latest.json', 'tarball-name.tgz'])
+
+    @mock.patch('mkt.webapps.export.serialize_apps')
+    def test_incremental_unchanged(self, serialize_apps):
+        serialize_apps.side_effect = export.serialize_apps
+        self.create_export('first')
+        eq_(serialize_apps.call_count, 1)
+        tarball = self.create_export('second', incremental=True)
+        eq_(serialize_apps.call_count, 1)
+        app_data = json.loads(tarball.extractfile(self.app_path).read())
+        eq_(app_data['id'], 337141)
+
+    @mock.patch('mkt.webapps.export.serialize_apps')
+    def test_incremental_modified(self, serialize_apps):
+        serialize_apps.side_effect = export.serialize_apps
+        self.create_export('first')
+        Webapp.objects.get(pk=337141).update(
+            modified=datetime.datetime.now() + datetime.timedelta(days=1))
+        tarball = self.create_export('second', incremental=True)
+        serialize_apps.assert_called_with([337141])
+        ok_(self.app_path in tarball.getnames())
+
+    @mock.patch('mkt.webapps.export.serialize_apps')
+    def test_incremental_related_modified(self, serialize_apps):
+        serialize_apps.side_effect = export.serialize_apps
+        self.create_export('first')
+        tomorrow = datetime.datetime.now() + datetime.timedelta(days=1)
+        Webapp.objects.get(pk=337141).current_version.update(
+            modified=tomorrow)
+        self.create_export('second', incremental=True)
+        serialize_apps.assert_called_with([337141])
+
+    @mock.patch('mkt.webapps.export.serialize_apps')
+    def test_incremental_translation_modified(self, serialize_apps):
+        serialize_apps.side_effect = export.serialize_apps
+        self.create_export('first')
+        tomorrow = datetime.datetime.now() + datetime.timedelta(days=1)
+        Translation.objects.filter(
+            id=Webapp.objects.get(pk=337141).name_id).update(modified=tomorrow)
+        self.create_export('second', incremental=True)
+        serialize_apps.assert_called_with([337141])
+
+    @mock.patch('mkt.webapps.export.serialize_apps')
+    def test_threads_keep_order(self, serialize_apps):
+        serialize_apps.side_effect = lambda pks: [(pk, None) for pk in pks]
+        entries = export.iter_serialized_apps(range(10), chunk_size=2,
+                                              threads=3)
+        eq_([pk for pk, data in entries], range(10))
+        eq_(serialize_apps.call_count, 5)
+
+    def test_incremental_removed(self):
+        self.create_export('first')
+        Webapp.objects.get(pk=337141).update(status=amo.STATUS_PENDING)
+        tarball = self.create_export('second', incremental=True)
+        ok_(self.app_path not in tarball.getnames())
@@ -20,6 +20,7 @@ HOME=/tmp
 
 # Every 4 hours.
 40 */4 * * * %(django)s clean_redis
+50 */4 * * * %(z_cron)s rebuild_region_exclusions --settings=settings_local_mkt
 
 # Twice per day.
 # Use system python to use an older version of sqlalchemy than what is in our venv
@@ -33,6 +34,7 @@ HOME=/tmp
 15 8 * * * %(z_cron)s process_iarc_changes --settings=settings_local_mkt
 30 8 * * * %(z_cron)s dump_user_installs_cron --settings=settings_local_mkt
 00 9 * * * %(z_cron)s update_app_downloads --settings=settings_local_mkt
+15 9 * * * %(z_cron)s reconcile_app_install_counts --settings=settings_local_mkt
 30 9 * * * %(z_cron)s update_user_ratings
 # 50 9 * * * %(z_cron)s gc
 45 9 * * * %(z_cron)s mkt_gc --settings=settings_local_mkt
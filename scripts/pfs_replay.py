@@ -0,0 +1,87 @@
+"""
+Replay plugin finder requests against services/pfs.py and report how fast
+they are answered, with and without the response cache.
+
+Requests are read from files of query strings or of access log lines, only
+the query string of the /pfs.py URLs is used:
+
+    python scripts/pfs_replay.py access.log [-n 3]
+
+Without files, a sample of the common mimetypes and platforms is replayed.
+"""
+import itertools
+import optparse
+import os
+import re
+import sys
+import time
+from urlparse import parse_qsl
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'services')]
+
+import pfs  # NOQA
+
+query_re = re.compile(r'pfs(?:\.py)?/?\?([^\s"]+)')
+
+MIMETYPES = ['application/x-shockwave-flash', 'application/x-director',
+             'application/pdf', 'video/quicktime', 'application/x-java-vm',
+             'video/x-ms-wmv', 'video/vnd.divx', 'application/x-unknown']
+PLATFORMS = ['Windows NT 6.1', 'Intel Mac OS X 10.9', 'Linux x86_64',
+             'Linux i686']
+
+
+def read_requests(filenames):
+    for filename in filenames:
+        with open(filename) as f:
+            for line in f:
+                line = line.strip()
+                match = query_re.search(line)
+                if match:
+                    line = match.group(1)
+                elif '?' in line or ' ' in line:
+                    continue
+                yield dict(parse_qsl(line))
+
+
+def sample_requests(repeat=50):
+    for _, mimetype, platform in itertools.product(range(repeat), MIMETYPES,
+                                                   PLATFORMS):
+        yield {'mimetype': mimetype, 'clientOS': platform,
+               'appID': '{ec8030f7-c20a-464f-9b0e-13a3a9e97384}',
+               'appVersion': '30.0', 'chromeLocale': 'en-US'}
+
+
+def replay(requests, cached):
+    pfs.cache.clear()
+    start = time.time()
+    for data in requests:
+        if not cached:
+            pfs.cache.clear()
+        pfs.get_output(data)
+    return time.time() - start
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options] [file ...]')
+    parser.add_option('-n', dest='runs', type='int', default=3,
+                      help='replays of the requests (default: %default)')
+    options, filenames = parser.parse_args()
+
+    requests = list(read_requests(filenames) if filenames
+                    else sample_requests())
+    if not requests:
+        parser.error('No requests found.')
+    keys = set((r.get('mimetype'), r.get('appID'), r.get('clientOS'),
+                r.get('chromeLocale')) for r in requests)
+    print '%d requests, %d distinct responses.' % (len(requests), len(keys))
+
+    for cached in (False, True):
+        best = min(replay(requests, cached) for i in range(options.runs))
+        print '%-9s %8.1fms %10.0f requests/s' % (
+            'cached' if cached else 'uncached', best * 1000,
+            len(requests) / best if best else float('inf'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Measure the startup time of the WSGI services.
+
+Every service is imported a few times, each time in a fresh interpreter, and
+the best time is reported with the number of modules the import loaded:
+
+    python scripts/services_startup.py [-n 5] [-v] [update pfs verify]
+
+apps/amo/tests/test_services.py checks the services against BUDGET.
+"""
+import json
+import optparse
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES = ['update', 'pfs', 'verify']
+
+# The most an import of a service can take, in seconds.
+BUDGET = 1.0
+
+# Modules that no service should load before its first request.
+DEFERRED = {
+    'update': ['cef', 'jinja2', 'MySQLdb', 'smtplib', 'sqlalchemy', 'tower'],
+    'pfs': ['cef', 'jinja2', 'MySQLdb', 'sqlalchemy', 'tower'],
+    'verify': ['MySQLdb', 'sqlalchemy'],
+}
+
+CODE = """
+import json, sys, time
+before = set(sys.modules)
+start = time.time()
+__import__('services.%s')
+print json.dumps({'time': time.time() - start,
+                  'modules': sorted(set(sys.modules) - before)})
+"""
+
+
+def measure(service, path=None):
+    """
+    Import `service` in a new interpreter and return a (seconds, modules)
+    tuple, `modules` being the names of the modules the import loaded.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(path or [ROOT] + sys.path)
+    out = subprocess.check_output([sys.executable, '-c', CODE % service],
+                                  cwd=ROOT, env=env)
+    data = json.loads(out.strip().splitlines()[-1])
+    return data['time'], data['modules']
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options] [service ...]')
+    parser.add_option('-n', dest='runs', type='int', default=5,
+                      help='imports per service (default: %default)')
+    parser.add_option('-v', dest='verbose', action='store_true',
+                      help='list the modules loaded by every service')
+    options, services = parser.parse_args()
+
+    for service in services or SERVICES:
+        runs = [measure(service) for i in range(options.runs)]
+        best, modules = min(runs)
+        loaded = sorted(set(m.split('.')[0] for m in modules)
+                        .intersection(DEFERRED.get(service, [])))
+        print '%-8s %6.1fms %5d modules%s%s' % (
+            service, best * 1000, len(modules),
+            ' OVER BUDGET' if best > BUDGET else '',
+            ' (loads %s)' % ', '.join(loaded) if loaded else '')
+        if options.verbose:
+            for module in modules:
+                print '    %s' % module
+
+
+if __name__ == '__main__':
+    main()
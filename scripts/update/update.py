@@ -174,6 +174,7 @@ def deploy(ctx):
     with ctx.lcd(settings.SRC_DIR):
         ctx.local('%s manage.py cron cleanup_validation_results' %
                   settings.PYTHON)
+        ctx.local('%s manage.py warm_manifests' % settings.PYTHON)
 
 
 @task
@@ -0,0 +1,75 @@
+"""
+The constants used by the services, precomputed.
+
+Importing the `constants` package pulls in tower and Django's translation
+machinery, which is a large part of the startup time of the services. The
+tables below are copies of the values they need, kept in sync with
+`constants` by TestFrozenConstants in apps/amo/tests/test_services.py.
+"""
+import re
+
+
+# constants.base
+STATUS_NULL = 0
+STATUS_PUBLIC = 4
+STATUS_DISABLED = 5
+STATUS_BETA = 7
+STATUS_LITE = 8
+STATUS_LITE_AND_NOMINATED = 9
+STATUS_DELETED = 11
+
+ADDON_PREMIUM = 1
+
+VERSION_BETA = re.compile('(a|alpha|b|beta|pre|rc)\d*$')
+
+# These are used in the update API.
+ADDON_SLUGS_UPDATE = {
+    1: 'extension',
+    2: 'theme',
+    3: 'extension',
+    4: 'search',
+    5: 'item',
+    6: 'extension',
+    7: 'plugin',
+    9: 'background-theme',
+    11: 'app',
+}
+
+# constants.payments
+CONTRIB_PURCHASE = 1
+CONTRIB_REFUND = 2
+CONTRIB_CHARGEBACK = 3
+CONTRIB_NO_CHARGE = 7
+
+# {guid: id} of constants.applications.APPS_ALL.
+APP_GUIDS = {
+    '{ec8030f7-c20a-464f-9b0e-13a3a9e97384}': 1,
+    '{86c18b42-e466-45a9-ae7a-9b95ba6f5640}': 2,
+    '{3550f703-e582-4d05-9a08-453d09bdfdc6}': 18,
+    '{718e30fb-e89b-41dd-9da7-e25a45638b28}': 52,
+    '{92650c4d-4b8e-4d2a-b7eb-24ecf4f6b63a}': 59,
+    '{a23983c0-fd0e-11dc-95ff-0800200c9a66}': 60,
+    '{aa3c5121-dab2-40e2-81ca-7ea25febc110}': 61,
+}
+
+# The lowest maxVersion an app has to support to allow default-to-compatible.
+D2C_MAX_VERSIONS = {
+    1: '4.0',
+    18: '5.0',
+    59: '2.1',
+    60: '11.0',
+}
+
+# {api name: id} of constants.platforms.PLATFORMS. ALL is shared by
+# PLATFORM_ANY and PLATFORM_ALL, PLATFORM_ALL wins.
+PLATFORMS = {
+    u'ALL': 1,
+    u'ALL_mobile': 9,
+    u'Android': 7,
+    u'BSD_OS': 4,
+    u'Darwin': 3,
+    u'Linux': 2,
+    u'Maemo': 8,
+    u'SunOS': 6,
+    u'WINNT': 5,
+}
@@ -8,9 +8,10 @@ from urlparse import parse_qsl
 
 
 import commonware.log
-import jinja2
+# jinja2.escape is markupsafe's, without the rest of jinja2.
+from markupsafe import escape
 
-from utils import log_configure
+from utils import log_configure, LRUCache
 
 import settings_local as settings
 
@@ -61,267 +62,240 @@ quicktime_re = re.compile(r'^(application/(sdp|x-(mpeg|rtsp|sdp))|audio/(3gpp(2)
 java_re = re.compile(r'^application/x-java-((applet|bean)(;jpi-version=1\.5|;version=(1\.(1(\.[1-3])?|(2|4)(\.[1-2])?|3(\.1)?|5)))?|vm)$')
 wmp_re = re.compile(r'^(application/(asx|x-(mplayer2|ms-wmp))|video/x-ms-(asf(-plugin)?|wm(p|v|x)?|wvx)|audio/x-ms-w(ax|ma))$')
 
+win_re = re.compile(r'^Win')
+mac_re = re.compile(r'^(PPC|Intel) Mac OS X')
+win_ppc_re = re.compile(r'^(Win|PPC Mac OS X)')
+win_linux_ppc_re = re.compile(r'^(Win|Linux|PPC Mac OS X)')
+
+template = Template(xml_template)
+
+required = ['mimetype', 'appID', 'appVersion', 'clientOS', 'chromeLocale']
+
+# Some defaults we override depending on what we find below.
+default_plugin = dict(mimetype='-1', name='-1', guid='-1', version='',
+                      iconUrl='', XPILocation='', InstallerLocation='',
+                      InstallerHash='', InstallerShowsUI='',
+                      manualInstallationURL='', licenseURL='',
+                      needsRestart='true')
+
+
+flash = dict(
+    name='Adobe Flash Player',
+    manualInstallationURL='http://www.adobe.com/go/getflashplayer')
+
+shockwave = dict(
+    name='Adobe Shockwave Player',
+    guid='{45f2a22c-4029-4209-8b3d-1421b989633f}',
+    XPILocation='',
+    version='12.1.0.150',
+    InstallerHash='sha256:b86c539ca783b27d6adf6f3cc65e562c54c7ec19f3f675faced9e4ab494a5585',
+    InstallerLocation='http://fpdownload.macromedia.com/pub/shockwave/default/english/win95nt/latest/Shockwave_Installer_FF.exe',
+    manualInstallationURL='http://get.adobe.com/shockwave/otherversions',
+    needsRestart='false',
+    InstallerShowsUI='false')
+
+
+def shockwave_license(g):
+    # Even though the shockwave installer is not a silent installer, we
+    # need to show its EULA here since we've got a slimmed down
+    # installer that doesn't do that itself.
+    if g['chromeLocale'] != 'ja-JP':
+        return dict(licenseURL='http://www.adobe.com/go/eula_shockwaveplayer')
+    return dict(licenseURL='http://www.adobe.com/go/eula_shockwaveplayer_jp')
+
+
+real = dict(
+    name='Real Player',
+    version='10.5',
+    manualInstallationURL='http://www.real.com')
+
+divx = dict(
+    name='DivX Web Player',
+    guid='{a8b771f0-2e07-11db-a98b-0800200c9a66}',
+    iconUrl='http://images.divx.com/divx/player/webplayer.png',
+    InstallerShowsUI='false',
+    licenseURL='http://go.divx.com/plugin/license/',
+    manualInstallationURL='http://go.divx.com/plugin/download/')
+
+
+# The plugins we know where to get, as (mimetypes, clientOS regex, fields)
+# rules. `mimetypes` is either a list of mimetypes or a regex, `fields` a
+# list of dicts, or of functions of the request returning dicts, to update
+# the plugin with. The first rule matching the mimetype and the clientOS
+# wins.
+RULES = [
+    # Offer Windows users a specific flash plugin installer instead.
+    # Don't use a https URL for the license here, per request from
+    # Macromedia.
+    (['application/x-shockwave-flash', 'application/futuresplash'], win_re,
+     [flash, dict(
+        guid='{4cfaef8a-a6c9-41a0-8e6f-967eb8f49143}',
+        XPILocation='',
+        iconUrl='http://fpdownload2.macromedia.com/pub/flashplayer/current/fp_win_installer.ico',
+        needsRestart='false',
+        InstallerShowsUI='true',
+        version='13.0.0.182',
+        InstallerHash='sha256:f9a421fcf764f198d3bb428952e3472ae8f69f09fee089b689e44ba77a9f8ef8',
+        InstallerLocation='http://download.macromedia.com/pub/flashplayer/pdc/fp_pl_pfs_installer.exe')]),
+    # Tell the other users where they can go to get the installer.
+    (['application/x-shockwave-flash', 'application/futuresplash'], flash_re,
+     [flash]),
+
+    (['application/x-director'], win_re, [shockwave, shockwave_license]),
+
+    (['audio/x-pn-realaudio-plugin', 'audio/x-pn-realaudio'], win_re,
+     [real, dict(
+        XPILocation='http://forms.real.com/real/player/download.html?type=firefox',
+        guid='{d586351c-cb55-41a7-8e7b-4aaac5172d39}')]),
+    (['audio/x-pn-realaudio-plugin', 'audio/x-pn-realaudio'],
+     win_linux_ppc_re,
+     [real, dict(guid='{269eb771-59de-4702-9209-ca97ce522f6d}')]),
+
+    # Well, we don't have a plugin that can handle any of those mimetypes,
+    # but the Apple Quicktime plugin can. Point the user to the Quicktime
+    # download page.
+    (quicktime_re, win_ppc_re, [dict(
+        name='Apple Quicktime',
+        guid='{a42bb825-7eee-420f-8ee7-834062b6fefd}',
+        InstallerShowsUI='true',
+        manualInstallationURL='http://www.apple.com/quicktime/download/')]),
+
+    # We serve up the Java plugin for application/x-java-vm and the
+    # application/x-java-applet and application/x-java-bean mimetypes, with
+    # or without a version (1.1 to 1.5) or a jpi-version (1.5).
+    #
+    # We don't want to link users directly to the Java plugin because
+    # we want to warn them about ongoing security problems first. Link
+    # to SUMO.
+    (java_re, win_linux_ppc_re, [dict(
+        name='Java Runtime Environment',
+        manualInstallationURL='https://support.mozilla.org/kb/use-java-plugin-to-view-interactive-content',
+        needsRestart='false',
+        guid='{fbe640ef-4375-4f45-8d79-767d60bf75b8}')]),
+
+    (['application/pdf', 'application/vnd.fdf', 'application/vnd.adobe.xfdf',
+      'application/vnd.adobe.xdp+xml', 'application/vnd.adobe.xfd+xml'],
+     re.compile(r'^(Win|PPC Mac OS X|Linux(?! x86_64))'), [dict(
+        name='Adobe Acrobat Plug-In',
+        guid='{d87cd824-67cb-4547-8587-616c70318095}',
+        manualInstallationURL='http://www.adobe.com/products/acrobat/readstep.html')]),
+
+    (['application/x-mtx'], win_ppc_re, [dict(
+        name='Viewpoint Media Player',
+        guid='{03f998b2-0e00-11d3-a498-00104b6eb52e}',
+        manualInstallationURL='http://www.viewpoint.com/pub/products/vmp.html')]),
+
+    # For all windows users who don't have the WMP 11 plugin, give them
+    # a link for it.
+    (wmp_re, win_re, [dict(
+        name='Windows Media Player',
+        version='11',
+        guid='{cff1240a-fd24-4b9f-8183-ccd96e5300d0}',
+        manualInstallationURL='http://port25.technet.com/pages/windows-media-player-firefox-plugin-download.aspx')]),
+    # For OSX users -- added Intel to this since flip4mac is a UB.
+    # Contact at MS was okay w/ this, plus MS points to this anyway.
+    (wmp_re, mac_re, [dict(
+        name='Flip4Mac',
+        version='2.1',
+        guid='{cff0240a-fd24-4b9f-8183-ccd96e5300d0}',
+        manualInstallationURL='http://www.flip4mac.com/wmv_download.htm')]),
+
+    (['application/x-xstandard'], win_ppc_re, [dict(
+        name='XStandard XHTML WYSIWYG Editor',
+        guid='{3563d917-2f44-4e05-8769-47e655e92361}',
+        iconUrl='http://xstandard.com/images/xicon32x32.gif',
+        XPILocation='http://xstandard.com/download/xstandard.xpi',
+        InstallerShowsUI='false',
+        manualInstallationURL='http://xstandard.com/download/',
+        licenseURL='http://xstandard.com/license/')]),
+
+    (['application/x-dnl'], win_re, [dict(
+        name='DNL Reader',
+        guid='{ce9317a3-e2f8-49b9-9b3b-a7fb5ec55161}',
+        version='5.5',
+        iconUrl='http://digitalwebbooks.com/reader/dwb16.gif',
+        XPILocation='http://digitalwebbooks.com/reader/xpinst.xpi',
+        InstallerShowsUI='false',
+        manualInstallationURL='http://digitalwebbooks.com/reader/')]),
+
+    (['application/x-videoegg-loader'], win_re, [dict(
+        name='VideoEgg Publisher',
+        guid='{b8b881f0-2e07-11db-a98b-0800200c9a66}',
+        iconUrl='http://videoegg.com/favicon.ico',
+        XPILocation='http://update.videoegg.com/Install/Windows/Initial/VideoEggPublisher.xpi',
+        InstallerShowsUI='true',
+        manualInstallationURL='http://www.videoegg.com/')]),
+
+    (['video/vnd.divx'], win_re, [divx, dict(
+        XPILocation='http://download.divx.com/player/DivXWebPlayer.xpi')]),
+    (['video/vnd.divx'], mac_re, [divx, dict(
+        XPILocation='http://download.divx.com/player/DivXWebPlayerMac.xpi')]),
+]
+
+
+def compile_rules(rules):
+    """
+    Return a ({mimetype: [(clientOS regex, fields)]}, [(mimetype regex,
+    [(clientOS regex, fields)])]) tuple: the rules for a given mimetype, in
+    order, and the rules matching mimetypes by regex, used when a mimetype
+    isn't in the dict.
+    """
+    exact, patterns = defaultdict(list), []
+    for mimetypes, os_re, fields in rules:
+        if isinstance(mimetypes, list):
+            for mimetype in mimetypes:
+                exact[mimetype].append((os_re, fields))
+        elif patterns and patterns[-1][0] is mimetypes:
+            patterns[-1][1].append((os_re, fields))
+        else:
+            patterns.append((mimetypes, [(os_re, fields)]))
+    # The exact mimetypes have to be tried before the regexes, which only
+    # works if a mimetype can't match both.
+    for mimetype in exact:
+        assert not any(p.match(mimetype) for p, _ in patterns), mimetype
+    return dict(exact), patterns
 
-def get_output(data):
-    g = defaultdict(str, [(k, jinja2.escape(v)) for k, v in data.iteritems()])
 
-    required = ['mimetype', 'appID', 'appVersion', 'clientOS', 'chromeLocale']
+exact_rules, pattern_rules = compile_rules(RULES)
+
+cache = LRUCache(settings.PFS_CACHE_SIZE)
+
+
+def find_rules(mimetype):
+    rules = exact_rules.get(mimetype)
+    if rules is None:
+        for pattern, rules in pattern_rules:
+            if pattern.match(mimetype):
+                break
+        else:
+            rules = []
+    return rules
 
-    # Some defaults we override depending on what we find below.
-    plugin = dict(mimetype='-1', name='-1', guid='-1', version='',
-                  iconUrl='', XPILocation='', InstallerLocation='',
-                  InstallerHash='', InstallerShowsUI='',
-                  manualInstallationURL='', licenseURL='',
-                  needsRestart='true')
 
+def get_output(data):
+    g = defaultdict(str, [(k, escape(v)) for k, v in data.iteritems()])
+
+    plugin = dict(default_plugin)
     # Special case for mimetype if they are provided.
     plugin['mimetype'] = g['mimetype'] or '-1'
 
-    output = Template(xml_template)
-
     for s in required:
         if s not in data:
             # A sort of 404, matching what was returned in the original PHP.
-            return output.substitute(plugin)
-
-    # Figure out what plugins we've got, and what plugins we know where
-    # to get.
-
-    # Begin our huge and embarrassing if-else statement.
-    if (g['mimetype'] in ['application/x-shockwave-flash',
-                          'application/futuresplash'] and
-        re.match(flash_re, g['clientOS'])):
-
-        # Tell the user where they can go to get the installer.
-
-        plugin.update(
-            name='Adobe Flash Player',
-            manualInstallationURL='http://www.adobe.com/go/getflashplayer')
-
-        # Offer Windows users a specific flash plugin installer instead.
-        # Don't use a https URL for the license here, per request from
-        # Macromedia.
-
-        if g['clientOS'].startswith('Win'):
-            plugin.update(
-                guid='{4cfaef8a-a6c9-41a0-8e6f-967eb8f49143}',
-                XPILocation='',
-                iconUrl='http://fpdownload2.macromedia.com/pub/flashplayer/current/fp_win_installer.ico',
-                needsRestart='false',
-                InstallerShowsUI='true',
-                version='13.0.0.182',
-                InstallerHash='sha256:f9a421fcf764f198d3bb428952e3472ae8f69f09fee089b689e44ba77a9f8ef8',
-                InstallerLocation='http://download.macromedia.com/pub/flashplayer/pdc/fp_pl_pfs_installer.exe')
-
-    elif (g['mimetype'] == 'application/x-director' and
-          g['clientOS'].startswith('Win')):
-        plugin.update(
-            name='Adobe Shockwave Player',
-            manualInstallationURL='http://get.adobe.com/shockwave/otherversions')
-
-        # Even though the shockwave installer is not a silent installer, we
-        # need to show its EULA here since we've got a slimmed down
-        # installer that doesn't do that itself.
-        if g['chromeLocale'] != 'ja-JP':
-            plugin.update(
-                licenseURL='http://www.adobe.com/go/eula_shockwaveplayer')
-        else:
-            plugin.update(
-                licenseURL='http://www.adobe.com/go/eula_shockwaveplayer_jp')
-        plugin.update(
-            guid='{45f2a22c-4029-4209-8b3d-1421b989633f}',
-            XPILocation='',
-            version='12.1.0.150',
-            InstallerHash='sha256:b86c539ca783b27d6adf6f3cc65e562c54c7ec19f3f675faced9e4ab494a5585',
-            InstallerLocation='http://fpdownload.macromedia.com/pub/shockwave/default/english/win95nt/latest/Shockwave_Installer_FF.exe',
-            manualInstallationURL='http://get.adobe.com/shockwave/otherversions',
-            needsRestart='false',
-            InstallerShowsUI='false')
-
-    elif (g['mimetype'] in ['audio/x-pn-realaudio-plugin',
-                            'audio/x-pn-realaudio'] and
-          re.match(r'^(Win|Linux|PPC Mac OS X)', g['clientOS'])):
-        plugin.update(
-            name='Real Player',
-            version='10.5',
-            manualInstallationURL='http://www.real.com')
-
-        if g['clientOS'].startswith('Win'):
-            plugin.update(
-                XPILocation='http://forms.real.com/real/player/download.html?type=firefox',
-                guid='{d586351c-cb55-41a7-8e7b-4aaac5172d39}')
-        else:
-            plugin.update(
-                guid='{269eb771-59de-4702-9209-ca97ce522f6d}')
-
-    elif (re.match(quicktime_re, g['mimetype']) and
-          re.match(r'^(Win|PPC Mac OS X)', g['clientOS'])):
-
-        # Well, we don't have a plugin that can handle any of those
-        # mimetypes, but the Apple Quicktime plugin can. Point the user to
-        # the Quicktime download page.
-
-        plugin.update(
-            name='Apple Quicktime',
-            guid='{a42bb825-7eee-420f-8ee7-834062b6fefd}',
-            InstallerShowsUI='true',
-            manualInstallationURL='http://www.apple.com/quicktime/download/')
-
-    elif (re.match(java_re, g['mimetype']) and
-          re.match(r'^(Win|Linux|PPC Mac OS X)', g['clientOS'])):
-
-        # We serve up the Java plugin for the following mimetypes:
-        #
-        # application/x-java-vm
-        # application/x-java-applet;jpi-version=1.5
-        # application/x-java-bean;jpi-version=1.5
-        # application/x-java-applet;version=1.3
-        # application/x-java-bean;version=1.3
-        # application/x-java-applet;version=1.2.2
-        # application/x-java-bean;version=1.2.2
-        # application/x-java-applet;version=1.2.1
-        # application/x-java-bean;version=1.2.1
-        # application/x-java-applet;version=1.4.2
-        # application/x-java-bean;version=1.4.2
-        # application/x-java-applet;version=1.5
-        # application/x-java-bean;version=1.5
-        # application/x-java-applet;version=1.3.1
-        # application/x-java-bean;version=1.3.1
-        # application/x-java-applet;version=1.4
-        # application/x-java-bean;version=1.4
-        # application/x-java-applet;version=1.4.1
-        # application/x-java-bean;version=1.4.1
-        # application/x-java-applet;version=1.2
-        # application/x-java-bean;version=1.2
-        # application/x-java-applet;version=1.1.3
-        # application/x-java-bean;version=1.1.3
-        # application/x-java-applet;version=1.1.2
-        # application/x-java-bean;version=1.1.2
-        # application/x-java-applet;version=1.1.1
-        # application/x-java-bean;version=1.1.1
-        # application/x-java-applet;version=1.1
-        # application/x-java-bean;version=1.1
-        # application/x-java-applet
-        # application/x-java-bean
-        #
-        #
-        # We don't want to link users directly to the Java plugin because
-        # we want to warn them about ongoing security problems first. Link
-        # to SUMO.
-
-        plugin.update(
-            name='Java Runtime Environment',
-            manualInstallationURL='https://support.mozilla.org/kb/use-java-plugin-to-view-interactive-content',
-            needsRestart='false',
-            guid='{fbe640ef-4375-4f45-8d79-767d60bf75b8}')
-
-    elif (g['mimetype'] in ['application/pdf', 'application/vnd.fdf',
-                            'application/vnd.adobe.xfdf',
-                            'application/vnd.adobe.xdp+xml',
-                            'application/vnd.adobe.xfd+xml'] and
-          re.match(r'^(Win|PPC Mac OS X|Linux(?! x86_64))', g['clientOS'])):
-        plugin.update(
-            name='Adobe Acrobat Plug-In',
-            guid='{d87cd824-67cb-4547-8587-616c70318095}',
-            manualInstallationURL='http://www.adobe.com/products/acrobat/readstep.html')
-
-    elif (g['mimetype'] == 'application/x-mtx' and
-          re.match(r'^(Win|PPC Mac OS X)', g['clientOS'])):
-        plugin.update(
-            name='Viewpoint Media Player',
-            guid='{03f998b2-0e00-11d3-a498-00104b6eb52e}',
-            manualInstallationURL='http://www.viewpoint.com/pub/products/vmp.html')
-
-    elif re.match(wmp_re, g['mimetype']):
-        # We serve up the Windows Media Player plugin for the following
-        # mimetypes:
-        #
-        # application/asx
-        # application/x-mplayer2
-        # audio/x-ms-wax
-        # audio/x-ms-wma
-        # video/x-ms-asf
-        # video/x-ms-asf-plugin
-        # video/x-ms-wm
-        # video/x-ms-wmp
-        # video/x-ms-wmv
-        # video/x-ms-wmx
-        # video/x-ms-wvx
-        #
-        # For all windows users who don't have the WMP 11 plugin, give them
-        # a link for it.
-        if g['clientOS'].startswith('Win'):
-            plugin.update(
-                name='Windows Media Player',
-                version='11',
-                guid='{cff1240a-fd24-4b9f-8183-ccd96e5300d0}',
-                manualInstallationURL='http://port25.technet.com/pages/windows-media-player-firefox-plugin-download.aspx')
-
-        # For OSX users -- added Intel to this since flip4mac is a UB.
-        # Contact at MS was okay w/ this, plus MS points to this anyway.
-        elif re.match(r'^(PPC|Intel) Mac OS X', g['clientOS']):
-            plugin.update(
-                name='Flip4Mac',
-                version='2.1',
-                guid='{cff0240a-fd24-4b9f-8183-ccd96e5300d0}',
-                manualInstallationURL='http://www.flip4mac.com/wmv_download.htm')
-
-    elif (g['mimetype'] == 'application/x-xstandard' and
-          re.match(r'^(Win|PPC Mac OS X)', g['clientOS'])):
-        plugin.update(
-            name='XStandard XHTML WYSIWYG Editor',
-            guid='{3563d917-2f44-4e05-8769-47e655e92361}',
-            iconUrl='http://xstandard.com/images/xicon32x32.gif',
-            XPILocation='http://xstandard.com/download/xstandard.xpi',
-            InstallerShowsUI='false',
-            manualInstallationURL='http://xstandard.com/download/',
-            licenseURL='http://xstandard.com/license/')
-
-    elif (g['mimetype'] == 'application/x-dnl' and
-          g['clientOS'].startswith('Win')):
-        plugin.update(
-            name='DNL Reader',
-            guid='{ce9317a3-e2f8-49b9-9b3b-a7fb5ec55161}',
-            version='5.5',
-            iconUrl='http://digitalwebbooks.com/reader/dwb16.gif',
-            XPILocation='http://digitalwebbooks.com/reader/xpinst.xpi',
-            InstallerShowsUI='false',
-            manualInstallationURL='http://digitalwebbooks.com/reader/')
-
-    elif (g['mimetype'] == 'application/x-videoegg-loader' and
-          g['clientOS'].startswith('Win')):
-        plugin.update(
-            name='VideoEgg Publisher',
-            guid='{b8b881f0-2e07-11db-a98b-0800200c9a66}',
-            iconUrl='http://videoegg.com/favicon.ico',
-            XPILocation='http://update.videoegg.com/Install/Windows/Initial/VideoEggPublisher.xpi',
-            InstallerShowsUI='true',
-            manualInstallationURL='http://www.videoegg.com/')
-
-    elif (g['mimetype'] == 'video/vnd.divx' and
-          g['clientOS'].startswith('Win')):
-        plugin.update(
-            name='DivX Web Player',
-            guid='{a8b771f0-2e07-11db-a98b-0800200c9a66}',
-            iconUrl='http://images.divx.com/divx/player/webplayer.png',
-            XPILocation='http://download.divx.com/player/DivXWebPlayer.xpi',
-            InstallerShowsUI='false',
-            licenseURL='http://go.divx.com/plugin/license/',
-            manualInstallationURL='http://go.divx.com/plugin/download/')
-
-    elif (g['mimetype'] == 'video/vnd.divx' and
-          re.match(r'^(PPC|Intel) Mac OS X', g['clientOS'])):
-        plugin.update(
-            name='DivX Web Player',
-            guid='{a8b771f0-2e07-11db-a98b-0800200c9a66}',
-            iconUrl='http://images.divx.com/divx/player/webplayer.png',
-            XPILocation='http://download.divx.com/player/DivXWebPlayerMac.xpi',
-            InstallerShowsUI='false',
-            licenseURL='http://go.divx.com/plugin/license/',
-            manualInstallationURL='http://go.divx.com/plugin/download/')
-
-    # End ridiculously huge and embarrassing if-else block.
-    return output.substitute(plugin)
+            return template.substitute(plugin)
+
+    # The response only depends on these.
+    key = (g['mimetype'], g['appID'], g['clientOS'], g['chromeLocale'])
+    output = cache.get(key)
+    if output is None:
+        for os_re, fields in find_rules(g['mimetype']):
+            if os_re.match(g['clientOS']):
+                for f in fields:
+                    plugin.update(f(g) if callable(f) else f)
+                break
+        output = template.substitute(plugin)
+        cache.set(key, output)
+    return output
 
 
 def format_date(secs):
@@ -1,30 +1,23 @@
-import smtplib
 import sys
-import traceback
 
 from email.Utils import formatdate
-from email.mime.text import MIMEText
 from time import time
 from urlparse import parse_qsl
 
-from django.utils.http import urlencode
-
 import settings_local as settings
 
 # This has to be imported after the settings so statsd knows where to log to.
 from django_statsd.clients import statsd
 
 import commonware.log
-import MySQLdb as mysql
-import sqlalchemy.pool as pool
 
 try:
     from compare import version_int
 except ImportError:
     from apps.versions.compare import version_int
 
-from constants import applications, base
-from utils import (APP_GUIDS, get_mirror, log_configure, PLATFORMS,
+import frozen_constants as base
+from utils import (APP_GUIDS, get_mirror, log_configure, mypool, PLATFORMS,
                    STATUSES_PUBLIC)
 
 # Go configure the log.
@@ -79,15 +72,6 @@ timing_log = commonware.log.getLogger('z.timer')
 error_log = commonware.log.getLogger('z.services')
 
 
-def getconn():
-    db = settings.SERVICES_DATABASE
-    return mysql.connect(host=db['HOST'], user=db['USER'],
-                         passwd=db['PASSWORD'], db=db['NAME'])
-
-
-mypool = pool.QueuePool(getconn, max_overflow=10, pool_size=5, recycle=300)
-
-
 class Update(object):
 
     def __init__(self, data, compat_mode='strict'):
@@ -238,7 +222,7 @@ class Update(object):
             """)
             # Filter out versions that don't have the minimum maxVersion
             # requirement to qualify for default-to-compatible.
-            d2c_max = applications.D2C_MAX_VERSIONS.get(data['app_id'])
+            d2c_max = base.D2C_MAX_VERSIONS.get(data['app_id'])
             if d2c_max:
                 data['d2c_max_version'] = version_int(d2c_max)
                 sql.append("AND appmax.version_int >= %(d2c_max_version)s ")
@@ -329,6 +313,10 @@ def mail_exception(data):
     if settings.EMAIL_BACKEND != 'django.core.mail.backends.smtp.EmailBackend':
         return
 
+    import smtplib
+    import traceback
+    from email.mime.text import MIMEText
+
     msg = MIMEText('%s\n\n%s' % (
         '\n'.join(traceback.format_exception(*sys.exc_info())), data))
     msg['Subject'] = '[Update] ERROR at /services/update'
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import dictconfig
 import logging
@@ -15,40 +16,21 @@ if settingmodule.startswith(('zamboni',  # typical git clone destination
 import posixpath
 import re
 import sys
-
-from cef import log_cef as _log_cef
-import MySQLdb as mysql
-import sqlalchemy.pool as pool
-
-import commonware.log
+import threading
 
 from django.utils import importlib
 settings = importlib.import_module(settingmodule)
 
-from lib.log_settings_base import formatters, handlers, loggers
-
-# Ugh. But this avoids any zamboni or django imports at all.
-# Perhaps we can import these without any problems and we can
-# remove all this.
-from constants.applications import APPS_ALL
-from constants.platforms import PLATFORMS
-from constants.base import (ADDON_PREMIUM, STATUS_PUBLIC, STATUS_DISABLED,
-                            STATUS_BETA, STATUS_LITE,
-                            STATUS_LITE_AND_NOMINATED)
-from constants.payments import (CONTRIB_CHARGEBACK, CONTRIB_PURCHASE,
-                                CONTRIB_NO_CHARGE, CONTRIB_REFUND)
+from lib.log_settings_base import formatters, handlers
 
-APP_GUIDS = dict([(app.guid, app.id) for app in APPS_ALL.values()])
-PLATFORMS = dict([(plat.api_name, plat.id) for plat in PLATFORMS.values()])
-
-ADDON_SLUGS_UPDATE = {
-    1: 'extension',
-    2: 'theme',
-    3: 'extension',
-    4: 'search',
-    5: 'item',
-    6: 'extension',
-    7: 'plugin'}
+# The constants are precomputed: importing `constants` would pull in tower
+# and Django's translations.
+from frozen_constants import (ADDON_PREMIUM, ADDON_SLUGS_UPDATE,  # NOQA
+                              APP_GUIDS, CONTRIB_CHARGEBACK,
+                              CONTRIB_NO_CHARGE, CONTRIB_PURCHASE,
+                              CONTRIB_REFUND, PLATFORMS, STATUS_BETA,
+                              STATUS_DISABLED, STATUS_LITE,
+                              STATUS_LITE_AND_NOMINATED, STATUS_PUBLIC)
 
 
 STATUSES_PUBLIC = {'STATUS_PUBLIC': STATUS_PUBLIC,
@@ -89,12 +71,36 @@ def get_mirror(status, id, row):
 
 
 def getconn():
+    import MySQLdb as mysql
     db = settings.SERVICES_DATABASE
     return mysql.connect(host=db['HOST'], user=db['USER'],
                          passwd=db['PASSWORD'], db=db['NAME'])
 
 
-mypool = pool.QueuePool(getconn, max_overflow=10, pool_size=5, recycle=300)
+class LazyPool(object):
+    """
+    A connection pool that's only created, and sqlalchemy only imported, when
+    the first connection is requested, so that starting a service doesn't
+    pay for it.
+    """
+
+    def __init__(self, creator, **kw):
+        self.creator = creator
+        self.kw = kw
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            import sqlalchemy.pool as pool
+            self._pool = pool.QueuePool(self.creator, **self.kw)
+        return self._pool
+
+    def connect(self):
+        return self.pool.connect()
+
+
+mypool = LazyPool(getconn, max_overflow=10, pool_size=5, recycle=300)
 
 
 def log_configure():
@@ -131,6 +137,7 @@ def log_info(msg):
 
 def log_cef(request, app, msg, longer):
     """Log receipt transactions to the CEF library."""
+    from cef import log_cef as _log_cef
     c = {'cef.product': getattr(settings, 'CEF_PRODUCT', 'AMO'),
          'cef.vendor': getattr(settings, 'CEF_VENDOR', 'Mozilla'),
          'cef.version': getattr(settings, 'CEF_VERSION', '0'),
@@ -142,3 +149,32 @@ def log_cef(request, app, msg, longer):
               'msg': longer, 'config': c,
               'cs2': app, 'cs2Label': 'ReceiptTransaction'}
     return _log_cef('Receipt %s' % msg, 5, request, **kwargs)
+
+
+class LRUCache(object):
+    """A thread-safe dict keeping the `size` most recently used keys."""
+
+    def __init__(self, size):
+        self.size = size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                value = self.data.pop(key)
+            except KeyError:
+                return default
+            self.data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = value
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
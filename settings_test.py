@@ -44,6 +44,8 @@ COLLECTIONS_ICON_PATH = _polite_tmpdir()
 PACKAGER_PATH = _polite_tmpdir()
 REVIEWER_ATTACHMENTS_PATH = _polite_tmpdir()
 DUMPED_APPS_PATH = _polite_tmpdir()
+# Other threads wouldn't see the data of the test transaction.
+DUMPED_APPS_THREADS = 1
 
 # Don't call out to persona in tests.
 AUTHENTICATION_BACKENDS = (
@@ -87,6 +89,9 @@ CACHES = {
 # is just too annoying for tests, so disable it.
 CACHE_COUNT_TIMEOUT = -1
 
+# Same for the search API results, tests that need it turn it back on.
+SEARCH_CACHE_TIMEOUT = 0
+
 # No more failures!
 APP_PREVIEW = False
 